@@ -3,11 +3,16 @@ import time
 import pytest
 from pymilvus import DataType
 import numpy as np
+import pandas as pd
 from pathlib import Path
 from base.client_base import TestcaseBase
 from common import common_func as cf
 from common import common_type as ct
 from common.milvus_sys import MilvusSys
+from common.import_job_tracker import ImportJobTracker, rest_progress_fetcher
+from common.bulk_insert_bench import (BenchCase, BulkInsertBench, UNSUPPORTED_VECTOR_TYPES, gen_bench_files,
+                                      group_import_files)
+from common.minio_comm import MinioUploader, gen_minio_client
 from common.common_type import CaseLabel, CheckTasks
 from utils.util_log import test_log as log
 from common.bulk_insert_data import (
@@ -16,6 +21,7 @@ from common.bulk_insert_data import (
     prepare_bulk_insert_numpy_files,
     prepare_bulk_insert_parquet_files,
     prepare_bulk_insert_csv_files,
+    data_source,
     DataField as df,
 )
 import json
@@ -121,6 +127,7 @@ class ImportJobClient(Requests):
         self.api_key = token
         self.db_name = None
         self.headers = self.update_headers()
+        self.tracker = None
 
     def update_headers(self):
         headers = {
@@ -154,21 +161,9 @@ class ImportJobClient(Requests):
         return res
 
     def wait_import_job_completed(self, task_id_list, timeout=1800):
-        success = False
-        success_states = {}
-        t0 = time.time()
-        while time.time() - t0 < timeout:
-            for task_id in task_id_list:
-                res = self.get_import_job_progress(task_id)
-                if res['data']['state'] == "Completed":
-                    success_states[task_id] = True
-                else:
-                    success_states[task_id] = False
-                time.sleep(5)
-            # all task success then break
-            if all(success_states.values()):
-                success = True
-                break
+        # poll all the jobs concurrently, the progress of every job is kept by the tracker for throughput report
+        self.tracker = ImportJobTracker(rest_progress_fetcher(self))
+        success = self.tracker.wait(task_id_list, timeout=timeout)
         states = []
         for task_id in task_id_list:
             res = self.get_import_job_progress(task_id)
@@ -233,7 +228,8 @@ class TestBulkInsertPerf(TestcaseBaseBulkInsert):
     @pytest.mark.parametrize("file_nums", [1])
     @pytest.mark.parametrize("array_len", [100])
     @pytest.mark.parametrize("enable_dynamic_field", [False])
-    def test_bulk_insert_all_field_with_parquet(self, auto_id, dim, file_size, file_nums, array_len, enable_dynamic_field):
+    def test_bulk_insert_all_field_with_parquet(self, auto_id, dim, file_size, file_nums, array_len, enable_dynamic_field,
+                                                dataset_cache):
         """
         collection schema 1: [pk, int64, float64, string float_vector]
         data file: vectors.parquet and uid.parquet,
@@ -267,6 +263,8 @@ class TestBulkInsertPerf(TestcaseBaseBulkInsert):
             array_length=array_len,
             enable_dynamic_field=enable_dynamic_field,
             force=True,
+            seed=0,
+            cache=dataset_cache,
         )
         self._connect()
         c_name = cf.gen_unique_str("bulk_insert")
@@ -288,6 +286,7 @@ class TestBulkInsertPerf(TestcaseBaseBulkInsert):
         logging.info(f"bulk insert job ids:{job_id_list}")
         success, states = self.import_job_client.wait_import_job_completed(job_id_list, timeout=1800)
         tt = time.time() - t0
+        self.import_job_client.tracker.log_summary(job_id_list)
         log.info(f"bulk insert state:{success} in {tt} with states:{states}")
         assert success
 
@@ -298,7 +297,8 @@ class TestBulkInsertPerf(TestcaseBaseBulkInsert):
     @pytest.mark.parametrize("file_nums", [1])
     @pytest.mark.parametrize("array_len", [100])
     @pytest.mark.parametrize("enable_dynamic_field", [False])
-    def test_bulk_insert_all_field_with_json(self, auto_id, dim, file_size, file_nums, array_len, enable_dynamic_field):
+    def test_bulk_insert_all_field_with_json(self, auto_id, dim, file_size, file_nums, array_len, enable_dynamic_field,
+                                             dataset_cache):
         """
         collection schema 1: [pk, int64, float64, string float_vector]
         data file: vectors.parquet and uid.parquet,
@@ -331,6 +331,8 @@ class TestBulkInsertPerf(TestcaseBaseBulkInsert):
             array_length=array_len,
             enable_dynamic_field=enable_dynamic_field,
             force=True,
+            seed=0,
+            cache=dataset_cache,
         )
         self._connect()
         c_name = cf.gen_unique_str("bulk_insert")
@@ -348,6 +350,7 @@ class TestBulkInsertPerf(TestcaseBaseBulkInsert):
         logging.info(f"bulk insert job ids:{job_id_list}")
         success, states = self.import_job_client.wait_import_job_completed(job_id_list, timeout=1800)
         tt = time.time() - t0
+        self.import_job_client.tracker.log_summary(job_id_list)
         log.info(f"bulk insert state:{success} in {tt} with states:{states}")
         assert success
 
@@ -358,7 +361,8 @@ class TestBulkInsertPerf(TestcaseBaseBulkInsert):
     @pytest.mark.parametrize("file_size", [1, 10, 15])  # file size in GB
     @pytest.mark.parametrize("file_nums", [1])
     @pytest.mark.parametrize("enable_dynamic_field", [False])
-    def test_bulk_insert_all_field_with_numpy(self, auto_id, dim, file_size, file_nums, enable_dynamic_field):
+    def test_bulk_insert_all_field_with_numpy(self, auto_id, dim, file_size, file_nums, enable_dynamic_field,
+                                              dataset_cache):
         """
         collection schema 1: [pk, int64, float64, string float_vector]
         data file: vectors.parquet and uid.parquet,
@@ -386,6 +390,8 @@ class TestBulkInsertPerf(TestcaseBaseBulkInsert):
             file_nums=file_nums,
             enable_dynamic_field=enable_dynamic_field,
             force=True,
+            seed=0,
+            cache=dataset_cache,
         )
         self._connect()
         c_name = cf.gen_unique_str("bulk_insert")
@@ -403,5 +409,127 @@ class TestBulkInsertPerf(TestcaseBaseBulkInsert):
         logging.info(f"bulk insert job ids:{job_id_list}")
         success, states = self.import_job_client.wait_import_job_completed(job_id_list, timeout=1800)
         tt = time.time() - t0
+        self.import_job_client.tracker.log_summary(job_id_list)
         log.info(f"bulk insert state:{success} in {tt} with states:{states}")
         assert success
+
+
+def gen_bench_vector_field(vector_type, dim):
+    name = BenchCase(file_type="parquet", vector_type=vector_type).vector_field
+    if vector_type == "binary":
+        return cf.gen_binary_vec_field(name=name, dim=dim)
+    if vector_type == "fp16":
+        return cf.gen_float16_vec_field(name=name, dim=dim)
+    if vector_type == "bf16":
+        return cf.gen_bfloat16_vec_field(name=name, dim=dim)
+    return cf.gen_float_vec_field(name=name, dim=dim)
+
+
+def gen_bench_schema(vector_type, dim):
+    """schema of the bench collections: [auto id pk, int64, float, double, vector of vector_type] and its data fields"""
+    fields = [
+        cf.gen_int64_field(name=df.pk_field, is_primary=True, auto_id=True),
+        cf.gen_int64_field(name=df.int_field),
+        cf.gen_float_field(name=df.float_field),
+        cf.gen_double_field(name=df.double_field),
+        gen_bench_vector_field(vector_type, dim),
+    ]
+    data_fields = [f.name for f in fields if not f.to_dict().get("auto_id", False)]
+    return cf.gen_collection_schema(fields=fields, auto_id=True), data_fields
+
+
+class TestBulkInsertBenchFiles:
+    """ Generate the files of the bench cases with several workers, without milvus"""
+
+    @staticmethod
+    def vector_length(file_type, vector_type, dim):
+        """length of a vector in the files, fp16 and bf16 are bytes except in json, binary is packed"""
+        if vector_type == "binary":
+            return dim // 8
+        if vector_type in ["fp16", "bf16"] and file_type != "json":
+            return dim * 2
+        return dim
+
+    @pytest.mark.tags(CaseLabel.L1)
+    @pytest.mark.parametrize("file_type", ["parquet", "numpy", "json", "csv"])
+    @pytest.mark.parametrize("vector_type", ["float", "fp16", "bf16", "binary"])
+    def test_gen_bench_files_with_workers(self, file_type, vector_type):
+        """
+        target: the bench generation with the schema and num_workers > 1 of the matrix
+        method: generate 2 files of every format and vector type with num_workers=4
+        expected: every file has all the rows, a value for every data field and vectors of the dim
+        """
+        if vector_type in UNSUPPORTED_VECTOR_TYPES.get(file_type, ()):
+            pytest.skip(f"{file_type} files do not support {vector_type} vectors")
+        rows, file_nums, dim = 1000, 2, 16
+        schema, data_fields = gen_bench_schema(vector_type, dim=dim)
+        case = BenchCase(file_type=file_type, rows=rows, file_nums=file_nums, dim=dim, vector_type=vector_type,
+                         num_workers=4)
+        files = gen_bench_files(case, data_fields, schema=schema, seed=0)
+        groups = group_import_files(file_type, files)
+        assert len(groups) == file_nums
+        vector_length = self.vector_length(file_type, vector_type, dim)
+        for group in groups:
+            if file_type == "numpy":
+                columns = {Path(f).stem: np.load(f"{data_source}/{f}") for f in group}
+                assert sorted(columns) == sorted(data_fields)
+                assert all(len(c) == rows for c in columns.values())
+                assert columns[case.vector_field].shape == (rows, vector_length)
+                continue
+            file = f"{data_source}/{group[0]}"
+            if file_type == "parquet":
+                data = pd.read_parquet(file)
+            elif file_type == "json":
+                data = pd.read_json(file)
+            else:
+                data = pd.read_csv(file)
+            assert len(data) == rows
+            assert sorted(data.columns) == sorted(data_fields)
+            assert not data[df.double_field].isna().any()
+            vectors = data[case.vector_field]
+            assert not vectors.isna().any()
+            if file_type == "csv":
+                vectors = vectors.map(json.loads)
+            assert all(len(v) == vector_length for v in vectors)
+
+
+class TestBulkInsertBenchMatrix(TestcaseBaseBulkInsert):
+    """
+    Compare the import throughput of the file formats, the results of all the cases are written to
+    /tmp/bulk_insert_bench/results.json and results.txt
+    """
+    bench_results = []
+
+    @pytest.mark.tags(CaseLabel.L3)
+    @pytest.mark.parametrize("file_type", ["parquet", "numpy", "json", "csv"])
+    @pytest.mark.parametrize("vector_type", ["float", "fp16"])
+    @pytest.mark.parametrize("file_size", [1, 5])  # file size in GB
+    @pytest.mark.parametrize("file_nums", [1, 4])
+    @pytest.mark.parametrize("dim", [128])
+    @pytest.mark.parametrize("num_workers", [4])
+    def test_bulk_insert_bench_matrix(self, file_type, vector_type, file_size, file_nums, dim, num_workers):
+        """
+        collection schema: [auto id pk, int64, float, double, vector of vector_type]
+        Steps:
+        1. generate the files and upload them to minio
+        2. import all the files by one job and build the index
+        3. report the time of every phase and the import throughput
+        """
+        if vector_type in UNSUPPORTED_VECTOR_TYPES.get(file_type, ()):
+            pytest.skip(f"{file_type} files do not support {vector_type} vectors")
+        case = BenchCase(file_type=file_type, file_size=file_size, file_nums=file_nums, dim=dim,
+                         vector_type=vector_type, num_workers=num_workers)
+        schema, data_fields = gen_bench_schema(vector_type, dim)
+        c_name = cf.gen_unique_str("bulk_insert_bench")
+        self.collection_wrap.init_collection(c_name, schema=schema)
+
+        def build_index():
+            index_params = ct.default_binary_index if vector_type == "binary" else ct.default_index
+            self.collection_wrap.create_index(field_name=case.vector_field, index_params=index_params)
+            self.utility_wrap.wait_for_index_building_complete(c_name, timeout=1800)
+
+        uploader = MinioUploader(gen_minio_client(self.minio_endpoint, max_connections=24), self.bucket_name)
+        bench = BulkInsertBench(uploader, self.import_job_client, results=self.bench_results)
+        result = bench.run(case, c_name, data_fields, schema=schema, build_index=build_index)
+        assert result.success
+        assert self.collection_wrap.num_entities == result.rows
@@ -0,0 +1,282 @@
+import json
+import os
+import random
+import threading
+import uuid
+import pytest
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from pathlib import Path
+from pymilvus import DataType
+from common import common_func as cf
+from common import dataset_cache
+from common.common_type import CaseLabel
+from common.bulk_insert_data import (
+    gen_new_json_files,
+    gen_parquet_files,
+    gen_parquet_files_by_schema,
+    data_source,
+    DataField as df,
+)
+from common.bulk_insert_verifier import ImportChecksum, accumulate
+from common.dataset_cache import DatasetCache, dataset_key
+
+
+def gen_tiny_files(rows=10, seed=0, file_nums=1):
+    """a tiny generator of the dataset cache tests, files of random floats in a new folder"""
+    rng = np.random.default_rng(seed)
+    folder = f"tiny-{uuid.uuid4()}"
+    Path(f"{data_source}/{folder}").mkdir(parents=True)
+    files = []
+    for i in range(file_nums):
+        file_name = f"{folder}/file-num-{i}.npy"
+        np.save(f"{data_source}/{file_name}", rng.random(rows))
+        files.append(file_name)
+    return files
+
+
+class TestBulkInsertDataGeneration:
+    """ Generate the bulk insert files in a process pool, without milvus"""
+
+    @staticmethod
+    def gen_schema(dim=8):
+        fields = [
+            cf.gen_int64_field(name=df.pk_field, is_primary=True, auto_id=False),
+            cf.gen_float_vec_field(name=df.float_vec_field, dim=dim),
+        ]
+        return cf.gen_collection_schema(fields=fields)
+
+    @pytest.mark.tags(CaseLabel.L1)
+    @pytest.mark.parametrize("file_type", ["json", "parquet"])
+    @pytest.mark.parametrize("file_nums", [1, 2])
+    def test_gen_files_by_schema_with_workers(self, file_type, file_nums):
+        """
+        target: the schema-driven json and parquet generation in a process pool
+        method: generate files of a schema with num_workers=2
+        expected: the files have all the rows, with unique pks
+        """
+        rows, dim = 1000, 8
+        gen_files = gen_new_json_files if file_type == "json" else gen_parquet_files
+        files = gen_files(float_vector=True, rows=rows, dim=dim, data_fields=[df.pk_field, df.float_vec_field],
+                          file_nums=file_nums, schema=self.gen_schema(dim), num_workers=2, seed=0)
+        assert len(files) == file_nums
+        pks = []
+        for f in files:
+            if file_type == "json":
+                data = pd.read_json(f"{data_source}/{f}")
+            else:
+                data = pd.read_parquet(f"{data_source}/{f}")
+            assert len(data[df.float_vec_field].iloc[0]) == dim
+            pks.extend(data[df.pk_field].tolist())
+        assert len(pks) == rows * file_nums
+        assert len(set(pks)) == len(pks)
+
+    @pytest.mark.tags(CaseLabel.L1)
+    @pytest.mark.parametrize("file_size", [None, 0.002])
+    def test_gen_parquet_files_by_schema_with_workers(self, file_size):
+        """
+        target: the arrow batch generation of a schema in a process pool
+        method: generate 2 parquet files of a schema with num_workers=2, by rows and by file size
+        expected: the files have the fields of the schema and disjoint pk ranges
+        """
+        rows, dim = 2000, 8
+        fields = [
+            cf.gen_int64_field(name=df.pk_field, is_primary=True, auto_id=False),
+            cf.gen_string_field(name=df.string_field),
+            cf.gen_json_field(name=df.json_field),
+            cf.gen_array_field(name=df.array_int_field, element_type=DataType.INT64),
+            cf.gen_float_vec_field(name=df.float_vec_field, dim=dim),
+            cf.gen_sparse_vec_field(name=df.sparse_vec_field),
+        ]
+        schema = cf.gen_collection_schema(fields=fields)
+        files = gen_parquet_files_by_schema(schema, rows=rows, file_size=file_size, file_nums=2, num_workers=2,
+                                            seed=0)
+        assert len(files) == 2
+        pks = []
+        for f in files:
+            data = pd.read_parquet(f"{data_source}/{f}")
+            assert list(data.columns) == [field.name for field in fields]
+            assert len(data[df.float_vec_field].iloc[0]) == dim
+            pks.extend(data[df.pk_field].tolist())
+        if file_size is None:
+            assert len(pks) == rows * 2
+        assert len(set(pks)) == len(pks)
+
+
+class TestImportChecksum:
+    """ Import checksums of the generated files against query shaped rows, without milvus"""
+
+    @staticmethod
+    def to_query_row(row, schema):
+        """convert a row read from parquet to the shape a query returns it in"""
+        row = dict(row)
+        for field in schema.fields:
+            value = row.get(field.name)
+            if value is None:
+                continue
+            if field.dtype in [DataType.FLOAT16_VECTOR, DataType.BFLOAT16_VECTOR, DataType.BINARY_VECTOR]:
+                row[field.name] = [bytes(bytearray(value))]
+            elif field.dtype == DataType.SPARSE_FLOAT_VECTOR:
+                row[field.name] = {int(i): float(v) for i, v in zip(value["indices"], value["values"])}
+            elif field.dtype == DataType.JSON and isinstance(value, str):
+                row[field.name] = json.loads(value)
+        return row
+
+    @pytest.mark.tags(CaseLabel.L1)
+    def test_checksum_of_query_shaped_rows(self):
+        """
+        target: the checksums of the generated parquet files match the checksums of the queried rows
+        method: generate 2 parquet files with a checksum, read the rows back in shuffled pages,
+                with sparse vectors as dicts, fp16, bf16 and binary vectors as [bytes] and json parsed,
+                and accumulate them as reconcile does
+        expected: the accumulated checksums equal the merged checksums of the files
+        """
+        rows, dim, bucket_size, page_size = 500, 8, 64, 97
+        fields = [
+            cf.gen_int64_field(name=df.pk_field, is_primary=True, auto_id=False),
+            cf.gen_int64_field(name=df.int_field, nullable=True),
+            cf.gen_float_field(name=df.float_field),
+            cf.gen_string_field(name=df.string_field),
+            cf.gen_bool_field(name=df.bool_field),
+            cf.gen_json_field(name=df.json_field),
+            cf.gen_array_field(name=df.array_int_field, element_type=DataType.INT64),
+            cf.gen_float_vec_field(name=df.float_vec_field, dim=dim),
+            cf.gen_float16_vec_field(name=df.fp16_vec_field, dim=dim),
+            cf.gen_bfloat16_vec_field(name=df.bf16_vec_field, dim=dim),
+            cf.gen_binary_vec_field(name=df.binary_vec_field, dim=dim * 2),
+            cf.gen_sparse_vec_field(name=df.sparse_vec_field),
+        ]
+        schema = cf.gen_collection_schema(fields=fields)
+        checksum = ImportChecksum(schema, bucket_size=bucket_size)
+        files = gen_parquet_files_by_schema(schema, rows=rows, file_nums=2, null_ratio=0.2, seed=0,
+                                            checksum=checksum)
+        query_rows = []
+        for f in files:
+            table = pq.read_table(f"{data_source}/{f}")
+            query_rows.extend(self.to_query_row(row, schema) for row in table.to_pylist())
+        assert len(query_rows) == rows * 2
+        assert checksum.total_rows == rows * 2
+        random.Random(0).shuffle(query_rows)
+        actual = {}
+        for start in range(0, len(query_rows), page_size):
+            page = query_rows[start:start + page_size]
+            columns = {name: [row.get(name) for row in page] for name in checksum.fields}
+            accumulate(actual, columns, checksum.pk_field, checksum.fields, checksum.bucket_size)
+        assert actual == checksum.merged()
+
+        # a changed value of a single row is detected
+        row = query_rows[0]
+        row[df.float_vec_field] = list(np.asarray(row[df.float_vec_field], dtype=np.float32) + 1)
+        changed = {}
+        columns = {name: [row.get(name) for row in query_rows] for name in checksum.fields}
+        accumulate(changed, columns, checksum.pk_field, checksum.fields, checksum.bucket_size)
+        assert changed[df.float_vec_field] != checksum.merged()[df.float_vec_field]
+        assert changed[df.pk_field] == checksum.merged()[df.pk_field]
+
+
+class TestDatasetCache:
+    """ Dataset cache of the generated bulk insert files, without milvus"""
+
+    @pytest.fixture()
+    def cache(self):
+        cache = DatasetCache(f"cache-test-{uuid.uuid4()}", max_size=None)
+        yield cache
+        cache.clear()
+        os.rmdir(cache.root)
+
+    @pytest.mark.tags(CaseLabel.L1)
+    def test_hit_returns_the_same_files(self, cache):
+        """
+        target: a second request of a dataset is served from the cache
+        method: get the same dataset twice
+        expected: the second request returns the same existing files without generating them again
+        """
+        files = cache.get_or_create(gen_tiny_files, rows=10, seed=1, file_nums=2)
+        mtimes = [os.path.getmtime(f"{data_source}/{f}") for f in files]
+        assert cache.get_or_create(gen_tiny_files, rows=10, seed=1, file_nums=2) == files
+        assert [os.path.getmtime(f"{data_source}/{f}") for f in files] == mtimes
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+        assert len(cache.entries()) == 1
+
+    @pytest.mark.tags(CaseLabel.L1)
+    def test_key_of_seed_and_generator_source(self, cache, monkeypatch, tmp_path):
+        """
+        target: the cache key changes with the data kwargs and the generator source
+        method: get datasets of different seeds, and compute the key before and after changing a generator file
+        expected: different seeds are different entries, a changed generator source gives a different key
+        """
+        files_1 = cache.get_or_create(gen_tiny_files, rows=10, seed=1)
+        files_2 = cache.get_or_create(gen_tiny_files, rows=10, seed=2)
+        assert files_1 != files_2
+        assert not np.array_equal(np.load(f"{data_source}/{files_1[0]}"), np.load(f"{data_source}/{files_2[0]}"))
+        assert (cache.stats.hits, cache.stats.misses) == (0, 2)
+        # kwargs that do not change the data do not change the key
+        assert dataset_key("gen_tiny_files", seed=1, force=True) == dataset_key("gen_tiny_files", seed=1)
+
+        generator_file = tmp_path / "generator.py"
+        generator_file.write_text("x = 1\n")
+        monkeypatch.setattr(dataset_cache, "GENERATOR_MODULES", (str(generator_file),))
+        dataset_cache.generator_version.cache_clear()
+        try:
+            key = dataset_key("gen_tiny_files", seed=1)
+            generator_file.write_text("x = 2\n")
+            dataset_cache.generator_version.cache_clear()
+            assert dataset_key("gen_tiny_files", seed=1) != key
+        finally:
+            monkeypatch.undo()
+            dataset_cache.generator_version.cache_clear()
+
+    @pytest.mark.tags(CaseLabel.L1)
+    def test_evict_keeps_the_kept_entries(self, cache):
+        """
+        target: eviction of the least recently used entries respects keep
+        method: create 3 entries, shrink max_size to a single entry and evict with the oldest entry kept
+        expected: the kept entry survives although it is the least recently used, the next oldest is evicted
+        """
+        keys = []
+        for seed in range(3):
+            cache.get_or_create(gen_tiny_files, rows=10, seed=seed)
+            keys.append(dataset_key("gen_tiny_files", rows=10, seed=seed))
+        sizes = {e["key"]: e["size"] for e in cache.entries()}
+        cache.max_size = sizes[keys[0]] + sizes[keys[2]]
+        assert cache.evict(keep=(keys[0],)) == [keys[1]]
+        assert sorted(e["key"] for e in cache.entries()) == sorted([keys[0], keys[2]])
+
+        # the entry just requested is kept even if it alone exceeds max_size
+        cache.max_size = 1
+        files = cache.get_or_create(gen_tiny_files, rows=10, seed=3)
+        assert [e["key"] for e in cache.entries()] == [dataset_key("gen_tiny_files", rows=10, seed=3)]
+        assert all(os.path.exists(f"{data_source}/{f}") for f in files)
+        assert cache.stats.evictions == 3
+
+    @pytest.mark.tags(CaseLabel.L1)
+    def test_concurrent_publish_of_the_same_key(self, cache):
+        """
+        target: a dataset generated by two caches at the same time is published once
+        method: get the same dataset from 2 caches of the same folder in 2 threads, both miss and generate it
+        expected: both get the files of the single published entry, no temporary entry is left
+        """
+        barrier = threading.Barrier(2, timeout=30)
+
+        def gen_tiny_files_concurrently(**kwargs):
+            barrier.wait()
+            return gen_tiny_files(**kwargs)
+
+        caches = [cache, DatasetCache(cache.name, max_size=None)]
+        results = [None, None]
+
+        def get_files(i):
+            results[i] = caches[i].get_or_create(gen_tiny_files_concurrently, rows=10, seed=1)
+
+        threads = [threading.Thread(target=get_files, args=(i,)) for i in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results[0] is not None and results[0] == results[1]
+        assert sum(c.stats.misses for c in caches) == 2
+        assert [e["key"] for e in cache.entries()] == [dataset_key("gen_tiny_files_concurrently", rows=10, seed=1)]
+        assert [d for d in os.listdir(cache.root) if d.startswith(".")] == []
+        assert all(os.path.exists(f"{data_source}/{f}") for f in results[0])
+        assert [d for d in os.listdir(data_source) if d.startswith("tiny-")] == []
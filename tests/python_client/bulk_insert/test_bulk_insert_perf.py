@@ -4,7 +4,7 @@ import time
 import threading
 from pathlib import Path
 from time import sleep
-from minio import Minio
+from common.minio_comm import MinioUploader, gen_minio_client
 from pymilvus import connections
 from chaos.checker import (BulkInsertChecker, Op)
 from common.milvus_sys import MilvusSys
@@ -116,12 +116,8 @@ class TestChaos(TestChaosBase):
         if file_type == "npy":
             files = cf.gen_npy_files_for_bulk_insert(data, schema, data_dir, nb=nb, dim=dim)
         log.info("upload file to minio")
-        client = Minio(minio_endpoint, access_key="minioadmin", secret_key="minioadmin", secure=False)
-        for file_name in files:
-            file_size = os.path.getsize(os.path.join(data_dir, file_name)) / 1024 / 1024
-            t0 = time.time()
-            client.fput_object(bucket_name, file_name, os.path.join(data_dir, file_name))
-            log.info(f"upload file {file_name} to minio, size: {file_size:.2f} MB, cost {time.time() - t0:.2f} s")
+        uploader = MinioUploader(gen_minio_client(minio_endpoint, max_connections=24), bucket_name)
+        uploader.upload_files([(os.path.join(data_dir, file_name), file_name) for file_name in files], force=True)
         self.health_checkers[Op.bulk_insert].update(schema=schema, files=files)
         log.info("prepare data for bulk load done")
 
@@ -0,0 +1,332 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymilvus import AsyncMilvusClient, DataType
+
+from chaos import constants
+from chaos.checker import Op, get_id_allocator, get_milvus_uri_and_token, request_records
+from chaos.latency_stats import CheckerStats
+from common import common_func as cf
+from utils.util_log import test_log as log
+
+# a rate scheduler late by more than this skips the missed slots instead of bursting to catch up
+MAX_SCHEDULE_LAG = 1.0
+# timeout of every request, same as the thread checkers
+REQUEST_TIMEOUT = 60
+
+
+@dataclass
+class LoadSpec:
+    """
+    Load level of a checker.
+
+    With a rate the scheduler is open loop: a request starts every 1 / rate seconds whatever the
+    latency, at most concurrency of them in flight, a slot finding concurrency requests in flight is
+    counted as missed. Without a rate it is closed loop: concurrency requests are kept in flight.
+    rate=0 or concurrency=0 pauses the checker.
+    """
+    rate: Optional[float] = None
+    concurrency: int = 1
+
+    @property
+    def paused(self) -> bool:
+        return self.rate == 0 or self.concurrency <= 0
+
+
+class AsyncChecker(CheckerStats):
+    """
+    A milvus operation checker whose operation is a coroutine on a shared AsyncMilvusClient, driven
+    by AsyncCheckerRuntime instead of a thread of its own. It counts the requests with the CheckerStats
+    of Checker, so assert_statistic, get_rto and the request records work unchanged.
+
+    The collection is not created here, the checker runs on a collection bootstrapped by a thread
+    checker, see from_checker.
+    """
+    op_name = "unknown"
+
+    def __init__(self, collection_name, schema, partition_names=None):
+        self.c_name = collection_name
+        self.schema = schema
+        self.p_names = partition_names
+        self.client: Optional[AsyncMilvusClient] = None
+        self.int64_field_name = cf.get_int64_field_name(schema=schema)
+        self.dense_anns_field_name_list = cf.get_dense_anns_field_name_list(schema)
+        self.init_stats()
+        self.missed = 0
+
+    @classmethod
+    def from_checker(cls, checker, **kwargs):
+        """an async checker on the collection of a thread checker, e.g. AsyncSearchChecker.from_checker(SearchChecker())"""
+        return cls(checker.c_name, checker.get_schema(), partition_names=checker.p_names, **kwargs)
+
+    async def operation(self):
+        raise NotImplementedError
+
+    async def run_once(self):
+        """run the operation once, timed on the loop clock"""
+        loop = asyncio.get_running_loop()
+        start_time_ts = time.time()
+        start_time_ns = time.time_ns()
+        t0 = loop.time()
+        try:
+            await self.operation()
+            result = True
+        except Exception as e:
+            e_str = str(e)
+            log.error(f"Error in {self.__class__.__name__}.{self.op_name}: {e_str[:300]}")
+            result = False
+        elapsed = loop.time() - t0
+        try:
+            request_records.insert(self.op_name, self.c_name, start_time_ns, elapsed, result)
+        except Exception as e:
+            log.error(e)
+        start_time = datetime.fromtimestamp(start_time_ts).strftime('%Y-%m-%d %H:%M:%S.%f')
+        self.record_result(result, elapsed, start_time, start_time_ts)
+
+    def extra_results(self):
+        return {"missed": self.missed}
+
+    def reset(self):
+        super().reset()
+        self.missed = 0
+
+
+class AsyncSearchChecker(AsyncChecker):
+    """check search operations on a random dense vector field"""
+    op_name = "search"
+
+    async def operation(self):
+        anns_field_item = random.choice(self.dense_anns_field_name_list)
+        data = cf.gen_vectors(5, anns_field_item["dim"], vector_data_type=anns_field_item["dtype"])
+        if anns_field_item["dtype"] == DataType.INT8_VECTOR:
+            search_params = constants.DEFAULT_INT8_SEARCH_PARAM
+        else:
+            search_params = constants.DEFAULT_SEARCH_PARAM
+        return await self.client.search(self.c_name, data=data, anns_field=anns_field_item["name"],
+                                        search_params=search_params, limit=1, partition_names=self.p_names,
+                                        timeout=REQUEST_TIMEOUT)
+
+
+class AsyncQueryChecker(AsyncChecker):
+    """check query operations, an empty result is a failure"""
+    op_name = "query"
+
+    def __init__(self, collection_name, schema, partition_names=None, limit=100):
+        super().__init__(collection_name, schema, partition_names=partition_names)
+        self.term_expr = f"{self.int64_field_name} > 0"
+        self.limit = limit
+
+    async def operation(self):
+        res = await self.client.query(self.c_name, filter=self.term_expr, limit=self.limit,
+                                      partition_names=self.p_names, timeout=REQUEST_TIMEOUT)
+        if len(res) == 0:
+            raise Exception(f"query {self.term_expr} returned no entities")
+        return res
+
+
+class AsyncInsertChecker(AsyncChecker):
+    """
+    check insert operations, every request inserts nb rows with new pks from the shared id allocator.
+    The rows are generated once, a request only copies them with the new pks, so the data generation
+    does not hold the loop while the other requests are timed.
+    """
+    op_name = "insert"
+
+    def __init__(self, collection_name, schema, partition_names=None, nb=constants.DELTA_PER_INS,
+                 scale=1 * 10 ** 6):
+        super().__init__(collection_name, schema, partition_names=partition_names)
+        self.rows = cf.gen_row_data_by_schema(nb=nb, schema=schema)
+        self.id_allocator = get_id_allocator(scale)
+        self.partition_name = partition_names[0] if partition_names else None
+
+    def new_rows(self):
+        ids = self.id_allocator.alloc(len(self.rows))
+        return [{**row, self.int64_field_name: pk} for row, pk in zip(self.rows, ids)]
+
+    async def operation(self):
+        return await self.client.insert(self.c_name, data=self.new_rows(), partition_name=self.partition_name,
+                                        timeout=REQUEST_TIMEOUT)
+
+
+class AsyncUpsertChecker(AsyncInsertChecker):
+    """check upsert operations, half of the rows update the pks of the previous request, half are new"""
+    op_name = "upsert"
+
+    def __init__(self, collection_name, schema, partition_names=None, nb=constants.DELTA_PER_INS,
+                 scale=1 * 10 ** 6):
+        super().__init__(collection_name, schema, partition_names=partition_names, nb=nb, scale=scale)
+        self.last_pks = []
+
+    async def operation(self):
+        rows = self.new_rows()
+        for row, pk in zip(rows, self.last_pks[:len(rows) // 2]):
+            row[self.int64_field_name] = pk
+        self.last_pks = [row[self.int64_field_name] for row in rows]
+        return await self.client.upsert(self.c_name, data=rows, partition_name=self.partition_name,
+                                        timeout=REQUEST_TIMEOUT)
+
+
+class AsyncCheckerRuntime:
+    """
+    Run async checkers on one event loop in a background thread, every checker at its own load level.
+
+    All the requests share one AsyncMilvusClient, so tens of checkers take one thread and one
+    connection instead of a thread each, and no checker is delayed by the GIL hand-off between
+    checker threads. Latency is measured on the loop clock. The load of a checker can be changed
+    while it runs, e.g. raised during the fault injection with set_load.
+    """
+
+    def __init__(self, checkers: Dict[Op, AsyncChecker], loads: Optional[Dict[Op, LoadSpec]] = None,
+                 default_load: LoadSpec = LoadSpec(rate=1, concurrency=4), uri=None, token=None):
+        """
+        Args:
+            checkers: Async checkers by operation
+            loads: Load of the checkers, the checkers without one run at default_load
+            default_load: Load of the checkers not in loads
+            uri: Milvus uri, default to the uri of the test params
+            token: Milvus token, default to the token of the test params
+        """
+        self.checkers = checkers
+        loads = loads or {}
+        self.loads = {op: loads.get(op, default_load) for op in checkers}
+        default_uri, default_token = get_milvus_uri_and_token()
+        self.uri = uri or default_uri
+        self.token = token or default_token
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.client: Optional[AsyncMilvusClient] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._wakeups: Dict[Op, asyncio.Event] = {}
+        self._started = threading.Event()
+        self._start_error: Optional[Exception] = None
+
+    def new_client(self):
+        return AsyncMilvusClient(uri=self.uri, token=self.token)
+
+    def set_load(self, op, rate=None, concurrency=None):
+        """change the load of a checker, takes effect at its next request, callable from any thread"""
+        load = self.loads[op]
+        self.loads[op] = LoadSpec(rate=rate if rate is not None else load.rate,
+                                  concurrency=concurrency if concurrency is not None else load.concurrency)
+        log.info(f"set load of {op}: {self.loads[op]}")
+        if self.loop is not None and op in self._wakeups:
+            self.loop.call_soon_threadsafe(self._wakeups[op].set)
+
+    async def _wait(self, op, timeout):
+        """sleep until timeout, the stop or a load change of op"""
+        wakeup = self._wakeups[op]
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+    async def _drive(self, op):
+        loop = asyncio.get_running_loop()
+        checker = self.checkers[op]
+        in_flight = set()
+        next_start = loop.time()
+        while not self._stop.is_set():
+            load = self.loads[op]
+            if load.paused:
+                await self._wait(op, 1)
+                next_start = loop.time()
+                continue
+            if load.rate is not None:
+                delay = next_start - loop.time()
+                if delay > 0:
+                    await self._wait(op, delay)
+                    if self.loads[op] is not load:
+                        # the new rate starts now instead of at the slot of the old one
+                        next_start = loop.time()
+                        continue
+                    if self._stop.is_set():
+                        break
+                next_start = max(next_start + 1 / load.rate, loop.time() - MAX_SCHEDULE_LAG)
+                if len(in_flight) >= load.concurrency:
+                    checker.missed += 1
+                    continue
+            elif len(in_flight) >= load.concurrency:
+                wakeup = asyncio.ensure_future(self._wakeups[op].wait())
+                await asyncio.wait(in_flight | {wakeup}, return_when=asyncio.FIRST_COMPLETED)
+                wakeup.cancel()
+                self._wakeups[op].clear()
+                continue
+            task = asyncio.ensure_future(checker.run_once())
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+    async def run(self, duration=None):
+        """run the checkers until stop() or for duration seconds, in the calling loop"""
+        self._stop = asyncio.Event()
+        self._wakeups = {op: asyncio.Event() for op in self.checkers}
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.client = self.new_client()
+        except Exception as e:
+            self._start_error = e
+            raise
+        finally:
+            # start() waits for the client, or for the error to re-raise it
+            self._started.set()
+        for checker in self.checkers.values():
+            checker.client = self.client
+        if duration is not None:
+            self.loop.call_later(duration, self._stop_in_loop)
+        try:
+            await asyncio.gather(*[self._drive(op) for op in self.checkers])
+        finally:
+            await self.client.close()
+
+    def _stop_in_loop(self):
+        self._stop.set()
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+
+    def start(self, timeout=REQUEST_TIMEOUT):
+        """run the checkers in a background thread, raise if they do not start in timeout seconds"""
+        self._started.clear()
+        self._start_error = None
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="async_checkers", daemon=True)
+        self._thread.start()
+        if not self._started.wait(timeout):
+            raise Exception(f"async checkers did not start in {timeout} s")
+        if self._start_error is not None:
+            raise Exception(f"async checkers failed to start: {self._start_error}") from self._start_error
+        log.info(f"async checkers started: {', '.join(f'{op}: {load}' for op, load in self.loads.items())}")
+        return self._thread
+
+    def stop(self, timeout=REQUEST_TIMEOUT):
+        """stop scheduling requests and wait for the ones in flight"""
+        if self.loop is None or self._thread is None:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._stop_in_loop)
+        except RuntimeError:
+            # the loop is already closed, e.g. the checkers failed to start
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            log.warning(f"async checkers did not stop in {timeout} s")
+
+    def run_for(self, duration):
+        """run the checkers in the calling thread for duration seconds"""
+        asyncio.run(self.run(duration))
+
+    def check_result(self):
+        return {op: checker.check_result() for op, checker in self.checkers.items()}
+
+    def reset(self):
+        for checker in self.checkers.values():
+            checker.reset()
+
+    def terminate(self):
+        self.stop()
+        self.reset()
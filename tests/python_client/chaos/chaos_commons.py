@@ -46,6 +46,17 @@ def start_monitor_threads(checkers={}):
     return tasks
 
 
+def start_async_monitor(checkers={}, loads=None):
+    """
+    run the async checkers on one event loop in a background thread at the given load levels,
+    stop them with the returned runtime
+    """
+    from chaos.async_checker import AsyncCheckerRuntime
+    runtime = AsyncCheckerRuntime(checkers, loads=loads)
+    runtime.start()
+    return runtime
+
+
 def check_thread_status(tasks):
     """check the status of all threads"""
     for t in tasks:
@@ -7,11 +7,13 @@ import threading
 import os
 import uuid
 import json
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from datetime import datetime
 from prettytable import PrettyTable
 import functools
-from collections import Counter
+from collections import Counter, deque
 from time import sleep
 from pymilvus import AnnSearchRequest, RRFRanker, MilvusClient, DataType, CollectionSchema
 from pymilvus.bulk_writer import RemoteBulkWriter, BulkFileType
@@ -22,16 +24,17 @@ from base.utility_wrapper import ApiUtilityWrapper
 from common import common_func as cf
 from common import common_type as ct
 from common.milvus_sys import MilvusSys
+from common.import_job_tracker import ImportJobTracker, bulk_insert_state_fetcher
 from chaos import constants
+from chaos.freshness import FreshnessTracker
+from chaos.latency_stats import CheckerStats
+from chaos.record_writer import RecordWriter
 from faker import Faker
 
 from common.common_type import CheckTasks
 from utils.util_log import test_log as log
 from utils.api_request import Error
 
-event_lock = threading.Lock()
-request_lock = threading.Lock()
-
 
 def get_chaos_info():
     try:
@@ -53,155 +56,368 @@ class Singleton(type):
 
 
 class EventRecords(metaclass=Singleton):
+    """chaos events (name, status, ns timestamp), written to parquet by a background RecordWriter"""
+
+    schema = pa.schema([("event_name", pa.string()), ("event_status", pa.string()), ("event_ts", pa.int64())])
 
     def __init__(self):
-        self.file_name = f"/tmp/ci_logs/event_records_{uuid.uuid4()}.parquet"
-        self.created_file = False
+        self.writer = RecordWriter("event_records", self.schema)
 
     def insert(self, event_name, event_status, ts=None):
         log.info(f"insert event: {event_name}, {event_status}")
-        insert_ts = datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S.%f') if ts is None else ts
-        data = {
-            "event_name": [event_name],
-            "event_status": [event_status],
-            "event_ts": [insert_ts]
-        }
-        df = pd.DataFrame(data)
-        if not self.created_file:
-            with event_lock:
-                df.to_parquet(self.file_name, engine='fastparquet')
-                self.created_file = True
-        else:
-            with event_lock:
-                df.to_parquet(self.file_name, engine='fastparquet', append=True)
+        self.writer.insert(event_name, event_status, time.time_ns() if ts is None else ts)
 
     def get_records_df(self):
-        df = pd.read_parquet(self.file_name)
-        return df
+        return self.writer.read_df()
 
 
 class RequestRecords(metaclass=Singleton):
+    """
+    one row per checker request: start_time as int64 ns since epoch, time_cost in seconds and a bool result,
+    recorded without blocking the checker threads by a background RecordWriter
+    """
+
+    schema = pa.schema([("operation_name", pa.string()), ("collection_name", pa.string()),
+                        ("start_time", pa.int64()), ("time_cost", pa.float64()), ("result", pa.bool_())])
 
     def __init__(self):
-        self.file_name = f"/tmp/ci_logs/request_records_{uuid.uuid4()}.parquet"
-        self.buffer = []
-        self.created_file = False
+        self.writer = RecordWriter("request_records", self.schema)
 
     def insert(self, operation_name, collection_name, start_time, time_cost, result):
-        data = {
-            "operation_name": operation_name,
-            "collection_name": collection_name,
-            "start_time": start_time,
-            "time_cost": time_cost,
-            "result": result
-        }
-        self.buffer.append(data)
-        if len(self.buffer) > 100:
-            df = pd.DataFrame(self.buffer)
-            if not self.created_file:
-                with request_lock:
-                    df.to_parquet(self.file_name, engine='fastparquet')
-                    self.created_file = True
-            else:
-                with request_lock:
-                    df.to_parquet(self.file_name, engine='fastparquet', append=True)
-            self.buffer = []
+        self.writer.insert(operation_name, collection_name, start_time, time_cost, bool(result))
 
     def sink(self):
-        if len(self.buffer) == 0:
-            return
-        try:
-            df = pd.DataFrame(self.buffer)
-        except Exception as e:
-            log.error(f"convert buffer {self.buffer} to dataframe error: {e}")
+        self.writer.flush()
+
+    def get_records_df(self):
+        return self.writer.read_df()
+
+
+def ns_to_local_datetime(ns):
+    """int64 ns timestamps to naive local datetimes, the format of the times in the chaos info"""
+    return pd.to_datetime(ns, unit="ns", utc=True).dt.tz_convert(datetime.now().astimezone().tzinfo).dt.tz_localize(None)
+
+
+class TimestampIdAllocator:
+    """
+    Thread safe allocator of int64 primary keys that are wall clock timestamps in units of 1/scale second.
+
+    A block of n ids starts at max(now, last id + 1) and is handed out under a lock in O(1), so the ids
+    are unique and strictly increasing across all the checker threads without sleeping between rows.
+    id / scale is the time the block was allocated, unless ids are requested faster than scale per
+    second, then the ids run ahead of the clock by the backlog (see drift) until the clock catches up.
+    """
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    def alloc(self, n):
+        """allocate a block of n consecutive ids"""
+        with self.lock:
+            start = max(int(time.time() * self.scale), self.next_id)
+            self.next_id = start + n
+        return list(range(start, start + n))
+
+    def peek(self):
+        """the first id of the next block, all the ids allocated so far are below it"""
+        with self.lock:
+            return max(int(time.time() * self.scale), self.next_id)
+
+    def to_timestamp(self, id):
+        """wall clock time in seconds an id was allocated at"""
+        return id / self.scale
+
+    @property
+    def drift(self):
+        """seconds the next id is ahead of the clock"""
+        return max(0.0, self.next_id / self.scale - time.time())
+
+
+_id_allocators = {}
+_id_allocators_lock = threading.Lock()
+
+
+def get_id_allocator(scale):
+    """the allocator of the process for a timestamp scale, shared by all the checkers"""
+    with _id_allocators_lock:
+        if scale not in _id_allocators:
+            _id_allocators[scale] = TimestampIdAllocator(scale)
+        return _id_allocators[scale]
+
+
+class IdRangePool:
+    """
+    Client side pool of the ids a checker may delete, kept as [start, end) ranges of consecutive ids.
+
+    The ids of a checker insert are one block of the timestamp id allocator, so an insert adds a single
+    range and take() hands out the oldest ids in O(batch) without querying the collection. A batch is
+    a list of ranges, turned into a delete expression of range comparisons by to_expr.
+    """
+
+    def __init__(self, ids=()):
+        self.ranges = deque()
+        self.size = 0
+        self.add(ids)
+
+    def __len__(self):
+        return self.size
+
+    def add_range(self, start, end):
+        if end <= start:
             return
-        if not self.created_file:
-            with request_lock:
-                df.to_parquet(self.file_name, engine='fastparquet')
-                self.created_file = True
+        if self.ranges and self.ranges[-1][1] == start:
+            self.ranges[-1] = (self.ranges[-1][0], end)
         else:
-            with request_lock:
-                df.to_parquet(self.file_name, engine='fastparquet', append=True)
+            self.ranges.append((start, end))
+        self.size += end - start
 
-    def get_records_df(self):
-        self.sink()
-        df = pd.read_parquet(self.file_name)
-        return df
+    def add(self, ids):
+        """add ids, the runs of consecutive ids are merged into ranges"""
+        ids = sorted(ids)
+        if not ids:
+            return
+        start = prev = ids[0]
+        for i in ids[1:]:
+            if i != prev + 1:
+                self.add_range(start, prev + 1)
+                start = i
+            prev = i
+        self.add_range(start, prev + 1)
+
+    def take(self, n):
+        """remove and return the ranges of the oldest n ids, fewer if the pool is smaller"""
+        batch = []
+        while n > 0 and self.ranges:
+            start, end = self.ranges.popleft()
+            if end - start > n:
+                self.ranges.appendleft((start + n, end))
+                end = start + n
+            batch.append((start, end))
+            n -= end - start
+            self.size -= end - start
+        return batch
+
+    def put_back(self, batch):
+        """return a batch that was not deleted to the front of the pool"""
+        for start, end in reversed(batch):
+            self.ranges.appendleft((start, end))
+            self.size += end - start
+
+    def reset(self, ids):
+        self.ranges.clear()
+        self.size = 0
+        self.add(ids)
+
+    @staticmethod
+    def to_expr(field_name, batch):
+        """expression of the ids of a batch, the single ids in one term and the longer ranges as comparisons"""
+        singles = [start for start, end in batch if end - start == 1]
+        terms = [f"({field_name} >= {start} and {field_name} < {end})" for start, end in batch if end - start > 1]
+        if singles:
+            terms.append(f"{field_name} in {singles}")
+        return " or ".join(terms) if terms else f"{field_name} in []"
+
+
+def get_milvus_uri_and_token():
+    """uri and token of the milvus under test from the test params"""
+    if cf.param_info.param_uri:
+        uri = cf.param_info.param_uri
+    else:
+        uri = "http://" + cf.param_info.param_host + ":" + str(cf.param_info.param_port)
+    if cf.param_info.param_token:
+        token = cf.param_info.param_token
+    else:
+        token = f"{cf.param_info.param_user}:{cf.param_info.param_password}"
+    return uri, token
+
+
+# (json path, cast type) of the json path indexes of every json field
+JSON_PATH_INDEXES = (("name", "varchar"), ("address", "varchar"), ("count", "double"))
+
+
+def get_checker_index_params(schema):
+    """(field name, index params) of every index of a checker collection, in creation order"""
+    index_params = [(f, {"index_type": "INVERTED"}) for f in cf.get_scalar_field_name_list(schema=schema)]
+    for f in cf.get_json_field_name_list(schema=schema):
+        for path, cast_type in JSON_PATH_INDEXES:
+            index_params.append((f, {"index_type": "INVERTED",
+                                     "params": {"json_path": f"{f}['{path}']", "json_cast_type": cast_type}}))
+    index_params += [(f, constants.DEFAULT_INDEX_PARAM) for f in cf.get_float_vec_field_name_list(schema=schema)]
+    index_params += [(f, constants.DEFAULT_INT8_INDEX_PARAM) for f in cf.get_int8_vec_field_name_list(schema=schema)]
+    index_params += [(f, constants.DEFAULT_BINARY_INDEX_PARAM)
+                     for f in cf.get_binary_vec_field_name_list(schema=schema)]
+    index_params += [(f, constants.DEFAULT_BM25_INDEX_PARAM) for f in cf.get_bm25_vec_field_name_list(schema=schema)]
+    return index_params
+
+
+def gen_checker_rows(schema, nb, scale, text_match_field_names=()):
+    """
+    rows of a checker insert, the pks are allocated from the shared timestamp id allocator and the text
+    match fields hold a generated corpus
+
+    Returns:
+        (rows, word frequency of the corpus)
+    """
+    data = cf.gen_row_data_by_schema(nb=nb, schema=schema)
+    int64_field_name = cf.get_int64_field_name(schema=schema)
+    for row, pk in zip(data, get_id_allocator(scale).alloc(nb)):
+        row[int64_field_name] = pk
+    word_freq = Counter()
+    for text_field in text_match_field_names:
+        rows = [row for row in data if row.get(text_field) is not None]
+        if not rows:
+            continue
+        # the generated corpus knows its exact word frequency, no need to tokenize it again
+        corpus = cf.gen_text_corpus(len(rows))
+        for row, text in zip(rows, corpus.texts):
+            row[text_field] = text
+        word_freq.update(corpus.term_frequency())
+    return data, word_freq
 
 
 class ResultAnalyzer:
+    """
+    Success rate and latency of the recorded requests, per operation and per chaos stage.
+
+    The records are typed columns (start_time datetime, time_cost float seconds, result bool), every
+    statistic is a single groupby aggregation over all the records, so a long run with millions of
+    requests is analyzed in seconds. Stages are before_chaos (< create_time), during_chaos
+    (create_time ~ delete_time) and after_chaos (> recovery_time) of the chaos info, the records
+    between delete_time and recovery_time belong to no stage. Without chaos info all the records are
+    before_chaos.
+    """
 
-    def __init__(self):
-        rr = RequestRecords()
-        df = rr.get_records_df()
-        df["start_time"] = pd.to_datetime(df["start_time"])
-        df = df.sort_values(by='start_time')
+    stages = ["before_chaos", "during_chaos", "after_chaos"]
+
+    def __init__(self, df=None, chaos_info=None):
+        """
+        Args:
+            df: Request records, default to the records of RequestRecords
+            chaos_info: create_time, delete_time and recovery_time of the chaos, default to get_chaos_info()
+        """
+        if df is None:
+            df = RequestRecords().get_records_df()
+            df["start_time"] = ns_to_local_datetime(df["start_time"])
         self.df = df
-        self.chaos_info = get_chaos_info()
+        self.chaos_info = get_chaos_info() if chaos_info is None else chaos_info
         self.chaos_start_time = self.chaos_info['create_time'] if self.chaos_info is not None else None
         self.chaos_end_time = self.chaos_info['delete_time'] if self.chaos_info is not None else None
         self.recovery_time = self.chaos_info['recovery_time'] if self.chaos_info is not None else None
 
-    def get_stage_success_rate(self):
-        df = self.df
-        window = pd.offsets.Milli(1000)
-
-        result = df.groupby([pd.Grouper(key='start_time', freq=window), 'operation_name']).apply(lambda x: pd.Series({
-            'success_count': x[x['result'] == 'True'].shape[0],
-            'failed_count': x[x['result'] == 'False'].shape[0]
-        }))
-        data = result.reset_index()
-        data['success_rate'] = data['success_count'] / (data['success_count'] + data['failed_count']).replace(0, 1)
-        grouped_data = data.groupby('operation_name')
+    def get_stages(self) -> pd.Categorical:
+        """stage of every record"""
+        t = self.df["start_time"]
         if self.chaos_info is None:
-            chaos_start_time = datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S.%f')
-            chaos_end_time = datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S.%f')
-            recovery_time = datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S.%f')
+            codes = np.zeros(len(t), dtype=np.int8)
         else:
-            chaos_start_time = self.chaos_info['create_time']
-            chaos_end_time = self.chaos_info['delete_time']
-            recovery_time = self.chaos_info['recovery_time']
+            start, end, recovery = (pd.Timestamp(x) for x in (self.chaos_start_time, self.chaos_end_time,
+                                                              self.recovery_time))
+            codes = np.select([t < start, (t >= start) & (t <= end), t > recovery], [0, 1, 2], default=-1)
+        return pd.Categorical.from_codes(codes, categories=self.stages)
+
+    def get_stage_stats(self) -> pd.DataFrame:
+        """
+        Returns:
+            DataFrame: indexed by (operation_name, stage), columns total, success_count, failed_count,
+                success_rate and the p50 / p99 / max latency in seconds
+        """
+        df = self.df
+        grouped = df.groupby([df["operation_name"], self.get_stages()], observed=True)
+        stats = grouped["result"].agg(total="size", success_count="sum")
+        stats["failed_count"] = stats["total"] - stats["success_count"]
+        stats["success_rate"] = stats["success_count"] / stats["total"]
+        latency = grouped["time_cost"]
+        stats["p50"] = latency.quantile(0.5)
+        stats["p99"] = latency.quantile(0.99)
+        stats["max"] = latency.max()
+        stats.index.names = ["operation_name", "stage"]
+        return stats
+
+    def get_stage_success_rate(self, stats=None):
+        stats = self.get_stage_stats() if stats is None else stats
         stage_success_rate = {}
-        for name, group in grouped_data:
-            log.info(f"operation_name: {name}")
-            # spilt data to 3 parts by chaos start time and chaos end time and aggregate the success rate
-            data_before_chaos = group[group['start_time'] < chaos_start_time].agg(
-                {'success_rate': 'mean', 'failed_count': 'sum', 'success_count': 'sum'})
-            data_during_chaos = group[
-                (group['start_time'] >= chaos_start_time) & (group['start_time'] <= chaos_end_time)].agg(
-                {'success_rate': 'mean', 'failed_count': 'sum', 'success_count': 'sum'})
-            data_after_chaos = group[group['start_time'] > recovery_time].agg(
-                {'success_rate': 'mean', 'failed_count': 'sum', 'success_count': 'sum'})
-            stage_success_rate[name] = {
-                'before_chaos': f"{data_before_chaos['success_rate']}({data_before_chaos['success_count']}/{data_before_chaos['success_count'] + data_before_chaos['failed_count']})" if not data_before_chaos.empty else "no data",
-                'during_chaos': f"{data_during_chaos['success_rate']}({data_during_chaos['success_count']}/{data_during_chaos['success_count'] + data_during_chaos['failed_count']})" if not data_during_chaos.empty else "no data",
-                'after_chaos': f"{data_after_chaos['success_rate']}({data_after_chaos['success_count']}/{data_after_chaos['success_count'] + data_after_chaos['failed_count']})" if not data_after_chaos.empty else "no data",
-            }
+        for name in stats.index.get_level_values("operation_name").unique():
+            op_stats = stats.loc[name]
+            stage_success_rate[name] = {}
+            for stage in self.stages:
+                if stage not in op_stats.index:
+                    stage_success_rate[name][stage] = "no data"
+                    continue
+                r = op_stats.loc[stage]
+                stage_success_rate[name][stage] = f"{r['success_rate']}({int(r['success_count'])}/{int(r['total'])})"
         log.info(f"stage_success_rate: {stage_success_rate}")
         return stage_success_rate
 
     def get_realtime_success_rate(self, interval=10):
+        """success rate of every interval seconds window, grouped by operation_name"""
         df = self.df
         window = pd.offsets.Second(interval)
-        result = df.groupby([pd.Grouper(key='start_time', freq=window), 'operation_name']).apply(lambda x: pd.Series({
-            'success_count': x[x['result'] == 'True'].shape[0],
-            'failed_count': x[x['result'] == 'False'].shape[0]
-        }))
-        data = result.reset_index()
-        data['success_rate'] = data['success_count'] / (data['success_count'] + data['failed_count']).replace(0, 1)
+        data = df.groupby([pd.Grouper(key='start_time', freq=window), 'operation_name'])["result"].agg(
+            success_count="sum", total="size").reset_index()
+        data['failed_count'] = data['total'] - data['success_count']
+        data['success_rate'] = data['success_count'] / data['total'].replace(0, 1)
         grouped_data = data.groupby('operation_name')
         return grouped_data
 
+    def get_recovery_time(self, window=1, rolling=5, threshold=0.9):
+        """
+        Estimate the recovery time of every operation from the chaos start: the success rate is computed
+        per window seconds and smoothed over the trailing `rolling` windows. The last smoothed window below
+        threshold lags the failures by up to rolling - 1 windows, so the operation is recovered after the
+        last window with failures within it
+
+        Returns:
+            Dict: operation_name -> seconds from the chaos start, 0 if the operation was never degraded,
+                None without chaos info or records after the chaos start
+        """
+        ops = self.df["operation_name"].unique()
+        if self.chaos_info is None:
+            return {op: None for op in ops}
+        start = pd.Timestamp(self.chaos_start_time)
+        df = self.df[self.df["start_time"] >= start]
+        bins = ((df["start_time"] - start) // pd.Timedelta(seconds=window)).astype(np.int64)
+        counts = df.groupby([df["operation_name"], bins])["result"].agg(success="sum", total="size")
+        recovery = {op: None for op in ops}
+        for op, op_counts in counts.groupby(level=0):
+            # every window from the chaos start, the ones without requests included, so the rolling
+            # sums span `rolling` windows instead of `rolling` rows
+            op_counts = op_counts.droplevel(0)
+            op_counts = op_counts.reindex(np.arange(op_counts.index.max() + 1), fill_value=0)
+            smoothed = op_counts.rolling(rolling, min_periods=1).sum()
+            degraded = np.flatnonzero((smoothed["success"] / smoothed["total"] < threshold).to_numpy())
+            if len(degraded) == 0:
+                recovery[op] = 0.0
+                continue
+            last = degraded[-1]
+            failed = (op_counts["total"] - op_counts["success"]).to_numpy()
+            in_window = np.arange(max(0, last - rolling + 1), last + 1)
+            recovery[op] = float((in_window[failed[in_window] > 0][-1] + 1) * window)
+        log.info(f"recovery time from the chaos start: {recovery}")
+        return recovery
+
     def show_result_table(self):
         table = PrettyTable()
         table.field_names = ['operation_name', 'before_chaos',
                              f'during_chaos: {self.chaos_start_time}~{self.recovery_time}',
-                             'after_chaos']
-        data = self.get_stage_success_rate()
+                             'after_chaos', 'p50/p99 before(s)', 'p50/p99 during(s)', 'p50/p99 after(s)',
+                             'recovery(s)']
+        stats = self.get_stage_stats()
+        data = self.get_stage_success_rate(stats)
+        recovery = self.get_recovery_time()
         for operation, values in data.items():
-            row = [operation, values['before_chaos'], values['during_chaos'], values['after_chaos']]
+            latencies = []
+            for stage in self.stages:
+                if (operation, stage) in stats.index:
+                    r = stats.loc[(operation, stage)]
+                    latencies.append(f"{r['p50']:.3f}/{r['p99']:.3f}")
+                else:
+                    latencies.append("no data")
+            row = [operation, values['before_chaos'], values['during_chaos'], values['after_chaos'],
+                   *latencies, recovery.get(operation)]
             table.add_row(row)
-        log.info(f"succ rate for operations in different stage\n{table}")
+        log.info(f"succ rate and latency for operations in different stage\n{table}")
 
 
 class Op(Enum):
@@ -260,6 +476,7 @@ def trace(fmt=DEFAULT_FMT, prefix='test', flag=True):
         def inner_wrapper(self, *args, **kwargs):
             start_time = datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S.%f')
             start_time_ts = time.time()
+            start_time_ns = time.time_ns()
             t0 = time.perf_counter()
             res, result = func(self, *args, **kwargs)
             elapsed = time.perf_counter() - t0
@@ -271,24 +488,13 @@ def trace(fmt=DEFAULT_FMT, prefix='test', flag=True):
                 # TODO: add report function in this place, like uploading to influxdb
                 try:
                     t0 = time.perf_counter()
-                    request_records.insert(operation_name, collection_name, start_time, elapsed, str(result))
+                    request_records.insert(operation_name, collection_name, start_time_ns, elapsed, result)
                     tt = time.perf_counter() - t0
                     log.debug(f"insert request record cost {tt}s")
                 except Exception as e:
                     log.error(e)
                 log.debug(log_str)
-            if result:
-                self.rsp_times.append(elapsed)
-                self.average_time = (
-                                            elapsed + self.average_time * self._succ) / (self._succ + 1)
-                self._succ += 1
-                # add first success record if there is no success record before
-                if len(self.fail_records) > 0 and self.fail_records[-1][0] == "failure" and \
-                        self._succ + self._fail == self.fail_records[-1][1] + 1:
-                    self.fail_records.append(("success", self._succ + self._fail, start_time, start_time_ts))
-            else:
-                self._fail += 1
-                self.fail_records.append(("failure", self._succ + self._fail, start_time, start_time_ts))
+            self.record_result(result, elapsed, start_time, start_time_ts)
             return res, result
 
         return inner_wrapper
@@ -324,7 +530,7 @@ def exception_handler():
     return wrapper
 
 
-class Checker:
+class Checker(CheckerStats):
     """
     A base class of milvus operation checker to
        a. check whether milvus is servicing
@@ -333,13 +539,9 @@ class Checker:
 
     def __init__(self, collection_name=None, partition_name=None, shards_num=2, dim=ct.default_dim, insert_data=True,
                  schema=None, replica_number=1, **kwargs):
-        self.recovery_time = 0
-        self._succ = 0
-        self._fail = 0
-        self.fail_records = []
+        self.init_stats()
+        self.freshness = None
         self._keep_running = True
-        self.rsp_times = []
-        self.average_time = 0
         self.scale = 1 * 10 ** 6
         self.files = []
         self.word_freq = Counter()
@@ -349,15 +551,7 @@ class Checker:
         self.c_wrap = ApiCollectionWrapper()
         self.p_wrap = ApiPartitionWrapper()
         self.utility_wrap = ApiUtilityWrapper()
-        if cf.param_info.param_uri:
-            uri = cf.param_info.param_uri
-        else:
-            uri = "http://" + cf.param_info.param_host + ":" + str(cf.param_info.param_port)
-        
-        if cf.param_info.param_token:
-            token = cf.param_info.param_token
-        else:
-            token = f"{cf.param_info.param_user}:{cf.param_info.param_password}"
+        uri, token = get_milvus_uri_and_token()
         self.milvus_client = MilvusClient(uri=uri, token=token)
         c_name = collection_name if collection_name is not None else cf.gen_unique_str(
             'Checker_')
@@ -391,70 +585,12 @@ class Checker:
         # get index of collection
         indexes = [index.to_dict() for index in self.c_wrap.indexes]
         indexed_fields = [index['field'] for index in indexes]
-        # create index for scalar fields
-        for f in self.scalar_field_names:
-            if f in indexed_fields:
-                continue
-            self.c_wrap.create_index(f,
-                                     {"index_type": "INVERTED"},
-                                     timeout=timeout,
-                                     enable_traceback=enable_traceback,
-                                     check_task=CheckTasks.check_nothing)
-        # create index for json fields
-        for f in self.json_field_names:
-            if f in indexed_fields:
-                continue
-            self.c_wrap.create_index(f,
-                                    {"index_type": "INVERTED",
-                                    "params": {"json_path": f"{f}['name']", "json_cast_type": "varchar"}},
-                                    timeout=timeout,
-                                    enable_traceback=enable_traceback,
-                                    check_task=CheckTasks.check_nothing)
-            self.c_wrap.create_index(f,
-                                    {"index_type": "INVERTED",
-                                    "params": {"json_path": f"{f}['address']", "json_cast_type": "varchar"}},
-                                    timeout=timeout,
-                                    enable_traceback=enable_traceback,
-                                    check_task=CheckTasks.check_nothing)
-            self.c_wrap.create_index(f,
-                                    {"index_type": "INVERTED",
-                                    "params": {"json_path": f"{f}['count']", "json_cast_type": "double"}},
-                                    timeout=timeout,
-                                    enable_traceback=enable_traceback,
-                                    check_task=CheckTasks.check_nothing)   
-        # create index for float vector fields
-        for f in self.float_vector_field_names:
-            if f in indexed_fields:
-                continue
-            self.c_wrap.create_index(f,
-                                     constants.DEFAULT_INDEX_PARAM,
-                                     timeout=timeout,
-                                     enable_traceback=enable_traceback,
-                                     check_task=CheckTasks.check_nothing)
-        # create index for int8 vector fields
-        for f in self.int8_vector_field_names:
-            if f in indexed_fields:
-                continue
-            self.c_wrap.create_index(f,
-                                     constants.DEFAULT_INT8_INDEX_PARAM,
-                                     timeout=timeout,
-                                     enable_traceback=enable_traceback,
-                                     check_task=CheckTasks.check_nothing)
-        # create index for binary vector fields
-        for f in self.binary_vector_field_names:
-            if f in indexed_fields:
-                continue
-            self.c_wrap.create_index(f,
-                                     constants.DEFAULT_BINARY_INDEX_PARAM,
-                                     timeout=timeout,
-                                     enable_traceback=enable_traceback,
-                                     check_task=CheckTasks.check_nothing)
-
-        for f in self.bm25_sparse_field_names:
+        # create the scalar, json path and vector indexes the collection misses
+        for f, index_param in get_checker_index_params(schema):
             if f in indexed_fields:
                 continue
             self.c_wrap.create_index(f,
-                                     constants.DEFAULT_BM25_INDEX_PARAM,
+                                     index_param,
                                      timeout=timeout,
                                      enable_traceback=enable_traceback,
                                      check_task=CheckTasks.check_nothing)
@@ -478,20 +614,8 @@ class Checker:
         partition_name = self.p_name if partition_name is None else partition_name
         client_schema = self.milvus_client.describe_collection(collection_name=self.c_name)
         client_schema = CollectionSchema.construct_from_dict(client_schema)
-        data = cf.gen_row_data_by_schema(nb=nb, schema=client_schema)
-        ts_data = []
-        for i in range(nb):
-            time.sleep(0.001)
-            offset_ts = int(time.time() * self.scale)
-            ts_data.append(offset_ts)
-        for i in range(nb):
-            data[i][self.int64_field_name] = ts_data[i]
-        df = pd.DataFrame(data)
-        for text_field in self.text_match_field_name_list:
-            if text_field in df.columns:
-                texts = df[text_field].tolist()
-                wf = cf.analyze_documents(texts)
-                self.word_freq.update(wf)
+        data, word_freq = gen_checker_rows(client_schema, nb, self.scale, self.text_match_field_name_list)
+        self.word_freq.update(word_freq)
 
         try:
             res = self.milvus_client.insert(
@@ -505,30 +629,16 @@ class Checker:
         except Exception as e:
             return str(e), False
 
-    def total(self):
-        return self._succ + self._fail
-
-    def succ_rate(self):
-        return self._succ / self.total() if self.total() != 0 else 0
-
     def check_result(self):
-        succ_rate = self.succ_rate()
-        total = self.total()
-        rsp_times = self.rsp_times
-        average_time = 0 if len(rsp_times) == 0 else sum(
-            rsp_times) / len(rsp_times)
-        max_time = 0 if len(rsp_times) == 0 else max(rsp_times)
-        min_time = 0 if len(rsp_times) == 0 else min(rsp_times)
-        checker_name = self.__class__.__name__
-        checkers_result = f"{checker_name}, succ_rate: {succ_rate:.2f}, total: {total:03d}, average_time: {average_time:.4f}, max_time: {max_time:.4f}, min_time: {min_time:.4f}"
-        log.info(checkers_result)
-        log.debug(f"{checker_name} rsp times: {self.rsp_times}")
-        if len(self.fail_records) > 0:
-            log.info(f"{checker_name} failed at {self.fail_records}")
+        checkers_result = super().check_result()
+        if self.freshness is not None:
+            log.info(f"{self.__class__.__name__} freshness: {self.freshness.summary()}")
         return checkers_result
 
     def terminate(self):
         self._keep_running = False
+        if self.freshness is not None:
+            self.freshness.close()
         self.reset()
 
     def pause(self):
@@ -540,23 +650,24 @@ class Checker:
         time.sleep(10)
 
     def reset(self):
-        self._succ = 0
-        self._fail = 0
-        self.rsp_times = []
-        self.fail_records = []
-        self.average_time = 0
-
-    def get_rto(self):
-        if len(self.fail_records) == 0:
-            return 0
-        end = self.fail_records[-1][3]
-        start = self.fail_records[0][3]
-        recovery_time = end - start  # second
-        self.recovery_time = recovery_time
-        checker_name = self.__class__.__name__
-        log.info(f"{checker_name} recovery time is {self.recovery_time}, start at {self.fail_records[0][2]}, "
-                 f"end at {self.fail_records[-1][2]}")
-        return recovery_time
+        super().reset()
+        if self.freshness is not None:
+            self.freshness.reset()
+
+    def query_pks(self, expr):
+        """rows of the pks matching expr, the query of the freshness polls"""
+        res, result = self.c_wrap.query(expr, timeout=query_timeout,
+                                        output_fields=[self.int64_field_name],
+                                        check_task=CheckTasks.check_nothing)
+        if not result:
+            raise Exception(str(res))
+        return res
+
+    def track_freshness(self, schedule=None):
+        """start measuring the time-to-visible of the writes passed to self.freshness.track"""
+        self.freshness = FreshnessTracker(self.query_pks, self.int64_field_name, schedule=schedule,
+                                          name=f"{self.__class__.__name__}_freshness")
+        return self.freshness
 
     def prepare_bulk_insert_data(self,
                                  nb=constants.ENTITIES_FOR_BULKINSERT,
@@ -849,27 +960,20 @@ class InsertFlushChecker(Checker):
                     check_task=CheckTasks.check_nothing)
             t1 = time.time()
             if not self._flush:
+                self.stats.record(t1 - t0, success=bool(insert_result))
                 if insert_result:
-                    self.rsp_times.append(t1 - t0)
-                    self.average_time = ((t1 - t0) + self.average_time * self._succ) / (self._succ + 1)
-                    self._succ += 1
                     log.debug(f"insert success, time: {t1 - t0:.4f}, average_time: {self.average_time:.4f}")
-                else:
-                    self._fail += 1
                 sleep(constants.WAIT_PER_OP / 10)
             else:
                 # call flush in property num_entities
                 t0 = time.time()
                 num_entities = self.c_wrap.num_entities
                 t1 = time.time()
-                if num_entities == (self.initial_entities + constants.DELTA_PER_INS):
-                    self.rsp_times.append(t1 - t0)
-                    self.average_time = ((t1 - t0) + self.average_time * self._succ) / (self._succ + 1)
-                    self._succ += 1
+                flushed = num_entities == (self.initial_entities + constants.DELTA_PER_INS)
+                self.stats.record(t1 - t0, success=flushed)
+                if flushed:
                     log.debug(f"flush success, time: {t1 - t0:.4f}, average_time: {self.average_time:.4f}")
                     self.initial_entities += constants.DELTA_PER_INS
-                else:
-                    self._fail += 1
                 sleep(constants.WAIT_PER_OP * 6)
 
 
@@ -946,7 +1050,7 @@ class AddFieldChecker(Checker):
 class InsertChecker(Checker):
     """check insert operations in a dependent thread"""
 
-    def __init__(self, collection_name=None, flush=False, shards_num=2, schema=None):
+    def __init__(self, collection_name=None, flush=False, shards_num=2, schema=None, track_freshness=False):
         if collection_name is None:
             collection_name = cf.gen_unique_str("InsertChecker_")
         super().__init__(collection_name=collection_name, shards_num=shards_num, schema=schema)
@@ -954,20 +1058,19 @@ class InsertChecker(Checker):
         self.initial_entities = self.c_wrap.collection.num_entities
         self.inserted_data = []
         self.scale = 1 * 10 ** 6
-        self.start_time_stamp = int(time.time() * self.scale)  # us
+        self.start_time_stamp = get_id_allocator(self.scale).peek()  # us
         self.term_expr = f'{self.int64_field_name} >= {self.start_time_stamp}'
         self.file_name = f"/tmp/ci_logs/insert_data_{uuid.uuid4()}.parquet"
+        if track_freshness:
+            # the freshness of the insert load itself, polled without waiting for it
+            self.track_freshness()
 
     @trace()
     def insert_entities(self):
         schema = self.get_schema()
         data = cf.gen_row_data_by_schema(nb=constants.DELTA_PER_INS, schema=schema)
         rows = len(data)
-        ts_data = []
-        for i in range(constants.DELTA_PER_INS):
-            time.sleep(0.001)
-            offset_ts = int(time.time() * self.scale)
-            ts_data.append(offset_ts)
+        ts_data = get_id_allocator(self.scale).alloc(rows)
 
         for i in range(rows):
             data[i][self.int64_field_name] = ts_data[i]
@@ -978,6 +1081,8 @@ class InsertChecker(Checker):
                                          timeout=timeout,
                                          enable_traceback=enable_traceback,
                                          check_task=CheckTasks.check_nothing)
+        if result and self.freshness is not None:
+            self.freshness.track([ts_data[-1]])
         return res, result
 
     @exception_handler()
@@ -1002,7 +1107,7 @@ class InsertChecker(Checker):
         except Exception as e:
             log.error(f"create index error: {e}")
         self.c_wrap.load()
-        end_time_stamp = int(time.time() * self.scale)
+        end_time_stamp = get_id_allocator(self.scale).peek()
         self.term_expr = f'{self.int64_field_name} >= {self.start_time_stamp} and ' \
                          f'{self.int64_field_name} <= {end_time_stamp}'
         data_in_client = []
@@ -1024,8 +1129,9 @@ class InsertChecker(Checker):
 class InsertFreshnessChecker(Checker):
     """check insert freshness operations in a dependent thread"""
 
-    def __init__(self, collection_name=None, flush=False, shards_num=2, schema=None):
+    def __init__(self, collection_name=None, flush=False, shards_num=2, schema=None, poll_schedule=None):
         self.latest_data = None
+        self.pending_write = None
         if collection_name is None:
             collection_name = cf.gen_unique_str("InsertChecker_")
         super().__init__(collection_name=collection_name, shards_num=shards_num, schema=schema)
@@ -1033,20 +1139,17 @@ class InsertFreshnessChecker(Checker):
         self.initial_entities = self.c_wrap.collection.num_entities
         self.inserted_data = []
         self.scale = 1 * 10 ** 6
-        self.start_time_stamp = int(time.time() * self.scale)  # us
+        self.start_time_stamp = get_id_allocator(self.scale).peek()  # us
         self.term_expr = f'{self.int64_field_name} >= {self.start_time_stamp}'
         self.file_name = f"/tmp/ci_logs/insert_data_{uuid.uuid4()}.parquet"
+        self.track_freshness(poll_schedule)
 
     def insert_entities(self):
         schema = self.get_schema()
         data = cf.gen_row_data_by_schema(nb=constants.DELTA_PER_INS, schema=schema)
-        ts_data = []
-        for i in range(constants.DELTA_PER_INS):
-            time.sleep(0.001)
-            offset_ts = int(time.time() * self.scale)
-            ts_data.append(offset_ts)
-
-        data[0] = ts_data  # set timestamp (ms) as int64
+        ts_data = get_id_allocator(self.scale).alloc(constants.DELTA_PER_INS)
+        for row, pk in zip(data, ts_data):
+            row[self.int64_field_name] = pk  # set timestamp (us) as int64
         log.debug(f"insert data: {len(ts_data)}")
         res, result = self.c_wrap.insert(data=data,
                                          partition_names=self.p_names,
@@ -1055,17 +1158,15 @@ class InsertFreshnessChecker(Checker):
                                          check_task=CheckTasks.check_nothing)
         self.latest_data = ts_data[-1]
         self.term_expr = f'{self.int64_field_name} == {self.latest_data}'
+        self.pending_write = self.freshness.track([self.latest_data]) if result else None
         return res, result
 
     @trace()
     def insert_freshness(self):
-        while True:
-            res, result = self.c_wrap.query(self.term_expr, timeout=timeout,
-                                            output_fields=[f'{self.int64_field_name}'],
-                                            check_task=CheckTasks.check_nothing)
-            if len(res) == 1 and res[0][f"{self.int64_field_name}"] == self.latest_data:
-                break
-        return res, result
+        if self.pending_write is None:
+            return None, False
+        visible = self.pending_write.wait()
+        return self.pending_write.latency, visible
 
     @exception_handler()
     def run_task(self):
@@ -1121,14 +1222,16 @@ class UpsertChecker(Checker):
 class UpsertFreshnessChecker(Checker):
     """check upsert freshness operations in a dependent thread"""
 
-    def __init__(self, collection_name=None, shards_num=2, schema=None):
+    def __init__(self, collection_name=None, shards_num=2, schema=None, poll_schedule=None):
         self.term_expr = None
         self.latest_data = None
+        self.pending_write = None
         if collection_name is None:
             collection_name = cf.gen_unique_str("UpsertChecker_")
         super().__init__(collection_name=collection_name, shards_num=shards_num, schema=schema)
         schema = self.get_schema()
         self.data = cf.gen_row_data_by_schema(nb=constants.DELTA_PER_INS, schema=schema)
+        self.track_freshness(poll_schedule)
 
     def upsert_entities(self):
 
@@ -1140,27 +1243,25 @@ class UpsertFreshnessChecker(Checker):
 
     @trace()
     def upsert_freshness(self):
-        while True:
-            res, result = self.c_wrap.query(self.term_expr, timeout=timeout,
-                                            output_fields=[f'{self.int64_field_name}'],
-                                            check_task=CheckTasks.check_nothing)
-            if len(res) == 1 and res[0][f"{self.int64_field_name}"] == self.latest_data:
-                break
-        return res, result
+        if self.pending_write is None:
+            return None, False
+        visible = self.pending_write.wait()
+        return self.pending_write.latency, visible
 
     @exception_handler()
     def run_task(self):
         # half of the data is upsert, the other half is insert
-        rows = len(self.data[0])
-        pk_old = self.data[0][:rows // 2]
+        rows = len(self.data)
+        pk_old = [d[self.int64_field_name] for d in self.data[:rows // 2]]
         schema = self.get_schema()
         self.data = cf.gen_row_data_by_schema(nb=constants.DELTA_PER_INS, schema=schema)
-        pk_new = self.data[0][rows // 2:]
-        pk_update = pk_old + pk_new
-        self.data[0] = pk_update
-        self.latest_data = self.data[0][-1]
+        pk_new = [d[self.int64_field_name] for d in self.data[rows // 2:]]
+        for row, pk in zip(self.data, pk_old + pk_new):
+            row[self.int64_field_name] = pk
+        self.latest_data = self.data[-1][self.int64_field_name]
         self.term_expr = f'{self.int64_field_name} == {self.latest_data}'
         res, result = self.upsert_entities()
+        self.pending_write = self.freshness.track([self.latest_data]) if result else None
         res, result = self.upsert_freshness()
         return res, result
 
@@ -1629,7 +1730,56 @@ class JsonQueryChecker(Checker):
             sleep(constants.WAIT_PER_OP / 10)
 
 
-class DeleteChecker(Checker):
+class DeleteCheckerBase(Checker):
+    """
+    base of the delete checkers: the ids to delete are taken from a client side IdRangePool, fed by every
+    insert of the checker, the collection is only queried for its ids at the start and the end
+    """
+
+    def __init__(self, collection_name=None, schema=None, **kwargs):
+        # fed by every insert of the checker, including the ones of Checker.__init__
+        self.id_pool = IdRangePool()
+        self.delete_batch = []
+        super().__init__(collection_name=collection_name, schema=schema, **kwargs)
+
+    def init_id_pool(self):
+        """insert more ids to delete and reconcile the pool, once the collection is loaded"""
+        self.insert_data()
+        self.query_expr = f'{self.int64_field_name} > 0'
+        self.reconcile_ids()
+        self.delete_expr = IdRangePool.to_expr(self.int64_field_name, self.delete_batch)
+
+    def insert_data(self, nb=constants.DELTA_PER_INS, partition_name=None):
+        res, result = super().insert_data(nb=nb, partition_name=partition_name)
+        if result and partition_name in (None, self.p_name):
+            self.id_pool.add(res["ids"])
+        return res, result
+
+    def reconcile_ids(self):
+        """replace the id pool by the ids in the partition, the full query runs only at the start and the end"""
+        res, _ = self.c_wrap.query(self.query_expr,
+                                   output_fields=[self.int64_field_name],
+                                   partition_name=self.p_name)
+        ids = [r[self.int64_field_name] for r in res]
+        log.info(f"{self.__class__.__name__} reconciled {len(ids)} ids in {self.c_name}, "
+                 f"{len(self.id_pool)} ids in the pool")
+        self.id_pool.reset(ids)
+
+    def delete_entities(self):
+        res, result = self.c_wrap.delete(expr=self.delete_expr, timeout=timeout, partition_name=self.p_name)
+        return res, result
+
+    def keep_running(self):
+        while self._keep_running:
+            self.run_task()
+            sleep(constants.WAIT_PER_OP)
+        try:
+            self.reconcile_ids()
+        except Exception as e:
+            log.error(f"{self.__class__.__name__} reconcile ids failed: {e}")
+
+
+class DeleteChecker(DeleteCheckerBase):
     """check delete operations in a dependent thread"""
 
     def __init__(self, collection_name=None, schema=None, shards_num=2):
@@ -1642,54 +1792,35 @@ class DeleteChecker(Checker):
                                                enable_traceback=enable_traceback,
                                                check_task=CheckTasks.check_nothing)
         self.c_wrap.load()  # load before query
-        self.insert_data()
-        query_expr = f'{self.int64_field_name} > 0'
-        res, _ = self.c_wrap.query(query_expr,
-                                   output_fields=[self.int64_field_name],
-                                   partition_name=self.p_name)
-        self.ids = [r[self.int64_field_name] for r in res]
-        self.query_expr = query_expr
-        delete_ids = self.ids[:len(self.ids) // 2]  # delete half of ids
-        self.delete_expr = f'{self.int64_field_name} in {delete_ids}'
+        self.init_id_pool()
 
     def update_delete_expr(self):
-        res, _ = self.c_wrap.query(self.query_expr,
-                                   output_fields=[self.int64_field_name],
-                                   partition_name=self.p_name)
-        all_ids = [r[self.int64_field_name] for r in res]
-        if len(all_ids) < 100:
+        if len(self.id_pool) < 100:
             # insert data to make sure there are enough ids to delete
             self.insert_data(nb=10000)
-            res, _ = self.c_wrap.query(self.query_expr,
-                                       output_fields=[self.int64_field_name],
-                                       partition_name=self.p_name)
-            all_ids = [r[self.int64_field_name] for r in res]
-        delete_ids = all_ids[:3000]  # delete 3000 ids
-        self.delete_expr = f'{self.int64_field_name} in {delete_ids}'
+        self.delete_batch = self.id_pool.take(3000)  # delete 3000 ids
+        self.delete_expr = IdRangePool.to_expr(self.int64_field_name, self.delete_batch)
 
     @trace()
     def delete_entities(self):
-        res, result = self.c_wrap.delete(expr=self.delete_expr, timeout=timeout, partition_name=self.p_name)
-        return res, result
+        return super().delete_entities()
 
     @exception_handler()
     def run_task(self):
         self.update_delete_expr()
         res, result = self.delete_entities()
+        if not result:
+            self.id_pool.put_back(self.delete_batch)
         return res, result
 
-    def keep_running(self):
-        while self._keep_running:
-            self.run_task()
-            sleep(constants.WAIT_PER_OP)
-
 
-class DeleteFreshnessChecker(Checker):
+class DeleteFreshnessChecker(DeleteCheckerBase):
     """check delete freshness operations in a dependent thread"""
 
-    def __init__(self, collection_name=None, schema=None):
+    def __init__(self, collection_name=None, schema=None, poll_schedule=None):
         if collection_name is None:
             collection_name = cf.gen_unique_str("DeleteChecker_")
+        self.pending_write = None
         super().__init__(collection_name=collection_name, schema=schema)
         res, result = self.c_wrap.create_index(self.float_vector_field_name,
                                                constants.DEFAULT_INDEX_PARAM,
@@ -1698,58 +1829,42 @@ class DeleteFreshnessChecker(Checker):
                                                enable_traceback=enable_traceback,
                                                check_task=CheckTasks.check_nothing)
         self.c_wrap.load()  # load before query
-        self.insert_data()
-        query_expr = f'{self.int64_field_name} > 0'
-        res, _ = self.c_wrap.query(query_expr,
-                                   output_fields=[self.int64_field_name],
-                                   partition_name=self.p_name)
-        self.ids = [r[self.int64_field_name] for r in res]
-        self.query_expr = query_expr
-        delete_ids = self.ids[:len(self.ids) // 2]  # delete half of ids
-        self.delete_expr = f'{self.int64_field_name} in {delete_ids}'
+        self.init_id_pool()
+        self.track_freshness(poll_schedule)
 
     def update_delete_expr(self):
-        res, _ = self.c_wrap.query(self.query_expr,
-                                   output_fields=[self.int64_field_name],
-                                   partition_name=self.p_name)
-        all_ids = [r[self.int64_field_name] for r in res]
-        if len(all_ids) < 100:
+        if len(self.id_pool) < 100:
             # insert data to make sure there are enough ids to delete
             self.insert_data(nb=10000)
-            res, _ = self.c_wrap.query(self.query_expr,
-                                       output_fields=[self.int64_field_name],
-                                       partition_name=self.p_name)
-            all_ids = [r[self.int64_field_name] for r in res]
-        delete_ids = all_ids[:len(all_ids) // 2]  # delete half of ids
-        self.delete_expr = f'{self.int64_field_name} in {delete_ids}'
-
-    def delete_entities(self):
-        res, result = self.c_wrap.delete(expr=self.delete_expr, timeout=timeout, partition_name=self.p_name)
-        return res, result
+        self.delete_batch = self.id_pool.take(len(self.id_pool) // 2)  # delete half of ids
+        self.delete_expr = IdRangePool.to_expr(self.int64_field_name, self.delete_batch)
 
     @trace()
     def delete_freshness(self):
-        while True:
-            res, result = self.c_wrap.query(self.delete_expr, timeout=timeout,
-                                            output_fields=[f'{self.int64_field_name}'],
-                                            check_task=CheckTasks.check_nothing)
-            if len(res) == 0:
-                break
-        return res, result
+        if self.pending_write is None:
+            return None, False
+        visible = self.pending_write.wait()
+        return self.pending_write.latency, visible
 
     @exception_handler()
     def run_task(self):
         self.update_delete_expr()
+        if not self.delete_batch:
+            # the pool is empty, e.g. the refill insert failed, nothing to delete this round
+            log.warning(f"{self.__class__.__name__} has no ids to delete in {self.c_name}, skip the round")
+            return None, False
         res, result = self.delete_entities()
+        if not result:
+            # nothing to wait for, the batch is deleted by a later run
+            self.id_pool.put_back(self.delete_batch)
+            return res, result
+        # every deleted id must be gone, so a partial delete is not fresh
+        self.pending_write = self.freshness.track([pk for start, end in self.delete_batch
+                                                   for pk in range(start, end)], visible=False)
         res, result = self.delete_freshness()
 
         return res, result
 
-    def keep_running(self):
-        while self._keep_running:
-            self.run_task()
-            sleep(constants.WAIT_PER_OP)
-
 
 class CompactChecker(Checker):
     """check compact operations in a dependent thread"""
@@ -1855,6 +1970,8 @@ class BulkInsertChecker(Checker):
         self.c_name = collection_name
         self.minio_endpoint = minio_endpoint
         self.bucket_name = bucket_name
+        # polls the tasks with adaptive intervals and keeps their progress for throughput report
+        self.import_tracker = ImportJobTracker(bulk_insert_state_fetcher(self.utility_wrap), max_interval=2)
 
     def prepare(self, data_size=100000):
         with RemoteBulkWriter(
@@ -1884,11 +2001,9 @@ class BulkInsertChecker(Checker):
             self.schema = schema
 
     def get_bulk_insert_task_state(self):
-        state_map = {}
-        for task_id in self.failed_tasks_id:
-            state, _ = self.utility_wrap.get_bulk_insert_state(task_id=task_id)
-            state_map[task_id] = state
-        return state_map
+        """state names of the failed tasks, all polled concurrently"""
+        self.import_tracker.poll_once(self.failed_tasks_id)
+        return self.import_tracker.states(self.failed_tasks_id)
 
     @trace()
     def bulk_insert(self):
@@ -1896,7 +2011,10 @@ class BulkInsertChecker(Checker):
         task_ids, result = self.utility_wrap.do_bulk_insert(collection_name=self.c_name,
                                                             files=self.files)
         log.info(f"task ids {task_ids}")
-        completed, result = self.utility_wrap.wait_for_bulk_insert_tasks_completed(task_ids=[task_ids], timeout=720)
+        if not result:
+            return task_ids, False
+        completed = self.import_tracker.wait([task_ids], timeout=720)
+        self.import_tracker.log_summary([task_ids])
         return task_ids, completed
 
     @exception_handler()
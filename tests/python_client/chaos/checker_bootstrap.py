@@ -0,0 +1,182 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from pymilvus import MilvusClient
+
+from base.collection_wrapper import ApiCollectionWrapper
+from chaos import constants
+from chaos.checker import (enable_traceback, gen_checker_rows, get_checker_index_params,
+                           get_milvus_uri_and_token, timeout)
+from common import common_func as cf
+from common import common_type as ct
+from common.common_type import CheckTasks
+from utils.util_log import test_log as log
+
+# timestamp scale of the seed pks, the scale Checker.__init__ inserts its seed data with
+SEED_ID_SCALE = 1 * 10 ** 6
+
+
+@dataclass
+class CheckerSpec:
+    """a checker to build: its class, its collection (None for a generated name) and its other kwargs"""
+    checker_class: type
+    collection_name: Optional[str] = None
+    kwargs: Dict = field(default_factory=dict)
+
+
+@dataclass
+class CollectionState:
+    name: str
+    schema: object = None
+    c_wrap: ApiCollectionWrapper = None
+    indexed_fields: list = field(default_factory=list)
+    num_entities: int = 0
+    status: str = "created"
+
+
+class CheckerBootstrap:
+    """
+    Prepare the collections of many checkers at once, then build the checkers.
+
+    Checker.__init__ creates the collection, its scalar, json path and vector indexes, loads it and
+    inserts the seed data one request after another, and the checkers of a test are built one after
+    another. The bootstrap does the same work in phases over all the collections: create them, create
+    all the missing indexes, insert the seed data (generated once per schema) and load them, every
+    phase on a thread pool. The checkers built afterwards find their collection ready, so
+    Checker.__init__ only opens it.
+
+    Existing collections are reused as they are, only their missing indexes and seed data are added.
+    With golden_prefix the checkers without a collection name get the fixed name
+    <golden_prefix>_<checker class>, so a session reuses the collections provisioned by a previous one
+    instead of creating new ones.
+    """
+
+    def __init__(self, golden_prefix=None, shards_num=2, replica_number=1, seed_rows=constants.ENTITIES_FOR_SEARCH,
+                 max_workers=16):
+        """
+        Args:
+            golden_prefix: Prefix of the fixed collection names of the checkers without a collection name
+            shards_num: Shards of the created collections
+            replica_number: Replicas of the loaded collections
+            seed_rows: Rows inserted into every empty collection
+            max_workers: Threads of every phase
+        """
+        self.golden_prefix = golden_prefix
+        self.shards_num = shards_num
+        self.replica_number = replica_number
+        self.seed_rows = seed_rows
+        self.max_workers = max_workers
+        uri, token = get_milvus_uri_and_token()
+        self.milvus_client = MilvusClient(uri=uri, token=token)
+        self.collections: Dict[str, CollectionState] = {}
+        self.timings = {}
+
+    def collection_name(self, spec: CheckerSpec) -> str:
+        if spec.collection_name is not None:
+            return spec.collection_name
+        if self.golden_prefix:
+            return f"{self.golden_prefix}_{spec.checker_class.__name__}"
+        return cf.gen_unique_str(f"{spec.checker_class.__name__}_")
+
+    def _map(self, func, items):
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    def _timed(self, phase, func, items):
+        t0 = time.perf_counter()
+        res = self._map(func, items)
+        self.timings[phase] = time.perf_counter() - t0
+        log.info(f"checker bootstrap {phase} of {len(res)} items cost {self.timings[phase]:.2f}s")
+        return res
+
+    def _open(self, state: CollectionState):
+        exists = self.milvus_client.has_collection(state.name)
+        c_wrap = ApiCollectionWrapper()
+        if exists:
+            c, _ = c_wrap.init_collection(state.name)
+            state.schema = c.schema
+            state.status = "golden" if self.golden_prefix and state.name.startswith(self.golden_prefix) \
+                else "reused"
+        else:
+            if state.schema is None:
+                state.schema = cf.gen_all_datatype_collection_schema(dim=ct.default_dim)
+            c_wrap.init_collection(name=state.name, schema=state.schema, shards_num=self.shards_num,
+                                   timeout=timeout, enable_traceback=enable_traceback)
+        state.c_wrap = c_wrap
+        state.indexed_fields = [index.to_dict()['field'] for index in c_wrap.indexes]
+        state.num_entities = c_wrap.num_entities if exists else 0
+
+    @staticmethod
+    def _create_index(task):
+        state, f, index_param = task
+        state.c_wrap.create_index(f, index_param, timeout=timeout, enable_traceback=enable_traceback,
+                                  check_task=CheckTasks.check_nothing)
+
+    def _seed(self, task):
+        state, rows = task
+        self.milvus_client.insert(collection_name=state.name, data=rows, timeout=timeout)
+        state.num_entities = len(rows)
+
+    def _load(self, state: CollectionState):
+        state.c_wrap.load(replica_number=self.replica_number, timeout=timeout, enable_traceback=enable_traceback)
+
+    def prepare(self, collections: Dict[str, Optional[object]]) -> Dict[str, str]:
+        """
+        Create, index, seed and load the collections
+
+        Args:
+            collections: Schema of every collection, None for the default checker schema
+
+        Returns:
+            Dict[str, str]: status of every collection, created, reused or golden
+        """
+        states = [CollectionState(name, schema) for name, schema in collections.items()
+                  if name not in self.collections]
+        self._timed("create", self._open, states)
+        index_tasks = [(state, f, index_param) for state in states
+                       for f, index_param in get_checker_index_params(state.schema)
+                       if f not in state.indexed_fields]
+        self._timed("create_index", self._create_index, index_tasks)
+        # the seed rows are generated once for all the empty collections of a schema
+        rows_by_schema = {}
+        seed_tasks = []
+        for state in states:
+            if state.num_entities != 0:
+                continue
+            key = json.dumps(state.schema.to_dict(), sort_keys=True, default=str)
+            if key not in rows_by_schema:
+                rows_by_schema[key], _ = gen_checker_rows(state.schema, self.seed_rows, SEED_ID_SCALE,
+                                                          cf.get_text_match_field_name(schema=state.schema))
+            seed_tasks.append((state, rows_by_schema[key]))
+        self._timed("insert", self._seed, seed_tasks)
+        self._timed("load", self._load, states)
+        for state in states:
+            self.collections[state.name] = state
+        res = {name: self.collections[name].status for name in collections}
+        log.info(f"checker bootstrap prepared {len(res)} collections: {res}")
+        return res
+
+    def build(self, specs: Dict[object, CheckerSpec]) -> Dict:
+        """
+        Prepare the collections of the specs, then build the checkers concurrently
+
+        Returns:
+            Dict: checkers by the keys of the specs, e.g. by Op
+        """
+        t0 = time.perf_counter()
+        names = {key: self.collection_name(spec) for key, spec in specs.items()}
+        collections = {}
+        for key, spec in specs.items():
+            collections.setdefault(names[key], spec.kwargs.get("schema"))
+        self.prepare(collections)
+        checkers = self._timed("build", lambda key: specs[key].checker_class(collection_name=names[key],
+                                                                               **specs[key].kwargs), specs)
+        self.timings["total"] = time.perf_counter() - t0
+        log.info(f"checker bootstrap built {len(specs)} checkers in {self.timings['total']:.2f}s, {self.timings}")
+        return dict(zip(specs, checkers))
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+import numpy as np
+from pymilvus import DataType, MilvusClient
+
+from chaos.checker import get_milvus_uri_and_token, timeout
+from common import common_func as cf
+from utils.util_log import test_log as log
+
+VERIFY_CACHE_FILE = "/tmp/ci_logs/chaos_verify_cache.json"
+
+
+def hash_pks(pks) -> np.ndarray:
+    """uint64 hash of every pk, splitmix64 of the int64 pks and blake2b of the varchar ones"""
+    if len(pks) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    if isinstance(pks[0], str):
+        return np.array([int.from_bytes(hashlib.blake2b(pk.encode(), digest_size=8).digest(), "little")
+                         for pk in pks], dtype=np.uint64)
+    # uint64 array arithmetic wraps around, which is the mod 2^64 of splitmix64
+    z = np.asarray(pks, dtype=np.int64).view(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+@dataclass
+class VerifyResult:
+    """
+    the verification of a collection: count and checksum of the pks streamed by the query iterator,
+    count(*) of the same collection and whether the collection could be searched
+    """
+    collection_name: str
+    signature: str = ""
+    count: int = -1
+    pk_checksum: str = ""
+    count_star: int = -1
+    searched: bool = False
+    ok: bool = False
+    error: str = ""
+    elapsed: float = 0.0
+    cached: bool = False
+
+
+class CollectionVerifier:
+    """
+    Verify many collections after chaos concurrently, skipping the ones unchanged since the last run.
+
+    Every collection is flushed, loaded if needed, then all its pks are streamed by a query iterator
+    page by page into a count and an order independent checksum (the sum of the pk hashes mod 2^64),
+    so the memory does not grow with the collection. A collection passes if the streamed count equals
+    its count(*) and it can be searched. At most max_workers collections are verified at a time, on a
+    single MilvusClient.
+
+    The results are cached in cache_file with the signature of the collection: its schema and its
+    flushed segments (ids and row counts). A rerun only verifies the collections whose signature
+    changed, or whose last verification failed. A delete without a new segment or a compaction does not
+    change the signature, force=True verifies every collection and reports a cached one whose count or
+    checksum changed under the same signature.
+    """
+
+    def __init__(self, max_workers=8, batch_size=5000, cache_file=VERIFY_CACHE_FILE, flush=True,
+                 milvus_client=None):
+        """
+        Args:
+            max_workers: Collections verified at a time
+            batch_size: Pks of one query iterator page
+            cache_file: Json file of the results by collection, None for no cache
+            flush: Flush every collection first, so the unflushed writes are in its signature
+            milvus_client: Client of the collections, default to a MilvusClient of the chaos deployment
+        """
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.cache_file = cache_file
+        self.flush = flush
+        if milvus_client is None:
+            uri, token = get_milvus_uri_and_token()
+            milvus_client = MilvusClient(uri=uri, token=token)
+        self.milvus_client = milvus_client
+        self.cache: Dict[str, Dict] = self.load_cache()
+
+    def load_cache(self) -> Dict[str, Dict]:
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            log.warning(f"ignore the verify cache {self.cache_file}: {e}")
+            return {}
+
+    def save_cache(self):
+        if not self.cache_file:
+            return
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        tmp = f"{self.cache_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.cache, f, indent=2)
+        os.replace(tmp, self.cache_file)
+
+    def signature(self, name, desc) -> str:
+        """the schema and the flushed segments of the collection"""
+        segments = sorted((s.segment_id, s.num_rows) for s in
+                          self.milvus_client.list_persistent_segments(name, timeout=timeout))
+        fields = [(f["name"], str(f["type"]), f.get("params", {})) for f in desc["fields"]]
+        key = json.dumps({"fields": fields, "segments": segments}, sort_keys=True, default=str)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def stream_pks(self, name, pk_field):
+        """count and checksum of all the pks by the query iterator"""
+        it = self.milvus_client.query_iterator(name, batch_size=self.batch_size, output_fields=[pk_field],
+                                               timeout=timeout, consistency_level="Strong")
+        count, checksum = 0, 0
+        try:
+            while True:
+                page = it.next()
+                if not page:
+                    break
+                count += len(page)
+                checksum = (checksum + int(hash_pks([r[pk_field] for r in page]).sum(dtype=np.uint64))) % 2 ** 64
+        finally:
+            it.close()
+        return count, f"{checksum:016x}"
+
+    def search_once(self, name, desc) -> bool:
+        vector_fields = [f for f in desc["fields"] if f["type"] == DataType.FLOAT_VECTOR]
+        if not vector_fields:
+            return True
+        f = vector_fields[0]
+        res = self.milvus_client.search(name, data=cf.gen_vectors(1, int(f["params"]["dim"])),
+                                        anns_field=f["name"], limit=1, timeout=timeout)
+        return len(res) == 1
+
+    def verify(self, name, force=False) -> VerifyResult:
+        """verify a collection, the cached result if its signature did not change and it passed"""
+        t0 = time.perf_counter()
+        res = VerifyResult(name)
+        try:
+            desc = self.milvus_client.describe_collection(name, timeout=timeout)
+            pk_field = [f["name"] for f in desc["fields"] if f.get("is_primary")][0]
+            if self.flush:
+                self.milvus_client.flush(name, timeout=timeout)
+            res.signature = self.signature(name, desc)
+            cached = self.cache.get(name)
+            if cached and cached["signature"] == res.signature and cached["ok"] and not force:
+                return VerifyResult(**{**cached, "cached": True, "elapsed": time.perf_counter() - t0})
+            if self.milvus_client.get_load_state(name)["state"].name != "Loaded":
+                self.milvus_client.load_collection(name, timeout=timeout)
+            res.count, res.pk_checksum = self.stream_pks(name, pk_field)
+            res.count_star = self.milvus_client.query(name, filter="", output_fields=["count(*)"], timeout=timeout,
+                                                      consistency_level="Strong")[0]["count(*)"]
+            res.searched = self.search_once(name, desc)
+            errors = []
+            if res.count != res.count_star:
+                errors.append(f"query iterator got {res.count} pks, count(*) is {res.count_star}")
+            if not res.searched:
+                errors.append("search got no result")
+            if cached and cached["signature"] == res.signature and cached["ok"] and \
+                    (cached["count"], cached["pk_checksum"]) != (res.count, res.pk_checksum):
+                errors.append(f"pks changed from {cached['count']} / {cached['pk_checksum']} "
+                              f"under the same segments")
+            res.error = "; ".join(errors)
+            res.ok = not errors
+        except Exception as e:
+            res.error = str(e)
+        res.elapsed = time.perf_counter() - t0
+        return res
+
+    def verify_all(self, collection_names: List[str], force=False) -> Dict[str, VerifyResult]:
+        """
+        Verify the collections, max_workers at a time, and cache the results
+
+        Returns:
+            Dict[str, VerifyResult]: result of every collection
+        """
+        t0 = time.perf_counter()
+        results = {}
+        names = list(dict.fromkeys(collection_names))
+        if names:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(names))) as executor:
+                futures = {executor.submit(self.verify, name, force): name for name in names}
+                for future in as_completed(futures):
+                    res = future.result()
+                    results[res.collection_name] = res
+                    log.info(f"verify {res.collection_name}: ok={res.ok} cached={res.cached} count={res.count} "
+                             f"checksum={res.pk_checksum} cost {res.elapsed:.2f}s {res.error}")
+        for name, res in results.items():
+            # the signature was computed, so the collection exists, a failure is verified again next run
+            if res.signature:
+                self.cache[name] = {k: v for k, v in asdict(res).items() if k not in ("cached", "elapsed")}
+        self.save_cache()
+        failed = [name for name, res in results.items() if not res.ok]
+        cached = sum(res.cached for res in results.values())
+        log.info(f"verified {len(results)} collections in {time.perf_counter() - t0:.2f}s, "
+                 f"{cached} unchanged since the last run, failed: {failed}")
+        return {name: results[name] for name in names}
@@ -14,6 +14,10 @@ def pytest_addoption(parser):
     parser.addoption("--wait_signal", action="store", type=bool, default=True, help="wait_signal")
     parser.addoption("--enable_import", action="store", type=bool, default=False, help="enable_import")
     parser.addoption("--collection_num", action="store", default="1", help="collection_num")
+    parser.addoption("--golden_prefix", action="store", default="",
+                     help="reuse the checker collections named <golden_prefix>_<checker>, created if missing")
+    parser.addoption("--load_level", action="store", type=float, default=1.0,
+                     help="multiplier of the request rates of the async checkers")
 
 
 @pytest.fixture
@@ -74,3 +78,13 @@ def wait_signal(request):
 @pytest.fixture
 def enable_import(request):
     return request.config.getoption("--enable_import")
+
+
+@pytest.fixture
+def load_level(request):
+    return request.config.getoption("--load_level")
+
+
+@pytest.fixture
+def golden_prefix(request):
+    return request.config.getoption("--golden_prefix") or None
@@ -0,0 +1,184 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from chaos.latency_stats import LatencyStats
+from utils.util_log import test_log as log
+
+
+@dataclass
+class PollSchedule:
+    """
+    Intervals between the visibility polls of a write: tight_polls polls every initial seconds, then
+    the interval grows by factor up to max_interval. A write still not visible after timeout seconds
+    counts as failed.
+    """
+    initial: float = 0.005
+    tight_polls: int = 10
+    factor: float = 2.0
+    max_interval: float = 1.0
+    timeout: float = 120.0
+
+    def interval(self, attempt) -> float:
+        """seconds between poll attempt and the next one"""
+        if attempt < self.tight_polls:
+            return self.initial
+        return min(self.initial * self.factor ** (attempt - self.tight_polls + 1), self.max_interval)
+
+
+class PendingWrite:
+    """a tracked write: the pks to find (visible=True) or no longer find (visible=False) and its outcome"""
+
+    def __init__(self, pks, visible, start):
+        self.pks = list(pks)
+        self.visible = visible
+        self.start = start
+        self.attempts = 0
+        self.next_poll = start
+        self.latency: Optional[float] = None
+        self.result: Optional[bool] = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None) -> bool:
+        """block until the write is seen or given up, True if it was seen"""
+        self.done.wait(timeout)
+        return bool(self.result)
+
+
+class FreshnessTracker:
+    """
+    Time-to-visible of writes, polled by one thread for any number of outstanding writes.
+
+    A write is tracked by the pks that must become visible (insert, upsert) or invisible (delete). Every
+    round the poller sends `in` queries of at most max_pks_per_poll pks for all the due writes, so tracking
+    more writes adds no requests and a large write is polled in several queries, and reschedules the writes still pending by the PollSchedule instead of
+    querying in a busy loop. The time from the write to the send time of the poll that sees it is
+    recorded in a LatencyStats, a write given up after the schedule timeout is recorded as a failure.
+    """
+
+    def __init__(self, query_func: Callable[[str], list], pk_field, schedule: Optional[PollSchedule] = None,
+                 max_pks_per_poll=1000, name="freshness"):
+        """
+        Args:
+            query_func: Query of an expression returning the rows with pk_field, raising on failure
+            pk_field: Name of the primary key field
+            schedule: Poll schedule, default to PollSchedule()
+            max_pks_per_poll: Max pks of one poll query, the other due writes wait for the next round,
+                the pks of a larger write are split into several queries
+            name: Name of the poller thread
+        """
+        self.query_func = query_func
+        self.pk_field = pk_field
+        self.schedule = schedule or PollSchedule()
+        self.max_pks_per_poll = max_pks_per_poll
+        self.stats = LatencyStats()
+        self.polls = 0
+        self.poll_failures = 0
+        self._pending: List[PendingWrite] = []
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def track(self, pks, visible=True, start=None) -> PendingWrite:
+        """
+        track a write, start is the perf_counter time of the write, default to now
+        """
+        write = PendingWrite(pks, visible, time.perf_counter() if start is None else start)
+        with self._cond:
+            self._pending.append(write)
+            self._cond.notify()
+        return write
+
+    @property
+    def outstanding(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _finish(self, write, result, now):
+        write.result = result
+        write.latency = now - write.start
+        self.stats.record(write.latency, success=result)
+        write.done.set()
+
+    def _next_round(self) -> Optional[List[PendingWrite]]:
+        """the due writes of the next poll, None once closed"""
+        with self._cond:
+            while True:
+                if self._stop:
+                    return None
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                now = time.perf_counter()
+                next_poll = min(w.next_poll for w in self._pending)
+                if next_poll > now:
+                    self._cond.wait(next_poll - now)
+                    continue
+                due, n = [], 0
+                for w in self._pending:
+                    if w.next_poll <= now and (not due or n + len(w.pks) <= self.max_pks_per_poll):
+                        due.append(w)
+                        n += len(w.pks)
+                return due
+
+    def _poll(self, writes):
+        pks = sorted({pk for w in writes for pk in w.pks})
+        sent = time.perf_counter()
+        self.polls += 1
+        try:
+            found = set()
+            for i in range(0, len(pks), self.max_pks_per_poll):
+                batch = pks[i: i + self.max_pks_per_poll]
+                found.update(r[self.pk_field] for r in self.query_func(f"{self.pk_field} in {batch}"))
+        except Exception as e:
+            # a failed poll sees nothing, the writes are polled again by the schedule
+            self.poll_failures += 1
+            log.debug(f"freshness poll failed: {e}")
+            found = None
+        now = time.perf_counter()
+        with self._cond:
+            if self._stop:
+                return
+            for w in writes:
+                w.attempts += 1
+                if found is not None:
+                    seen = all(pk in found for pk in w.pks) if w.visible else not any(pk in found for pk in w.pks)
+                    if seen:
+                        self._finish(w, True, sent)
+                        self._pending.remove(w)
+                        continue
+                if now - w.start > self.schedule.timeout:
+                    log.warning(f"write of pks {w.pks[:3]}... not {'visible' if w.visible else 'deleted'} "
+                                f"after {self.schedule.timeout}s")
+                    self._finish(w, False, now)
+                    self._pending.remove(w)
+                    continue
+                w.next_poll = now + self.schedule.interval(w.attempts)
+
+    def _run(self):
+        while True:
+            due = self._next_round()
+            if due is None:
+                return
+            self._poll(due)
+
+    def summary(self):
+        return {**self.stats.summary(), "outstanding": self.outstanding, "polls": self.polls,
+                "poll_failures": self.poll_failures}
+
+    def reset(self):
+        self.stats.reset()
+        self.polls = 0
+        self.poll_failures = 0
+
+    def close(self):
+        """stop polling, the writes still pending are released unseen"""
+        with self._cond:
+            self._stop = True
+            pending, self._pending = self._pending, []
+            self._cond.notify()
+        for w in pending:
+            w.done.set()
+        self._thread.join()
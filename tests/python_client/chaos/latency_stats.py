@@ -0,0 +1,271 @@
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from utils.util_log import test_log as log
+
+DEFAULT_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyStats:
+    """
+    Bounded memory statistics of a stream of requests: success / failure counters and a log-linear
+    histogram of the success latencies.
+
+    Bucket i of the histogram covers [min_value * growth^i, min_value * growth^(i + 1)) with
+    growth = 1 + precision, so every percentile is exact within `precision` relative error whatever
+    the number of recorded requests, like an HDR histogram. The default 1us ~ 10000s range at 1%
+    takes 2316 buckets. Stats of the same layout can be merged (e.g. across checkers) and subtracted
+    (the window between two snapshots).
+    """
+
+    def __init__(self, min_value=1e-6, max_value=1e4, precision=0.01):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.precision = precision
+        self.log_growth = math.log1p(precision)
+        self.counts = np.zeros(int(math.ceil(math.log(max_value / min_value) / self.log_growth)) + 1,
+                               dtype=np.int64)
+        self.succ = 0
+        self.fail = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def _bucket(self, value) -> int:
+        if value <= self.min_value:
+            return 0
+        return min(int(math.log(value / self.min_value) / self.log_growth), len(self.counts) - 1)
+
+    def record(self, latency, success=True):
+        """record a request, the latency in seconds is only kept for successful requests"""
+        with self.lock:
+            if not success:
+                self.fail += 1
+                return
+            self.counts[self._bucket(latency)] += 1
+            self.succ += 1
+            self.sum += latency
+            if latency < self.min:
+                self.min = latency
+            if latency > self.max:
+                self.max = latency
+
+    @property
+    def total(self) -> int:
+        return self.succ + self.fail
+
+    @property
+    def succ_rate(self) -> float:
+        return self.succ / self.total if self.total != 0 else 0
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.succ if self.succ != 0 else 0
+
+    def percentile(self, q) -> float:
+        """latency at percentile q (0 ~ 100) of the successful requests, 0 without any"""
+        if self.succ == 0:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.succ))
+        i = int(np.searchsorted(np.cumsum(self.counts), rank))
+        # geometric middle of the bucket, clamped to the exact extremes
+        value = self.min_value * math.exp((i + 0.5) * self.log_growth)
+        return min(max(value, self.min), self.max)
+
+    def percentiles(self, qs: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        return {f"p{q:g}": self.percentile(q) for q in qs}
+
+    def _check_layout(self, other: "LatencyStats"):
+        if (self.min_value, self.max_value, self.precision) != (other.min_value, other.max_value, other.precision):
+            raise Exception("can not combine latency stats with different histogram layouts")
+
+    def snapshot(self) -> "LatencyStats":
+        """a copy of the current stats"""
+        res = LatencyStats(self.min_value, self.max_value, self.precision)
+        with self.lock:
+            res.counts[:] = self.counts
+            res.succ, res.fail, res.sum, res.min, res.max = self.succ, self.fail, self.sum, self.min, self.max
+        return res
+
+    def since(self, snapshot: "LatencyStats") -> "LatencyStats":
+        """
+        the stats of the requests recorded after snapshot, min / max of the window are bucket bounds
+        since the exact extremes are not kept per window
+        """
+        self._check_layout(snapshot)
+        res = self.snapshot()
+        res.counts -= snapshot.counts
+        res.succ -= snapshot.succ
+        res.fail -= snapshot.fail
+        res.sum -= snapshot.sum
+        nonzero = np.flatnonzero(res.counts)
+        if len(nonzero) > 0:
+            res.min = max(self.min, self.min_value * math.exp(nonzero[0] * self.log_growth))
+            res.max = min(self.max, self.min_value * math.exp((nonzero[-1] + 1) * self.log_growth))
+        else:
+            res.min, res.max = math.inf, 0.0
+        return res
+
+    def merge(self, other: "LatencyStats") -> "LatencyStats":
+        """add the requests of other to these stats"""
+        self._check_layout(other)
+        other = other.snapshot()
+        with self.lock:
+            self.counts += other.counts
+            self.succ += other.succ
+            self.fail += other.fail
+            self.sum += other.sum
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        return self
+
+    @classmethod
+    def merged(cls, stats: Iterable["LatencyStats"]) -> Optional["LatencyStats"]:
+        res = None
+        for s in stats:
+            res = s.snapshot() if res is None else res.merge(s)
+        return res
+
+    def reset(self):
+        with self.lock:
+            self.counts[:] = 0
+            self.succ = self.fail = 0
+            self.sum = 0.0
+            self.min, self.max = math.inf, 0.0
+
+    def summary(self, qs: Sequence[float] = DEFAULT_PERCENTILES) -> Dict:
+        return {
+            "total": self.total,
+            "succ": self.succ,
+            "fail": self.fail,
+            "succ_rate": self.succ_rate,
+            "average_time": self.mean,
+            "min_time": self.min if self.succ else 0.0,
+            "max_time": self.max,
+            **self.percentiles(qs),
+        }
+
+
+class FailRecords:
+    """
+    Failure records of a checker, (status, request seq, start time, start ts) tuples, keeping the first
+    record and the latest maxlen ones instead of all of them. Index 0 is the first record and negative
+    indexes count from the latest, which is what the recovery time computation needs.
+    """
+
+    def __init__(self, maxlen=1000):
+        self.first = None
+        self.recent = deque(maxlen=maxlen)
+        self.count = 0
+
+    def append(self, record):
+        if self.first is None:
+            self.first = record
+        self.recent.append(record)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if self.count == 0:
+            raise IndexError("no fail records")
+        if i == 0:
+            return self.first
+        if i < 0:
+            return self.recent[i]
+        raise IndexError("only the first and the latest fail records are kept")
+
+    def __iter__(self):
+        if self.first is not None and (len(self.recent) == 0 or self.recent[0] is not self.first):
+            yield self.first
+        yield from self.recent
+
+    def __repr__(self):
+        dropped = self.count - len(self.recent) - (0 if self.count <= len(self.recent) else 1)
+        records = list(self)
+        if dropped > 0:
+            return f"[{records[0]!r}, ...{dropped} records..., {', '.join(repr(r) for r in records[1:])}]"
+        return repr(records)
+
+
+class CheckerStats:
+    """
+    Request counting and result reporting of a checker, shared by the thread checkers
+    (chaos.checker.Checker) and the async checkers (chaos.async_checker.AsyncChecker), so both report
+    the same results to assert_statistic and get_rto.
+    """
+
+    def init_stats(self):
+        self.recovery_time = 0
+        self.stats = LatencyStats()
+        self.fail_records = FailRecords()
+        self._window_snapshot = self.stats.snapshot()
+
+    def record_result(self, result, elapsed, start_time=None, start_time_ts=None):
+        """count a request, keep its latency in the stats and track the failure / recovery transitions"""
+        self.stats.record(elapsed, success=bool(result))
+        total = self.stats.total
+        if result:
+            # add first success record if there is no success record before
+            if len(self.fail_records) > 0 and self.fail_records[-1][0] == "failure" and \
+                    total == self.fail_records[-1][1] + 1:
+                self.fail_records.append(("success", total, start_time, start_time_ts))
+        else:
+            self.fail_records.append(("failure", total, start_time, start_time_ts))
+
+    @property
+    def average_time(self):
+        return self.stats.mean
+
+    def total(self):
+        return self.stats.total
+
+    def succ_rate(self):
+        return self.stats.succ_rate
+
+    def get_window_stats(self):
+        """stats of the requests since the previous call (or the checker start)"""
+        snapshot = self.stats.snapshot()
+        window = snapshot.since(self._window_snapshot)
+        self._window_snapshot = snapshot
+        return window
+
+    def extra_results(self) -> Dict:
+        """checker specific counters reported after the total by check_result"""
+        return {}
+
+    def check_result(self):
+        summary = self.stats.summary()
+        checker_name = self.__class__.__name__
+        extras = "".join(f"{k}: {v}, " for k, v in self.extra_results().items())
+        checkers_result = f"{checker_name}, succ_rate: {summary['succ_rate']:.2f}, total: {summary['total']:03d}, " \
+                          f"{extras}average_time: {summary['average_time']:.4f}, " \
+                          f"max_time: {summary['max_time']:.4f}, min_time: {summary['min_time']:.4f}, " \
+                          f"p50: {summary['p50']:.4f}, p99: {summary['p99']:.4f}"
+        log.info(checkers_result)
+        if len(self.fail_records) > 0:
+            log.info(f"{checker_name} failed at {self.fail_records}")
+        return checkers_result
+
+    def reset(self):
+        self.stats.reset()
+        self.fail_records = FailRecords()
+        self._window_snapshot = self.stats.snapshot()
+
+    def get_rto(self):
+        if len(self.fail_records) == 0:
+            return 0
+        end = self.fail_records[-1][3]
+        start = self.fail_records[0][3]
+        recovery_time = end - start  # second
+        self.recovery_time = recovery_time
+        checker_name = self.__class__.__name__
+        log.info(f"{checker_name} recovery time is {self.recovery_time}, start at {self.fail_records[0][2]}, "
+                 f"end at {self.fail_records[-1][2]}")
+        return recovery_time
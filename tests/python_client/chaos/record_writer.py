@@ -0,0 +1,136 @@
+import atexit
+import os
+import threading
+import uuid
+from collections import deque
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.util_log import test_log as log
+
+RECORDS_DIR = "/tmp/ci_logs"
+# id of the run in the part file names, so the records left in RECORDS_DIR by previous runs are not read,
+# the processes of one run (e.g. the checkers and the chaos apply) share it by exporting the same CHAOS_RUN_ID
+RUN_ID = os.environ.get("CHAOS_RUN_ID") or uuid.uuid4().hex[:12]
+
+
+class RecordWriter:
+    """
+    Record rows of a fixed arrow schema to parquet files off the recording threads.
+
+    insert() appends a tuple to a deque owned by the calling thread, so recording takes no lock and
+    does no I/O on the thread being timed. A daemon writer thread drains the deques every
+    flush_interval seconds into one arrow RecordBatch, written as a row group of the current parquet
+    part file. The part is rotated, i.e. closed so it can be read and a new part opened, every
+    rows_per_file rows and on flush().
+    """
+
+    def __init__(self, name, schema: pa.Schema, flush_interval=1.0, rows_per_file=1000000, dir=RECORDS_DIR,
+                 run_id=RUN_ID):
+        """
+        Args:
+            name: Prefix of the part files, followed by the run id
+            schema: Arrow schema of the rows, every row is a tuple in the order of the schema fields
+            flush_interval: Seconds between two drains of the writer thread
+            rows_per_file: Rows of a part file before it is rotated
+            dir: Directory of the part files
+            run_id: Id of the run the records belong to
+        """
+        self.schema = schema
+        self.prefix = f"{dir}/{name}_{run_id}_{uuid.uuid4()}"
+        self.flush_interval = flush_interval
+        self.rows_per_file = rows_per_file
+        self.files = []
+        self.rows = 0
+        self._local = threading.local()
+        self._buffers = []  # (thread, deque) of every recording thread
+        self._buffers_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._file = None
+        self._file_rows = 0
+        Path(dir).mkdir(parents=True, exist_ok=True)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{name}_writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _buffer(self) -> deque:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = deque()
+            self._local.buffer = buffer
+            # registration is the only locked step, once per thread
+            with self._buffers_lock:
+                self._buffers.append((threading.current_thread(), buffer))
+        return buffer
+
+    def insert(self, *row):
+        self._buffer().append(row)
+
+    def _drain(self) -> list:
+        rows = []
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+        for _, buffer in buffers:
+            # deque.popleft is atomic, the owner may keep appending meanwhile
+            for _ in range(len(buffer)):
+                rows.append(buffer.popleft())
+        with self._buffers_lock:
+            self._buffers = [(t, b) for t, b in self._buffers if t.is_alive() or len(b) > 0]
+        return rows
+
+    def _write(self, rows):
+        columns = list(zip(*rows))
+        batch = pa.RecordBatch.from_arrays([pa.array(column, type=field.type)
+                                            for column, field in zip(columns, self.schema)], schema=self.schema)
+        if self._writer is None:
+            self._file = f"{self.prefix}_{len(self.files)}.parquet"
+            self._writer = pq.ParquetWriter(self._file, self.schema)
+        self._writer.write_batch(batch)
+        self._file_rows += len(rows)
+        self.rows += len(rows)
+        if self._file_rows >= self.rows_per_file:
+            self._rotate()
+
+    def _rotate(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self.files.append(self._file)
+        self._writer, self._file, self._file_rows = None, None, 0
+
+    def _drain_and_write(self, rotate=False):
+        with self._write_lock:
+            rows = self._drain()
+            if rows:
+                self._write(rows)
+            if rotate:
+                self._rotate()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self._drain_and_write()
+            except Exception as e:
+                log.error(f"write records to {self.prefix} failed: {e}")
+
+    def flush(self):
+        """write all the recorded rows and rotate, so that every row is in a closed part file"""
+        self._drain_and_write(rotate=True)
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def read_table(self) -> pa.Table:
+        self.flush()
+        if not self.files:
+            return self.schema.empty_table()
+        return pa.concat_tables([pq.read_table(f, schema=self.schema) for f in self.files])
+
+    def read_df(self) -> pd.DataFrame:
+        return self.read_table().to_pandas()
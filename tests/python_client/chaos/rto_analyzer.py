@@ -0,0 +1,254 @@
+import glob
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from chaos.checker import EventRecords, RequestRecords, get_chaos_info
+from chaos.record_writer import RECORDS_DIR, RUN_ID
+from utils.util_log import test_log as log
+
+NS = 10 ** 9
+# event name of the fault injection, with the statuses start, stop and recovered (all pods ready)
+CHAOS_EVENT = "chaos"
+# baseline requests of a throughput window at least, the window of a slow operation is widened to it
+MIN_WINDOW_REQUESTS = 20
+
+
+def read_records(name, schema: pa.Schema, dir=RECORDS_DIR, run_id=RUN_ID) -> pd.DataFrame:
+    """
+    the closed part files of the RecordWriter `name` of every process of the run, e.g. a chaos apply
+    process with the same CHAOS_RUN_ID, the parts of the other runs in dir are ignored
+    """
+    tables = []
+    for f in sorted(glob.glob(f"{dir}/{name}_{run_id}_*.parquet")):
+        try:
+            tables.append(pq.read_table(f, schema=schema))
+        except Exception as e:
+            # a part still being written by a running process has no footer yet
+            log.debug(f"skip records file {f}: {e}")
+    if not tables:
+        return schema.empty_table().to_pandas()
+    return pa.concat_tables(tables).to_pandas()
+
+
+def local_time_to_ns(t: str) -> int:
+    """the local time strings of the chaos info to ns since epoch"""
+    return int(datetime.strptime(t, '%Y-%m-%d %H:%M:%S.%f').timestamp() * NS)
+
+
+def chaos_info_events(chaos_info) -> pd.DataFrame:
+    """the chaos info saved by the chaos apply tests as chaos start / stop / recovered events"""
+    rows = [(CHAOS_EVENT, status, local_time_to_ns(chaos_info[key]))
+            for status, key in (("start", "create_time"), ("stop", "delete_time"), ("recovered", "recovery_time"))
+            if chaos_info.get(key)]
+    return pd.DataFrame(rows, columns=["event_name", "event_status", "event_ts"])
+
+
+def merge_chaos_info(events: pd.DataFrame, chaos_info, since: Optional[int] = None) -> pd.DataFrame:
+    """
+    the events with the chaos info as chaos events, unless the run recorded its own chaos events (e.g.
+    test_chaos), which describe the same fault, or the chaos was created before since (ns), i.e. the
+    chaos info file was left by a previous run
+    """
+    if chaos_info is None:
+        return events
+    if (events["event_name"] == CHAOS_EVENT).any():
+        log.info("chaos events recorded by the run, ignore the chaos info")
+        return events
+    info_events = chaos_info_events(chaos_info)
+    starts = info_events.loc[info_events["event_status"] == "start", "event_ts"]
+    if since is not None and (starts.empty or starts.min() < since):
+        log.warning(f"ignore the chaos info created before the first request of the run: {chaos_info}")
+        return events
+    return pd.concat([events, info_events], ignore_index=True)
+
+
+class RtoAnalyzer:
+    """
+    Recovery of every operation around the fault injections, from the request records of all the checkers
+    at a fixed time resolution (100 ms by default) instead of the first / last failure of a checker.
+
+    The requests are counted per operation and per bin of their start time, relative to every fault
+    start. Per fault and operation:
+      - time_to_first_failure: first failed request after the fault start
+      - time_to_recovery: start of the first `sustain` seconds window after the first failure with
+        successes and no failure, so a transient failure long after the fault does not extend it
+      - outage: time_to_recovery - time_to_first_failure
+      - degraded_duration: total time the success throughput, averaged over `sustain` seconds (longer for
+        slow operations, see MIN_WINDOW_REQUESTS), is below degraded_ratio of its throughput in the
+        `baseline` seconds before the fault
+    All the times are seconds from the fault start. Only the requests up to `horizon` seconds after the
+    fault recovered (or stopped) are considered.
+    """
+
+    def __init__(self, df: Optional[pd.DataFrame] = None, events: Optional[pd.DataFrame] = None,
+                 resolution=0.1, sustain=1.0, baseline=60.0, horizon=300.0, degraded_ratio=0.5,
+                 labels: Optional[Dict] = None):
+        """
+        Args:
+            df: Request records with int64 ns start_time, default to the request records of the run
+            events: Event records, default to the event records of the run and the chaos info of the run,
+                see merge_chaos_info
+            resolution: Bin width in seconds
+            sustain: Seconds of success that make a recovery, also the throughput averaging window
+            baseline: Seconds before the fault whose throughput is the normal one
+            horizon: Seconds after the fault recovered (or stopped) still attributed to the fault
+            degraded_ratio: Throughput ratio to the baseline below which an operation is degraded
+            labels: Labels of the run exported with the results, e.g. milvus version and config
+        """
+        if df is None:
+            RequestRecords().sink()
+            df = read_records("request_records", RequestRecords.schema)
+        if events is None:
+            EventRecords().writer.flush()
+            events = read_records("event_records", EventRecords.schema)
+            since = int(df["start_time"].min()) if len(df) else None
+            events = merge_chaos_info(events, get_chaos_info(), since=since)
+        self.df = df
+        self.events = events
+        self.resolution = resolution
+        self.sustain = sustain
+        self.baseline = baseline
+        self.horizon = horizon
+        self.degraded_ratio = degraded_ratio
+        self.labels = labels or {}
+        self.res_ns = int(round(resolution * NS))
+        self.window = max(1, int(round(sustain / resolution)))
+
+    def get_faults(self) -> List[Tuple[int, Optional[int], Optional[int]]]:
+        """(start, stop, recovered) ns of every fault, stop / recovered None if not recorded"""
+        chaos = self.events[self.events["event_name"] == CHAOS_EVENT].sort_values("event_ts")
+        starts = chaos.loc[chaos["event_status"] == "start", "event_ts"].drop_duplicates().tolist()
+        faults = []
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else np.iinfo(np.int64).max
+            later = chaos[(chaos["event_ts"] >= start) & (chaos["event_ts"] < end)]
+            stop = later.loc[later["event_status"] == "stop", "event_ts"].min()
+            recovered = later.loc[later["event_status"] == "recovered", "event_ts"].min()
+            faults.append((int(start), None if pd.isna(stop) else int(stop),
+                           None if pd.isna(recovered) else int(recovered)))
+        return faults
+
+    def _fault_end(self, fault) -> int:
+        start, stop, recovered = fault
+        end = recovered or stop or start
+        return end + int(self.horizon * NS)
+
+    def get_bins(self, fault) -> pd.DataFrame:
+        """
+        success and failure counts per operation and bin around a fault, bin 0 starts at the fault start,
+        the negative bins are the baseline
+        """
+        start = fault[0]
+        first = -int(round(self.baseline / self.resolution))
+        last = (self._fault_end(fault) - start) // self.res_ns
+        df = self.df
+        bins = (df["start_time"].to_numpy(np.int64) - start) // self.res_ns
+        mask = (bins >= first) & (bins <= last)
+        df = pd.DataFrame({"operation_name": df["operation_name"].to_numpy()[mask], "bin": bins[mask],
+                           "result": df["result"].to_numpy(bool)[mask]})
+        counts = df.groupby(["operation_name", "bin"])["result"].agg(success="sum", total="size")
+        ops = counts.index.get_level_values(0).unique()
+        last = min(last, int(counts.index.get_level_values(1).max())) if len(counts) else first
+        full = pd.MultiIndex.from_product([ops, np.arange(first, last + 1)], names=["operation_name", "bin"])
+        counts = counts.reindex(full, fill_value=0)
+        counts["failure"] = counts["total"] - counts["success"]
+        return counts[["success", "failure"]].astype(np.int64)
+
+    def _analyze_op(self, success: np.ndarray, failure: np.ndarray, bins: np.ndarray) -> Dict:
+        res = self.resolution
+        after = bins >= 0
+        s, f = success[after], failure[after]
+        failed = np.flatnonzero(f)
+        ttff = float(failed[0] * res) if len(failed) else None
+        ttr = 0.0
+        if len(failed):
+            # windows of `window` bins with successes and no failure, by the cumulative sums
+            cs, cf = np.concatenate([[0], np.cumsum(s)]), np.concatenate([[0], np.cumsum(f)])
+            w = self.window
+            n = max(0, len(s) - w + 1)
+            ok = np.flatnonzero(((cf[w:w + n] - cf[:n]) == 0) & ((cs[w:w + n] - cs[:n]) > 0))
+            ok = ok[ok > failed[0]]
+            ttr = float(ok[0] * res) if len(ok) else None
+        base = success[~after]
+        baseline_tps = base.mean() / res if len(base) else 0.0
+        degraded = None
+        if baseline_tps > 0:
+            window = max(self.window, int(np.ceil(MIN_WINDOW_REQUESTS / (baseline_tps * res))))
+            tps = pd.Series(s).rolling(window, center=True, min_periods=1).mean().to_numpy() / res
+            degraded = float(np.count_nonzero(tps < self.degraded_ratio * baseline_tps) * res)
+        return {
+            "time_to_first_failure": ttff,
+            "time_to_recovery": ttr,
+            "outage": None if ttff is None or ttr is None else ttr - ttff,
+            "degraded_duration": degraded,
+            "baseline_tps": baseline_tps,
+            "failures": int(f.sum()),
+        }
+
+    def get_timeline(self) -> pd.DataFrame:
+        """
+        Returns:
+            DataFrame: per fault, operation and bin: time (s from the fault start), success, failure and
+                the success throughput averaged over `sustain` seconds
+        """
+        timelines = []
+        for i, fault in enumerate(self.get_faults()):
+            counts = self.get_bins(fault).reset_index()
+            counts.insert(0, "fault", i)
+            counts["time"] = counts["bin"] * self.resolution
+            counts["tps"] = counts.groupby("operation_name")["success"].transform(
+                lambda x: x.rolling(self.window, center=True, min_periods=1).mean()) / self.resolution
+            timelines.append(counts)
+        if not timelines:
+            return pd.DataFrame(columns=["fault", "operation_name", "bin", "success", "failure", "time", "tps"])
+        return pd.concat(timelines, ignore_index=True)
+
+    def get_rto(self) -> pd.DataFrame:
+        """
+        Returns:
+            DataFrame: indexed by (fault, operation_name), the recovery metrics in seconds
+        """
+        rows = []
+        for i, fault in enumerate(self.get_faults()):
+            counts = self.get_bins(fault)
+            for op, c in counts.groupby(level=0):
+                bins = c.index.get_level_values(1).to_numpy()
+                rows.append({"fault": i, "operation_name": op,
+                             **self._analyze_op(c["success"].to_numpy(), c["failure"].to_numpy(), bins)})
+        if not rows:
+            log.warning("no chaos start event, no recovery to analyze")
+            return pd.DataFrame()
+        rto = pd.DataFrame(rows).set_index(["fault", "operation_name"])
+        log.info(f"recovery of the operations at {self.resolution}s resolution:\n{rto.to_string()}")
+        return rto
+
+    def export(self, prefix=f"{RECORDS_DIR}/rto"):
+        """
+        write the timeline as <prefix>_timeline.parquet and the metrics with the faults and labels as
+        <prefix>.json, the files to compare the recovery across milvus versions and configs
+
+        Returns:
+            Tuple[str, str]: the json and the timeline files
+        """
+        rto = self.get_rto()
+        timeline_file = f"{prefix}_timeline.parquet"
+        self.get_timeline().to_parquet(timeline_file)
+        result = {
+            "labels": self.labels,
+            "resolution": self.resolution,
+            "sustain": self.sustain,
+            "faults": [{"start": start, "stop": stop, "recovered": recovered}
+                       for start, stop, recovered in self.get_faults()],
+            "rto": json.loads(rto.reset_index().to_json(orient="records")),
+        }
+        json_file = f"{prefix}.json"
+        with open(json_file, "w") as f:
+            json.dump(result, f, indent=2)
+        log.info(f"recovery analysis exported to {json_file} and {timeline_file}")
+        return json_file, timeline_file
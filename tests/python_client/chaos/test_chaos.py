@@ -7,7 +7,8 @@ from time import sleep
 
 from pymilvus import connections
 from chaos.checker import (CollectionCreateChecker, InsertChecker, FlushChecker,
-                           SearchChecker, QueryChecker, IndexCreateChecker, DeleteChecker, Op)
+                           SearchChecker, QueryChecker, IndexCreateChecker, DeleteChecker, Op, EventRecords)
+from chaos.rto_analyzer import RtoAnalyzer
 from common.cus_resource_opts import CustomResourceOperations as CusResource
 from utils.util_log import test_log as log
 from utils.util_k8s import wait_pods_ready, get_pod_list
@@ -172,7 +173,9 @@ class TestChaos(TestChaosBase):
                                 group=constants.CHAOS_GROUP,
                                 version=constants.CHAOS_VERSION,
                                 namespace=constants.CHAOS_NAMESPACE)
+        event_records = EventRecords()
         chaos_res.create(chaos_config)
+        event_records.insert("chaos", "start")
         log.info("chaos injected")
         # verify the chaos is injected
         log.info(f"kubectl get {kind} {meta_name} -n {constants.CHAOS_NAMESPACE}")
@@ -203,6 +206,7 @@ class TestChaos(TestChaosBase):
             log.error(f"Fail to write the report: {e}")
         # delete chaos
         chaos_res.delete(meta_name)
+        event_records.insert("chaos", "stop")
         log.info("chaos deleted")
         # verify the chaos is deleted
         log.info(f"kubectl get {kind} {meta_name} -n {constants.CHAOS_NAMESPACE}")
@@ -214,6 +218,7 @@ class TestChaos(TestChaosBase):
         wait_pods_ready(constants.CHAOS_NAMESPACE, f"app.kubernetes.io/instance={meta_name}")
         log.info(f"wait for pods in namespace {constants.CHAOS_NAMESPACE} with label release={meta_name}")
         wait_pods_ready(constants.CHAOS_NAMESPACE, f"release={meta_name}")
+        event_records.insert("chaos", "recovered")
         log.info("all pods are ready")
         # reconnect if needed
         sleep(constants.WAIT_PER_OP * 2)
@@ -240,6 +245,7 @@ class TestChaos(TestChaosBase):
         sleep(constants.WAIT_PER_OP * 2)
         log.info("******4th assert after chaos deleted: ")
         assert_statistic(self.health_checkers)
+        RtoAnalyzer(labels={"chaos": meta_name}).export()
 
         # assert all expectations
         assert_expectations()
@@ -1,5 +1,7 @@
 import time
 
+import numpy as np
+import pandas as pd
 import pytest
 from time import sleep
 from pymilvus import connections, db
@@ -29,6 +31,8 @@ from chaos.checker import (
 from utils.util_log import test_log as log
 from utils.util_k8s import wait_pods_ready, get_milvus_instance_name
 from chaos import chaos_commons as cc
+from chaos.record_writer import RecordWriter
+from chaos.rto_analyzer import RtoAnalyzer, local_time_to_ns, merge_chaos_info, read_records
 from common.common_type import CaseLabel
 from common.milvus_sys import MilvusSys
 from chaos.chaos_commons import assert_statistic
@@ -134,4 +138,67 @@ class TestOperations(TestBase):
         ra = ResultAnalyzer()
         ra.get_stage_success_rate()
         ra.show_result_table()
+        RtoAnalyzer().export()
         log.info("*********************Chaos Test Completed**********************")
+
+
+class TestResultAnalyzer:
+    """ ResultAnalyzer on synthetic request records, without milvus"""
+
+    @pytest.mark.tags(CaseLabel.L1)
+    def test_recovery_time_of_known_outage(self):
+        """
+        target: the recovery time of an operation ends with its failures
+        method: search and query every 100 ms for 120 s, the chaos starts at 20 s, search fails from
+                25 s to 60 s and sends no request from 30 s to 35 s, query never fails
+        expected: search recovers 40 s after the chaos start, query is never degraded
+        """
+        base = pd.Timestamp("2025-01-01 00:00:00")
+        t = np.arange(0, 120000, 100)
+        search_t = t[(t < 30000) | (t >= 35000)]
+        df = pd.DataFrame({
+            "operation_name": ["search"] * len(search_t) + ["query"] * len(t),
+            "start_time": base + pd.to_timedelta(np.concatenate([search_t, t]), unit="ms"),
+            "result": np.concatenate([(search_t < 25000) | (search_t >= 60000), np.ones(len(t), dtype=bool)]),
+            "time_cost": 0.01,
+        })
+        chaos_info = {"create_time": str(base + pd.Timedelta(seconds=20)),
+                      "delete_time": str(base + pd.Timedelta(seconds=50)),
+                      "recovery_time": str(base + pd.Timedelta(seconds=70))}
+        recovery = ResultAnalyzer(df=df, chaos_info=chaos_info).get_recovery_time()
+        assert recovery["search"] == 40.0
+        assert recovery["query"] == 0.0
+
+
+class TestRtoAnalyzer:
+    """ RtoAnalyzer inputs of the current run, without milvus"""
+
+    @pytest.mark.tags(CaseLabel.L1)
+    def test_records_and_chaos_info_of_the_run(self, tmp_path):
+        """
+        target: the analyzer only reads the event records and the chaos info of the current run
+        method: write the event records of a previous run and of the current run, then merge a chaos info
+                older than the run, a chaos info of the run with recorded chaos events and without
+        expected: only the records of the current run are read, the chaos info is only added when it is
+                  of the run and the run recorded no chaos event
+        """
+        for run_id, status in (("previous", "stop"), ("current", "start")):
+            writer = RecordWriter("event_records", EventRecords.schema, dir=str(tmp_path), run_id=run_id)
+            writer.insert("chaos", status, 1)
+            writer.close()
+        events = read_records("event_records", EventRecords.schema, dir=str(tmp_path), run_id="current")
+        assert events["event_status"].tolist() == ["start"]
+
+        base = pd.Timestamp("2025-01-01 00:00:00")
+        since = local_time_to_ns(base.strftime('%Y-%m-%d %H:%M:%S.%f'))
+
+        def chaos_info(seconds):
+            return {key: (base + pd.Timedelta(seconds=seconds + delay)).strftime('%Y-%m-%d %H:%M:%S.%f')
+                    for key, delay in (("create_time", 0), ("delete_time", 30))}
+
+        no_chaos = events.iloc[:0]
+        assert merge_chaos_info(no_chaos, chaos_info(-3600), since=since).empty
+        assert merge_chaos_info(events, chaos_info(20), since=since).equals(events)
+        merged = merge_chaos_info(no_chaos, chaos_info(20), since=since)
+        assert merged["event_status"].tolist() == ["start", "stop"]
+        assert merged["event_ts"].tolist() == [since + 20 * 10 ** 9, since + 50 * 10 ** 9]
@@ -1,8 +1,11 @@
+import random
 import time
+from types import SimpleNamespace
 import pytest
 from faker import Faker
-from pymilvus import Collection
+from pymilvus import Collection, DataType
 from base.client_base import TestcaseBase
+from chaos.collection_verifier import CollectionVerifier
 from common import common_func as cf
 from common import common_type as ct
 from common.common_type import CaseLabel
@@ -188,3 +191,108 @@ class TestAllCollection(TestcaseBase):
             tt = time.time() - t0
             log.info(f"assert text match: {tt}")
             assert len(res) >= 0
+
+
+class TestVerifyAllCollections(TestcaseBase):
+    """ Verify all the collections of the chaos test at once"""
+
+    @pytest.mark.tags(CaseLabel.L1)
+    def test_verify_all_collections_concurrently(self):
+        collection_names = get_collections(file_name="chaos_test_all_collections.json")
+        if not collection_names:
+            pytest.skip("no collection to verify")
+        self._connect()
+        results = CollectionVerifier(max_workers=8).verify_all(collection_names)
+        failed = {name: res.error for name, res in results.items() if not res.ok}
+        assert not failed, f"collections failed the verification: {failed}"
+
+
+class FakeVerifyClient:
+    """
+    MilvusClient of the collections verified by CollectionVerifier, every collection is a list of int64 pks
+    in its segments, the query iterator pages them in a shuffled order
+    """
+
+    def __init__(self, segments, count_star=None):
+        """
+        Args:
+            segments: collection name -> segment id -> pks of the segment
+            count_star: collection name -> count(*) to return instead of the number of pks
+        """
+        self.segments = segments
+        self.count_star = count_star or {}
+        self.iterated = []
+
+    def pks(self, name):
+        return [pk for pks in self.segments[name].values() for pk in pks]
+
+    def describe_collection(self, name, **kwargs):
+        if name not in self.segments:
+            raise Exception(f"collection not found[collection={name}]")
+        return {"fields": [{"name": "id", "type": DataType.INT64, "is_primary": True, "params": {}},
+                           {"name": "emb", "type": DataType.FLOAT_VECTOR, "params": {"dim": 4}}]}
+
+    def flush(self, name, **kwargs):
+        pass
+
+    def list_persistent_segments(self, name, **kwargs):
+        return [SimpleNamespace(segment_id=segment_id, num_rows=len(pks))
+                for segment_id, pks in self.segments[name].items()]
+
+    def get_load_state(self, name):
+        return {"state": SimpleNamespace(name="Loaded")}
+
+    def query_iterator(self, name, batch_size, **kwargs):
+        self.iterated.append(name)
+        pks = self.pks(name)
+        random.shuffle(pks)
+        pages = iter([[{"id": pk} for pk in pks[i: i + batch_size]] for i in range(0, len(pks), batch_size)])
+        return SimpleNamespace(next=lambda: next(pages, []), close=lambda: None)
+
+    def query(self, name, **kwargs):
+        return [{"count(*)": self.count_star.get(name, len(self.pks(name)))}]
+
+    def search(self, name, data, **kwargs):
+        return [[{"id": self.pks(name)[0]}]] * len(data)
+
+
+class TestCollectionVerifier:
+    """ CollectionVerifier on fake collections, without milvus"""
+
+    @pytest.mark.tags(CaseLabel.L1)
+    def test_verify_all_with_fake_client(self, tmp_path):
+        """
+        target: the verification of the collections and the rerun cache
+        method: verify a healthy collection, one whose count(*) differs from its pks and a missing one,
+                then verify them again with a new verifier on the same cache, and after adding a segment
+        expected: only the healthy collection passes, its checksum does not depend on the page order or size,
+                  the rerun only verifies the collections that failed or whose segments changed
+        """
+        segments = {"healthy": {1: list(range(-5, 1000)), 2: [2 ** 62, -2 ** 62]},
+                    "miscount": {1: list(range(100))}}
+        client = FakeVerifyClient(segments, count_star={"miscount": 99})
+        cache_file = str(tmp_path / "verify_cache.json")
+        results = CollectionVerifier(batch_size=64, cache_file=cache_file, milvus_client=client) \
+            .verify_all(["healthy", "miscount", "missing"])
+        assert results["healthy"].ok and results["healthy"].count == 1007
+        assert not results["miscount"].ok and "count(*) is 99" in results["miscount"].error
+        assert not results["missing"].ok and "not found" in results["missing"].error
+        assert sorted(client.iterated) == ["healthy", "miscount"]
+
+        # the same pks paged in another order and page size
+        other = CollectionVerifier(batch_size=7, cache_file=None, milvus_client=FakeVerifyClient(segments))
+        assert other.verify("healthy").pk_checksum == results["healthy"].pk_checksum
+
+        client.iterated = []
+        rerun = CollectionVerifier(batch_size=64, cache_file=cache_file, milvus_client=client) \
+            .verify_all(["healthy", "miscount", "missing"])
+        assert rerun["healthy"].cached and rerun["healthy"].ok
+        assert not rerun["miscount"].cached and not rerun["missing"].ok
+        assert client.iterated == ["miscount"]
+
+        client.iterated = []
+        segments["healthy"][3] = [5000]
+        changed = CollectionVerifier(batch_size=64, cache_file=cache_file, milvus_client=client) \
+            .verify_all(["healthy"])
+        assert not changed["healthy"].cached and changed["healthy"].count == 1008
+        assert client.iterated == ["healthy"]
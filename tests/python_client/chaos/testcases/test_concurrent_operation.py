@@ -21,6 +21,12 @@ from chaos.checker import (InsertChecker,
 from utils.util_k8s import wait_pods_ready, get_milvus_instance_name
 from utils.util_log import test_log as log
 from chaos import chaos_commons as cc
+from chaos.checker_bootstrap import CheckerBootstrap, CheckerSpec
+from chaos.async_checker import (AsyncSearchChecker,
+                                 AsyncQueryChecker,
+                                 AsyncInsertChecker,
+                                 AsyncUpsertChecker,
+                                 LoadSpec)
 from common import common_func as cf
 from common.milvus_sys import MilvusSys
 from chaos.chaos_commons import assert_statistic
@@ -73,22 +79,25 @@ class TestOperations(TestBase):
         self.milvus_ns = milvus_ns
         self.release_name = get_milvus_instance_name(self.milvus_ns, milvus_sys=self.milvus_sys)
 
-    def init_health_checkers(self, collection_name=None):
+    def init_health_checkers(self, collection_name=None, golden_prefix=None):
         c_name = collection_name
-        checkers = {
-            Op.insert: InsertChecker(collection_name=c_name),
-            Op.upsert: UpsertChecker(collection_name=c_name),
-            Op.flush: FlushChecker(collection_name=c_name),
-            Op.search: SearchChecker(collection_name=c_name),
-            Op.full_text_search: FullTextSearchChecker(collection_name=c_name),
-            Op.hybrid_search: HybridSearchChecker(collection_name=c_name),
-            Op.query: QueryChecker(collection_name=c_name),
-            Op.text_match: TextMatchChecker(collection_name=c_name),
-            Op.phrase_match: PhraseMatchChecker(collection_name=c_name),
-            Op.json_query: JsonQueryChecker(collection_name=c_name),
-            Op.delete: DeleteChecker(collection_name=c_name),
-            Op.add_field: AddFieldChecker(collection_name=c_name),
+        checker_classes = {
+            Op.insert: InsertChecker,
+            Op.upsert: UpsertChecker,
+            Op.flush: FlushChecker,
+            Op.search: SearchChecker,
+            Op.full_text_search: FullTextSearchChecker,
+            Op.hybrid_search: HybridSearchChecker,
+            Op.query: QueryChecker,
+            Op.text_match: TextMatchChecker,
+            Op.phrase_match: PhraseMatchChecker,
+            Op.json_query: JsonQueryChecker,
+            Op.delete: DeleteChecker,
+            Op.add_field: AddFieldChecker,
         }
+        # the collections are created, indexed, seeded and loaded concurrently before the checkers are built
+        bootstrap = CheckerBootstrap(golden_prefix=golden_prefix)
+        checkers = bootstrap.build({op: CheckerSpec(cls, collection_name=c_name) for op, cls in checker_classes.items()})
         log.info(f"init_health_checkers: {checkers}")
         self.health_checkers = checkers
 
@@ -99,14 +108,20 @@ class TestOperations(TestBase):
         yield request.param
 
     @pytest.mark.tags(CaseLabel.L3)
-    def test_operations(self, request_duration, is_check, collection_name):
+    def test_operations(self, request_duration, is_check, collection_name, golden_prefix):
         # start the monitor threads to check the milvus ops
         log.info("*********************Test Start**********************")
         log.info(connections.get_connection_addr('default'))
         # event_records = EventRecords()
-        c_name = collection_name if collection_name else cf.gen_unique_str("Checker_")
+        if collection_name:
+            c_name = collection_name
+        elif golden_prefix:
+            # the checkers share the golden collection of the previous sessions
+            c_name = f"{golden_prefix}_Checker"
+        else:
+            c_name = cf.gen_unique_str("Checker_")
         # event_records.insert("init_health_checkers", "start")
-        self.init_health_checkers(collection_name=c_name)
+        self.init_health_checkers(collection_name=c_name, golden_prefix=golden_prefix)
         # event_records.insert("init_health_checkers", "finished")
         cc.start_monitor_threads(self.health_checkers)
         log.info("*********************Load Start**********************")
@@ -127,3 +142,43 @@ class TestOperations(TestBase):
             assert_statistic(self.health_checkers)
             assert_expectations()
         log.info("*********************Chaos Test Completed**********************")
+
+    @pytest.mark.tags(CaseLabel.L3)
+    def test_operations_at_load_level(self, request_duration, is_check, load_level, collection_name):
+        # run the ops as coroutines of one event loop at controlled rates, scaled by load_level
+        log.info("*********************Test Start**********************")
+        c_name = collection_name if collection_name else cf.gen_unique_str("Checker_")
+        search_checker = SearchChecker(collection_name=c_name)
+        query_checker = QueryChecker(collection_name=c_name)
+        checkers = {
+            Op.search: AsyncSearchChecker.from_checker(search_checker),
+            Op.query: AsyncQueryChecker.from_checker(query_checker),
+            Op.insert: AsyncInsertChecker.from_checker(search_checker),
+            Op.upsert: AsyncUpsertChecker.from_checker(search_checker),
+        }
+        loads = {
+            Op.search: LoadSpec(rate=20 * load_level, concurrency=16),
+            Op.query: LoadSpec(rate=20 * load_level, concurrency=16),
+            Op.insert: LoadSpec(rate=1 * load_level, concurrency=4),
+            Op.upsert: LoadSpec(rate=0.2 * load_level, concurrency=2),
+        }
+        self.health_checkers = checkers
+        runtime = cc.start_async_monitor(checkers, loads)
+        log.info("*********************Load Start**********************")
+        request_duration = request_duration.replace("h", "*3600+").replace("m", "*60+").replace("s", "")
+        if request_duration[-1] == "+":
+            request_duration = request_duration[:-1]
+        request_duration = eval(request_duration)
+        for i in range(10):
+            sleep(request_duration // 10)
+            runtime.check_result()
+        wait_pods_ready(self.milvus_ns, f"app.kubernetes.io/instance={self.release_name}")
+        time.sleep(60)
+        runtime.stop()
+        runtime.check_result()
+        ra = ResultAnalyzer()
+        ra.get_stage_success_rate()
+        if is_check:
+            assert_statistic(self.health_checkers)
+            assert_expectations()
+        log.info("*********************Chaos Test Completed**********************")
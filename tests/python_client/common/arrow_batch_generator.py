@@ -0,0 +1,230 @@
+from typing import Dict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pymilvus import CollectionSchema, DataType
+
+from utils.util_log import test_log as log
+
+# key space and nnz of the generated sparse vectors, same as bulk_insert_data.gen_sparse_vectors
+SPARSE_MAX_INDEX = 1000
+SPARSE_NNZ = (20, 30)
+DEFAULT_MAX_ARRAY_LENGTH = 10
+
+# arrow types accepted by the parquet reader of the import (internal/util/importutilv2/parquet),
+# the reader only handles string (not large_string) and list (not large_list / fixed_size_list) columns
+SCALAR_TYPES = {
+    DataType.BOOL: pa.bool_(),
+    DataType.INT8: pa.int8(),
+    DataType.INT16: pa.int16(),
+    DataType.INT32: pa.int32(),
+    DataType.INT64: pa.int64(),
+    DataType.FLOAT: pa.float32(),
+    DataType.DOUBLE: pa.float64(),
+    DataType.VARCHAR: pa.string(),
+    DataType.JSON: pa.string(),
+}
+VECTOR_TYPES = {
+    DataType.FLOAT_VECTOR: pa.list_(pa.float32()),
+    DataType.BINARY_VECTOR: pa.list_(pa.uint8()),
+    DataType.FLOAT16_VECTOR: pa.list_(pa.uint8()),
+    DataType.BFLOAT16_VECTOR: pa.list_(pa.uint8()),
+    DataType.INT8_VECTOR: pa.list_(pa.int8()),
+    DataType.SPARSE_FLOAT_VECTOR: pa.struct([("indices", pa.list_(pa.uint32())),
+                                             ("values", pa.list_(pa.float32()))]),
+}
+
+
+def _offsets(lengths: np.ndarray) -> np.ndarray:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _to_str(values) -> pa.Array:
+    return pa.array(values).cast(pa.string())
+
+
+class ArrowBatchGenerator:
+    """
+    Generate bulk insert data of a collection schema as pyarrow RecordBatches.
+
+    Every column is built from flat NumPy arrays: list columns (vectors, arrays, sparse vectors)
+    are a values buffer plus offsets, strings and json are assembled by arrow compute kernels, so
+    no Python object is created per row and no pandas conversion is needed. The batches can be
+    written by write_parquet or by ParquetChunkWriter.
+
+    The auto id primary key and the function output fields are not generated. Primary keys are
+    start + row, so batches generated with disjoint [start, start + rows) ranges have unique pks.
+    """
+
+    def __init__(self, schema: CollectionSchema, array_length=None, null_ratio=0.0, empty_sparse_ratio=0.1,
+                 seed=None):
+        """
+        Args:
+            schema: Collection schema, dims, max_length and max_capacity are read from the field params
+            array_length: Length of every array, default to random lengths up to min(max_capacity, 10)
+            null_ratio: Ratio of null values of the nullable fields
+            empty_sparse_ratio: Ratio of empty sparse vectors
+            seed: Base seed, every batch is generated from (seed, start)
+        """
+        self.schema = schema
+        self.array_length = array_length
+        self.null_ratio = null_ratio
+        self.empty_sparse_ratio = empty_sparse_ratio
+        self.seed = seed
+        self.fields = [f for f in schema.fields
+                       if not f.auto_id and not getattr(f, "is_function_output", False)]
+        arrow_fields = [pa.field(f.name, self.arrow_type(f), nullable=f.nullable) for f in self.fields]
+        if schema.enable_dynamic_field:
+            arrow_fields.append(pa.field("$meta", pa.string()))
+        self.arrow_schema = pa.schema(arrow_fields)
+
+    @staticmethod
+    def arrow_type(field) -> pa.DataType:
+        if field.dtype == DataType.ARRAY:
+            if field.element_type not in SCALAR_TYPES or field.element_type == DataType.JSON:
+                raise Exception(f"unsupported element type {field.element_type} of array field {field.name}")
+            return pa.list_(SCALAR_TYPES[field.element_type])
+        if field.dtype in SCALAR_TYPES:
+            return SCALAR_TYPES[field.dtype]
+        if field.dtype in VECTOR_TYPES:
+            return VECTOR_TYPES[field.dtype]
+        raise Exception(f"unsupported data type {field.dtype} of field {field.name}")
+
+    def gen_scalars(self, rng, dtype, n, start=0, is_primary=False, max_length=None) -> pa.Array:
+        if dtype == DataType.BOOL:
+            return pa.array(rng.random(n) < 0.5)
+        if dtype in (DataType.INT8, DataType.INT16, DataType.INT32, DataType.INT64):
+            np_type = {DataType.INT8: np.int8, DataType.INT16: np.int16,
+                       DataType.INT32: np.int32, DataType.INT64: np.int64}[dtype]
+            if is_primary:
+                return pa.array(np.arange(start, start + n, dtype=np_type))
+            info = np.iinfo(np_type)
+            low, high = max(info.min, -999999), min(info.max, 9999999)
+            return pa.array(rng.integers(low, high, n, dtype=np_type, endpoint=True))
+        if dtype == DataType.FLOAT:
+            return pa.array(rng.random(n, dtype=np.float32))
+        if dtype == DataType.DOUBLE:
+            return pa.array(rng.random(n))
+        if dtype == DataType.VARCHAR:
+            # "<row id>_<random int>", unique for the primary key
+            keys = _to_str(np.arange(start, start + n)) if is_primary else _to_str(rng.integers(0, n, n))
+            suffix = _to_str(rng.integers(0, 2 ** 31, n))
+            values = pc.binary_join_element_wise(keys, suffix, "_")
+            if max_length is not None:
+                values = pc.utf8_slice_codeunits(values, 0, max_length)
+            return values
+        raise Exception(f"unsupported scalar type {dtype}")
+
+    def gen_json(self, rng, n, start=0) -> pa.Array:
+        ids = _to_str(np.arange(start, start + n))
+        return pc.binary_join_element_wise(
+            '{"number": ', ids, ', "float": ', _to_str(rng.random(n)), ', "name": "name_',
+            _to_str(rng.integers(0, 2 ** 31, n)), '", "array": [', ids, ', ', _to_str(rng.integers(0, 100, n)),
+            ']}', "")
+
+    def gen_array(self, rng, field, n) -> pa.Array:
+        max_capacity = int(field.params.get("max_capacity", DEFAULT_MAX_ARRAY_LENGTH))
+        if self.array_length is not None:
+            lengths = np.full(n, min(self.array_length, max_capacity), dtype=np.int32)
+        else:
+            lengths = rng.integers(0, min(max_capacity, DEFAULT_MAX_ARRAY_LENGTH), n, dtype=np.int32, endpoint=True)
+        offsets = _offsets(lengths)
+        values = self.gen_scalars(rng, field.element_type, int(offsets[-1]),
+                                  max_length=field.params.get("max_length"))
+        return pa.ListArray.from_arrays(pa.array(offsets), values)
+
+    def gen_vectors(self, rng, field, n) -> pa.Array:
+        dtype = field.dtype
+        if dtype == DataType.SPARSE_FLOAT_VECTOR:
+            return self.gen_sparse_vectors(rng, n)
+        dim = int(field.params["dim"])
+        if dtype == DataType.FLOAT_VECTOR:
+            values, width = rng.random(n * dim, dtype=np.float32), dim
+        elif dtype == DataType.FLOAT16_VECTOR:
+            values, width = rng.random(n * dim, dtype=np.float32).astype(np.float16).view(np.uint8), dim * 2
+        elif dtype == DataType.BFLOAT16_VECTOR:
+            # bfloat16 is the high half of the float32 bits
+            bits = rng.random(n * dim, dtype=np.float32).view(np.uint32) >> 16
+            values, width = bits.astype("<u2").view(np.uint8), dim * 2
+        elif dtype == DataType.BINARY_VECTOR:
+            values, width = rng.integers(0, 256, n * (dim // 8), dtype=np.uint8), dim // 8
+        else:
+            values, width = rng.integers(-128, 128, n * dim, dtype=np.int8), dim
+        offsets = np.arange(0, (n + 1) * width, width, dtype=np.int32)
+        return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values))
+
+    def gen_sparse_vectors(self, rng, n) -> pa.Array:
+        nnz = rng.integers(SPARSE_NNZ[0], SPARSE_NNZ[1], n, dtype=np.int32, endpoint=True)
+        nnz[rng.random(n) < self.empty_sparse_ratio] = 0
+        offsets = _offsets(nnz)
+        total = int(offsets[-1])
+        # strictly increasing indices of each row from random gaps, all below SPARSE_MAX_INDEX
+        gaps = rng.integers(1, SPARSE_MAX_INDEX // SPARSE_NNZ[1], total, endpoint=True).astype(np.int64)
+        cum = np.cumsum(gaps)
+        row_base = np.concatenate([[0], cum])[offsets[:-1]]
+        indices = (cum - np.repeat(row_base, nnz) - 1).astype(np.uint32)
+        values = rng.random(total, dtype=np.float32)
+        pa_offsets = pa.array(offsets)
+        return pa.StructArray.from_arrays(
+            [pa.ListArray.from_arrays(pa_offsets, pa.array(indices)),
+             pa.ListArray.from_arrays(pa_offsets, pa.array(values))],
+            names=["indices", "values"])
+
+    def with_nulls(self, rng, arr: pa.Array) -> pa.Array:
+        if self.null_ratio <= 0:
+            return arr
+        mask = pa.array(rng.random(len(arr)) < self.null_ratio)
+        return pc.if_else(mask, pa.nulls(len(arr), arr.type), arr)
+
+    def gen_column(self, rng, field, start, rows) -> pa.Array:
+        if field.dtype == DataType.ARRAY:
+            arr = self.gen_array(rng, field, rows)
+        elif field.dtype == DataType.JSON:
+            arr = self.gen_json(rng, rows, start)
+        elif field.dtype in VECTOR_TYPES:
+            arr = self.gen_vectors(rng, field, rows)
+        else:
+            arr = self.gen_scalars(rng, field.dtype, rows, start=start, is_primary=field.is_primary,
+                                   max_length=field.params.get("max_length"))
+        if field.nullable:
+            arr = self.with_nulls(rng, arr)
+        return arr
+
+    def gen_batch(self, start: int, rows: int) -> pa.RecordBatch:
+        """generate the rows [start, start + rows)"""
+        rng = np.random.default_rng(None if self.seed is None else [self.seed, start])
+        columns = [self.gen_column(rng, field, start, rows) for field in self.fields]
+        if self.schema.enable_dynamic_field:
+            ids = _to_str(np.arange(start, start + rows))
+            columns.append(pc.binary_join_element_wise('{"dynamic_id": ', ids, ', "dynamic_name": "name_', ids,
+                                                       '"}', ""))
+        return pa.RecordBatch.from_arrays(columns, schema=self.arrow_schema)
+
+    def __call__(self, start: int, rows: int) -> pa.RecordBatch:
+        return self.gen_batch(start, rows)
+
+    def write_parquet(self, file, rows, batch_rows=100000, row_group_size=None, start=0) -> int:
+        """
+        Write rows [start, start + rows) to a parquet file batch by batch with ParquetWriter
+
+        Returns:
+            int: rows written
+        """
+        with pq.ParquetWriter(file, self.arrow_schema) as writer:
+            for batch_start in range(start, start + rows, batch_rows):
+                batch = self.gen_batch(batch_start, min(batch_rows, start + rows - batch_start))
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=row_group_size)
+        log.info(f"wrote {rows} rows to {file}")
+        return rows
+
+
+def gen_arrow_batch(start, rows, schema: Dict, seed=None, **kwargs) -> pa.RecordBatch:
+    """
+    module level wrapper of ArrowBatchGenerator.gen_batch for process pools, the schema is passed as
+    CollectionSchema.to_dict() and rebuilt in the worker since a CollectionSchema can not be unpickled
+    """
+    return ArrowBatchGenerator(CollectionSchema.construct_from_dict(schema), seed=seed, **kwargs).gen_batch(start, rows)
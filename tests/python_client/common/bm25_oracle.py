@@ -0,0 +1,262 @@
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import jieba
+import numpy as np
+from bm25s.tokenization import Tokenizer
+from scipy import sparse
+
+from utils.util_log import test_log as log
+
+
+def _remove_punctuation(text):
+    text = text.strip()
+    text = text.replace("\n", " ")
+    return re.sub(r'[^\w\s]', ' ', text)
+
+
+def _jieba_split(text):
+    return jieba.lcut(_remove_punctuation(text))
+
+
+def build_bm25_tokenizer(language="en"):
+    """
+    Build the same bm25s tokenizer used by common_func.get_bm25_ground_truth
+
+    A bm25s tokenizer only adds terms to its vocabulary on the first tokenize call and drops the
+    unseen terms of the later calls, so build a new one for every batch of texts.
+
+    Args:
+        language: 'zh'/'cn'/'chinese' uses jieba, the other languages the default regex splitter,
+            english stopwords are only removed for 'en'/'english'
+
+    Returns:
+        Tokenizer: bm25s tokenizer
+    """
+    stopwords = "english" if language in ["en", "english"] else [" "]
+    if language in ["zh", "cn", "chinese"]:
+        return Tokenizer(stemmer=None, splitter=_jieba_split, stopwords=stopwords)
+    return Tokenizer(stemmer=None, stopwords=stopwords)
+
+
+def _tokenize_chunk(args):
+    """Process pool worker: tokenize a chunk of texts into lists of token strings"""
+    texts, language = args
+    tokenizer = build_bm25_tokenizer(language)
+    return tokenizer.tokenize(list(texts), return_as="string", show_progress=False)
+
+
+class BM25Oracle:
+    """
+    Reusable BM25 ground truth engine.
+
+    The corpus is tokenized once and kept as a sparse (doc x term) term-frequency matrix,
+    batched queries are answered with a single sparse matrix product, and documents can be
+    added or deleted incrementally, so FTS results can be checked after upsert and delete
+    without rebuilding the index.
+
+    Scoring follows the BM25 formula of the Milvus sparse index, the ranking is the same as
+    bm25s (lucene method), the scores differ from bm25s by the constant factor (k1 + 1):
+        idf(t) = log(1 + (N - df(t) + 0.5) / (df(t) + 0.5))
+        score(q, d) = sum_t qtf(t) * idf(t) * tf(t, d) * (k1 + 1) / (tf(t, d) + k1 * (1 - b + b * dl / avgdl))
+    """
+
+    def __init__(self, language="en", k1=1.5, b=0.75, num_workers=1, parallel_threshold=50000,
+                 chunk_size=10000):
+        """
+        Args:
+            language: Language of the corpus, decides the tokenizer
+            k1: BM25 k1 parameter, keep it in sync with the bm25_k1 index param
+            b: BM25 b parameter, keep it in sync with the bm25_b index param
+            num_workers: Number of processes used to tokenize large corpora
+            parallel_threshold: Minimum number of texts before tokenization is done in a process pool
+            chunk_size: Number of texts per process pool task
+        """
+        self.language = language
+        self.k1 = k1
+        self.b = b
+        self.num_workers = num_workers
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+        self.vocab: Dict[str, int] = {}
+        self.doc_ids: List = []
+        self.id_to_row: Dict = {}
+        self._blocks: List[sparse.csr_matrix] = []
+        self._tf = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._weights = None
+
+    @property
+    def num_docs(self) -> int:
+        return int(self._alive.sum())
+
+    def tokenize(self, texts: Sequence[str]) -> List[List[str]]:
+        """
+        Tokenize texts, in a process pool when the batch is large enough
+
+        Args:
+            texts: Texts to tokenize
+
+        Returns:
+            List[List[str]]: tokens of each text
+        """
+        texts = ["" if t is None else t for t in texts]
+        if self.num_workers <= 1 or len(texts) < self.parallel_threshold:
+            return build_bm25_tokenizer(self.language).tokenize(texts, return_as="string", show_progress=False)
+        chunks = [(texts[i:i + self.chunk_size], self.language) for i in range(0, len(texts), self.chunk_size)]
+        tokens = []
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            for chunk_tokens in executor.map(_tokenize_chunk, chunks):
+                tokens.extend(chunk_tokens)
+        return tokens
+
+    def _to_term_matrix(self, tokens: List[List[str]], update_vocab: bool) -> sparse.csr_matrix:
+        indptr = [0]
+        indices = []
+        for doc_tokens in tokens:
+            for token in doc_tokens:
+                term_id = self.vocab.get(token)
+                if term_id is None:
+                    if not update_vocab:
+                        continue
+                    term_id = len(self.vocab)
+                    self.vocab[token] = term_id
+                indices.append(term_id)
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        # duplicated (row, col) entries are summed, which gives the term frequency
+        matrix = sparse.csr_matrix((data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+                                   shape=(len(tokens), len(self.vocab)))
+        matrix.sum_duplicates()
+        return matrix
+
+    def _term_frequency(self) -> sparse.csr_matrix:
+        if self._blocks:
+            vocab_size = len(self.vocab)
+            blocks = [self._tf] + self._blocks
+            for i, block in enumerate(blocks):
+                if block.shape[1] < vocab_size:
+                    blocks[i] = sparse.csr_matrix((block.data, block.indices, block.indptr),
+                                                  shape=(block.shape[0], vocab_size))
+            self._tf = sparse.vstack(blocks, format="csr")
+            self._blocks = []
+        return self._tf
+
+    def add_documents(self, texts: Sequence[str], ids: Optional[Sequence] = None):
+        """
+        Add documents to the index, documents with an existing id are replaced (upsert)
+
+        Args:
+            texts: Document texts
+            ids: Document ids (primary keys), default to the insertion order
+        """
+        texts = list(texts)
+        if ids is None:
+            ids = list(range(len(self.doc_ids), len(self.doc_ids) + len(texts)))
+        ids = list(ids)
+        if len(ids) != len(texts):
+            raise ValueError(f"ids length {len(ids)} does not match texts length {len(texts)}")
+        self.delete_documents([i for i in ids if i in self.id_to_row])
+        t0 = time.time()
+        self._blocks.append(self._to_term_matrix(self.tokenize(texts), update_vocab=True))
+        for pk in ids:
+            self.id_to_row[pk] = len(self.doc_ids)
+            self.doc_ids.append(pk)
+        self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+        self._weights = None
+        log.debug(f"BM25Oracle indexed {len(texts)} docs, vocab size {len(self.vocab)}, "
+                  f"cost {time.time() - t0:.3f}s")
+
+    def upsert_documents(self, texts: Sequence[str], ids: Sequence):
+        """Same as add_documents with explicit ids, kept for readability in upsert test cases"""
+        self.add_documents(texts, ids)
+
+    def delete_documents(self, ids: Sequence):
+        """
+        Delete documents from the index, unknown ids are ignored
+
+        Args:
+            ids: Document ids (primary keys) to delete
+        """
+        for pk in ids:
+            row = self.id_to_row.pop(pk, None)
+            if row is not None:
+                self._alive[row] = False
+                self._weights = None
+
+    def compact(self):
+        """Physically drop deleted rows, useful after many deletes"""
+        tf = self._term_frequency()
+        rows = np.flatnonzero(self._alive)
+        self._tf = tf[rows]
+        self.doc_ids = [self.doc_ids[r] for r in rows]
+        self.id_to_row = {pk: i for i, pk in enumerate(self.doc_ids)}
+        self._alive = np.ones(len(self.doc_ids), dtype=bool)
+        self._weights = None
+
+    def _doc_weights(self) -> sparse.csr_matrix:
+        """(term x doc) BM25 weights, deleted docs are zeroed, cached until the next change"""
+        if self._weights is not None:
+            return self._weights
+        tf = self._term_frequency()
+        alive = self._alive.astype(np.float32)
+        tf = sparse.diags(alive).dot(tf).tocsr()
+        tf.eliminate_zeros()
+        num_docs = max(int(self._alive.sum()), 1)
+        doc_len = np.asarray(tf.sum(axis=1)).ravel()
+        avg_doc_len = max(doc_len.sum() / num_docs, 1e-9)
+        df = np.bincount(tf.indices, minlength=tf.shape[1]).astype(np.float64)
+        idf = np.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+        row_of_nnz = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        norm = self.k1 * (1 - self.b + self.b * doc_len[row_of_nnz] / avg_doc_len)
+        data = idf[tf.indices] * tf.data * (self.k1 + 1) / (tf.data + norm)
+        weights = sparse.csr_matrix((data.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+        self._weights = weights.T.tocsr()
+        return self._weights
+
+    def get_scores(self, queries: Sequence[str]) -> sparse.csr_matrix:
+        """
+        Args:
+            queries: Query texts
+
+        Returns:
+            sparse.csr_matrix: (nq x num_rows) BM25 scores, rows are indexed by internal row number
+        """
+        if isinstance(queries, str):
+            queries = [queries]
+        weights = self._doc_weights()
+        query_tf = self._to_term_matrix(self.tokenize(queries), update_vocab=False)
+        return query_tf.dot(weights).tocsr()
+
+    def search(self, queries: Sequence[str], top_k=100, batch_size=1000) -> Tuple[List[List], List[List[float]]]:
+        """
+        Batched top-k BM25 search
+
+        Args:
+            queries: Query text or list of query texts
+            top_k: Number of results for each query
+            batch_size: Number of queries scored per sparse matrix product
+
+        Returns:
+            Tuple[List[List], List[List[float]]]: ids and scores of each query, sorted by score desc,
+                documents without any matched term are not returned
+        """
+        if isinstance(queries, str):
+            queries = [queries]
+        all_ids, all_scores = [], []
+        doc_ids = np.asarray(self.doc_ids, dtype=object)
+        for start in range(0, len(queries), batch_size):
+            scores = self.get_scores(queries[start:start + batch_size])
+            for i in range(scores.shape[0]):
+                row = scores.getrow(i)
+                cols, values = row.indices, row.data
+                if len(values) > top_k:
+                    part = np.argpartition(-values, top_k - 1)[:top_k]
+                    cols, values = cols[part], values[part]
+                # sort by score desc, then by row to keep the order stable
+                order = np.lexsort((cols, -values))
+                all_ids.append(doc_ids[cols[order]].tolist())
+                all_scores.append(values[order].tolist())
+        return all_ids, all_scores
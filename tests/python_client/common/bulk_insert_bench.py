@@ -0,0 +1,267 @@
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from prettytable import PrettyTable
+
+from common.bulk_insert_data import (
+    DataField,
+    data_source,
+    gen_csv_files,
+    gen_new_json_files,
+    gen_npy_files,
+    gen_parquet_files,
+)
+from common.bulk_insert_writer import GB
+from common.import_job_tracker import ImportJobTracker, MB, rest_progress_fetcher
+from common.minio_comm import MinioUploader
+from utils.util_log import test_log as log
+
+FILE_TYPES = ("parquet", "numpy", "json", "csv")
+# data field of each vector type, the collection field of the case must use the same name
+VECTOR_FIELDS = {
+    "float": DataField.vec_field,
+    "binary": DataField.binary_vec_field,
+    "fp16": DataField.fp16_vec_field,
+    "bf16": DataField.bf16_vec_field,
+}
+# the csv generator only writes float or binary vectors
+UNSUPPORTED_VECTOR_TYPES = {
+    "csv": ("fp16", "bf16"),
+}
+# rows of the sample file used to size the files of the generators without file_size support
+SAMPLE_ROWS = 2000
+
+
+@dataclass
+class BenchCase:
+    """
+    One scenario of the bulk insert benchmark
+
+    file_size is the size of every file in GB, when it is set rows is ignored, except for csv where
+    the rows of a file are estimated from a sample file.
+    """
+    file_type: str
+    rows: int = 100000
+    file_size: Optional[float] = None
+    file_nums: int = 1
+    row_group_size: Optional[int] = None
+    dim: int = 128
+    vector_type: str = "float"
+    num_workers: int = 1
+
+    @property
+    def name(self) -> str:
+        size = f"{self.file_size}GB" if self.file_size is not None else f"{self.rows}rows"
+        name = f"{self.file_type}-{self.vector_type}-dim{self.dim}-{size}x{self.file_nums}"
+        if self.row_group_size is not None:
+            name += f"-rg{self.row_group_size}"
+        return name
+
+    @property
+    def vector_field(self) -> str:
+        return VECTOR_FIELDS[self.vector_type]
+
+    def check(self):
+        if self.file_type not in FILE_TYPES:
+            raise Exception(f"unsupported file type {self.file_type}, expected one of {FILE_TYPES}")
+        if self.vector_type not in VECTOR_FIELDS:
+            raise Exception(f"unsupported vector type {self.vector_type}, expected one of {list(VECTOR_FIELDS)}")
+        if self.vector_type in UNSUPPORTED_VECTOR_TYPES.get(self.file_type, ()):
+            raise Exception(f"{self.file_type} files do not support {self.vector_type} vectors")
+
+
+@dataclass
+class BenchResult:
+    case: BenchCase
+    success: bool = False
+    files: int = 0
+    rows: int = 0
+    bytes: int = 0
+    gen_seconds: float = 0.0
+    upload_seconds: float = 0.0
+    queue_seconds: float = 0.0
+    import_seconds: float = 0.0
+    index_seconds: float = 0.0
+    time_in_state: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.import_seconds if self.import_seconds > 0 else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / MB / self.import_seconds if self.import_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        res = asdict(self)
+        res["case"] = {"name": self.case.name, **asdict(self.case)}
+        res["rows_per_second"] = self.rows_per_second
+        res["mb_per_second"] = self.mb_per_second
+        return res
+
+
+def _gen_files(case: BenchCase, data_fields, rows, file_size, file_nums, schema=None, seed=None) -> List[str]:
+    float_vector = case.vector_type != "binary"
+    if case.file_type == "parquet":
+        return gen_parquet_files(float_vector=float_vector, rows=rows, dim=case.dim, data_fields=data_fields,
+                                 file_size=file_size, row_group_size=case.row_group_size, file_nums=file_nums,
+                                 schema=schema, num_workers=case.num_workers, seed=seed)
+    if case.file_type == "numpy":
+        return gen_npy_files(float_vector=float_vector, rows=rows, dim=case.dim, data_fields=data_fields,
+                             file_size=file_size, file_nums=file_nums, force=True, schema=schema,
+                             num_workers=case.num_workers, seed=seed)
+    if case.file_type == "json":
+        return gen_new_json_files(float_vector=float_vector, rows=rows, dim=case.dim, data_fields=data_fields,
+                                  file_size=file_size, file_nums=file_nums, schema=schema,
+                                  num_workers=case.num_workers, seed=seed)
+    # the csv generator adds the pk field when auto_id is False, the bench collections use auto id
+    return gen_csv_files(rows=rows, dim=case.dim, auto_id=True, float_vector=float_vector,
+                         data_fields=list(data_fields), file_nums=file_nums, force=True,
+                         num_workers=case.num_workers, seed=seed)
+
+
+def estimate_rows(case: BenchCase, data_fields, file_size, schema=None) -> int:
+    """rows of a file of file_size GB, measured on a sample file"""
+    sample = _gen_files(case, data_fields, SAMPLE_ROWS, None, 1, schema=schema)
+    sample_bytes = sum(os.path.getsize(f"{data_source}/{f}") for f in sample)
+    for f in sample:
+        os.remove(f"{data_source}/{f}")
+    return max(1, math.ceil(file_size * GB / (sample_bytes / SAMPLE_ROWS)))
+
+
+def gen_bench_files(case: BenchCase, data_fields, schema=None, seed=None) -> List[str]:
+    """
+    Generate the files of a case under data_source
+
+    With file_size set, the sized generators only write a single file (set), so every file is
+    generated by its own call and the primary keys of the files overlap, the bench collections
+    use auto id.
+
+    Returns:
+        List[str]: file names relative to data_source
+    """
+    case.check()
+    if case.file_size is None:
+        return _gen_files(case, data_fields, case.rows, None, case.file_nums, schema=schema, seed=seed)
+    if case.file_type == "csv":
+        rows = estimate_rows(case, data_fields, case.file_size, schema=schema)
+        log.info(f"estimated {rows} rows for a {case.file_size} GB csv file")
+        return _gen_files(case, data_fields, rows, None, case.file_nums, schema=schema, seed=seed)
+    files = []
+    for i in range(case.file_nums):
+        files.extend(_gen_files(case, data_fields, case.rows, case.file_size, 1, schema=schema,
+                                seed=None if seed is None else seed + i))
+    return files
+
+
+def group_import_files(file_type, files: List[str]) -> List[List[str]]:
+    """
+    Files of the import request, a numpy group is the set of field files of one folder,
+    every file of the other formats is a group of its own
+    """
+    if file_type != "numpy":
+        return [[f] for f in files]
+    groups = OrderedDict()
+    for f in files:
+        groups.setdefault(os.path.dirname(f), []).append(f)
+    return list(groups.values())
+
+
+class BulkInsertBench:
+    """
+    Run bulk insert cases phase by phase and keep the results.
+
+    Each case is generated locally, uploaded to minio, imported by a single import job and then
+    indexed. The phases are timed separately: gen, upload, queue (time the job spent pending),
+    import (time from leaving the queue to completion) and index, so the formats can be compared
+    on the import itself instead of the end to end time. The results are written as a table and
+    as json to result_dir after every case.
+    """
+
+    def __init__(self, uploader: MinioUploader, import_job_client, result_dir="/tmp/bulk_insert_bench",
+                 timeout=1800, results: Optional[List[BenchResult]] = None):
+        """
+        Args:
+            uploader: Uploader of the milvus bucket
+            import_job_client: RESTful client with create_import_jobs(payload) and get_import_job_progress(job_id)
+            result_dir: Directory of results.json and results.txt
+            timeout: Timeout of an import job in seconds
+            results: Results of the previous cases to keep in the report, e.g. shared by the cases of a test class
+        """
+        self.uploader = uploader
+        self.import_job_client = import_job_client
+        self.result_dir = result_dir
+        self.timeout = timeout
+        self.results: List[BenchResult] = results if results is not None else []
+
+    def run(self, case: BenchCase, collection_name, data_fields, schema=None,
+            build_index: Optional[Callable[[], None]] = None, seed=None) -> BenchResult:
+        """
+        Args:
+            case: Case to run
+            collection_name: Collection created with the fields of the case
+            data_fields: Data fields of the files, the vector field must be case.vector_field
+            schema: Collection schema passed to the generators for dims and nullables
+            build_index: Called after the import, e.g. create the index and wait for it to be built
+            seed: Base seed of the generators
+        """
+        result = BenchResult(case=case)
+        log.info(f"bulk insert bench case {case.name} started")
+
+        t0 = time.time()
+        files = gen_bench_files(case, data_fields, schema=schema, seed=seed)
+        result.gen_seconds = time.time() - t0
+        groups = group_import_files(case.file_type, files)
+        import_files = [f for group in groups for f in group]
+        result.files = len(import_files)
+        result.bytes = sum(os.path.getsize(f"{data_source}/{f}") for f in import_files)
+
+        t0 = time.time()
+        self.uploader.upload_files([(f"{data_source}/{f}", f) for f in import_files], force=True)
+        result.upload_seconds = time.time() - t0
+
+        t0 = time.time()
+        rsp = self.import_job_client.create_import_jobs({"collectionName": collection_name, "files": groups})
+        job_id = rsp["data"]["jobId"]
+        tracker = ImportJobTracker(rest_progress_fetcher(self.import_job_client))
+        tracker.track([job_id], start_ts=t0)
+        result.success = tracker.wait([job_id], timeout=self.timeout)
+        metrics = tracker.metrics([job_id])[0]
+        result.rows = metrics["imported_rows"]
+        result.time_in_state = metrics["time_in_state"]
+        result.queue_seconds = result.time_in_state.get("Pending", 0.0)
+        result.import_seconds = metrics["seconds"] - result.queue_seconds
+
+        if result.success and build_index is not None:
+            t0 = time.time()
+            build_index()
+            result.index_seconds = time.time() - t0
+
+        self.results.append(result)
+        log.info(f"bulk insert bench case {case.name} finished: {json.dumps(result.to_dict())}")
+        self.save()
+        return result
+
+    def table(self) -> PrettyTable:
+        table = PrettyTable(["case", "success", "files", "size(MB)", "rows", "gen(s)", "upload(s)", "queue(s)",
+                             "import(s)", "index(s)", "rows/s", "MB/s"])
+        for r in self.results:
+            table.add_row([r.case.name, r.success, r.files, f"{r.bytes / MB:.1f}", r.rows, f"{r.gen_seconds:.1f}",
+                           f"{r.upload_seconds:.1f}", f"{r.queue_seconds:.1f}", f"{r.import_seconds:.1f}",
+                           f"{r.index_seconds:.1f}", f"{r.rows_per_second:.0f}", f"{r.mb_per_second:.2f}"])
+        return table
+
+    def save(self):
+        Path(self.result_dir).mkdir(parents=True, exist_ok=True)
+        with open(f"{self.result_dir}/results.json", "w") as f:
+            json.dump([r.to_dict() for r in self.results], f, indent=2)
+        table = self.table()
+        with open(f"{self.result_dir}/results.txt", "w") as f:
+            f.write(table.get_string() + "\n")
+        log.info(f"bulk insert bench results:\n{table}")
@@ -2,6 +2,8 @@ import copy
 import json
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 import numpy as np
 from ml_dtypes import bfloat16
@@ -13,6 +15,11 @@ from faker import Faker
 from sklearn import preprocessing
 from common.common_func import gen_unique_str
 from common.minio_comm import copy_files_to_minio
+from common.bulk_insert_writer import GB, CsvWriter, JsonChunkWriter, JsonRowsWriter, NpyChunkWriter, ParquetChunkWriter, \
+    block_rows_by_size, format_csv_vectors, gen_vector_chunk, raw_token, write_chunks, write_chunks_to_size, \
+    write_npy_vectors
+from common.arrow_batch_generator import gen_arrow_batch
+from common.bulk_insert_verifier import ChecksumWriter
 from utils.util_log import test_log as log
 import pyarrow as pa
 
@@ -81,9 +88,72 @@ def entity_suffix(rows):
     return suffix
 
 
+def derive_seed(seed, *keys):
+    """
+    derive an independent seed for a file or a chunk from the base seed and its index/start pk
+    """
+    if seed is None:
+        return None
+    return int(np.random.SeedSequence(seed, spawn_key=keys).generate_state(1)[0])
+
+
+def seed_random(seed):
+    """seed random, numpy and faker, the generators used by the gen_* functions"""
+    if seed is None:
+        return
+    random.seed(seed)
+    np.random.seed(seed)
+    fake.seed_instance(seed)
+
+
+def base_seed(seed=None):
+    """
+    base seed of a parallel generation, a random one is drawn when seed is None
+    since forked workers would share the faker and numpy states otherwise
+    """
+    return random.getrandbits(32) if seed is None else seed
+
+
+def schema_dict(schema):
+    """
+    the dict of a collection schema, the form passed to the generation workers since a
+    CollectionSchema can not be unpickled in a process pool
+    """
+    if schema is None or isinstance(schema, dict):
+        return schema
+    return schema.to_dict()
+
+
+def _run_file_task(task):
+    func, seed, kwargs = task
+    seed_random(seed)
+    return func(**kwargs)
+
+
+def run_file_tasks(func, tasks, seed=None, num_workers=1):
+    """
+    Run func(**task) for every task, in a process pool when num_workers > 1
+
+    The i-th task is seeded with derive_seed(seed, i) in both modes, so the generated data and the
+    order of the returned results do not depend on num_workers.
+
+    :param func: module level function generating one file (set)
+    :param tasks: list of kwargs of func, each task should have its own pk range
+    :param seed: base seed
+    :param num_workers: number of processes
+    :return list
+        the results of func in task order
+    """
+    seed = base_seed(seed)
+    jobs = [(func, derive_seed(seed, i), kwargs) for i, kwargs in enumerate(tasks)]
+    if num_workers <= 1 or len(jobs) <= 1:
+        return [_run_file_task(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(num_workers, len(jobs))) as executor:
+        return list(executor.map(_run_file_task, jobs))
+
+
 def gen_float_vectors(nb, dim):
-    vectors = [[random.random() for _ in range(dim)] for _ in range(nb)]
-    vectors = preprocessing.normalize(vectors, axis=1, norm='l2')
+    vectors = preprocessing.normalize(np.random.random((nb, dim)), axis=1, norm='l2')
     return vectors.tolist()
 
 
@@ -95,7 +165,7 @@ def gen_str_invalid_vectors(nb, dim):
 def gen_binary_vectors(nb, dim):
     # binary: each int presents 8 dimension
     # so if binary vector dimension is 16，use [x, y], which x and y could be any int between 0 and 255
-    vectors = [[random.randint(0, 255) for _ in range(dim)] for _ in range(nb)]
+    vectors = np.random.randint(0, 256, size=(nb, dim)).tolist()
     return vectors
 
 
@@ -141,128 +211,95 @@ def gen_bf16_vectors(num, dim, for_json=False):
     return raw_vectors, bf16_vectors
 
 
+def gen_json_columns_by_data_fields(data_fields, rows, start, str_pk, float_vect, dim, err_type="", wrong_row=-1):
+    """
+    generate a block of rows of the row based json file as columns, field name -> values of the rows.
+    The error of err_type is injected in the columns, wrong_row is the block offset of the wrong entity
+    """
+    columns = {}
+    for data_field in data_fields:
+        if data_field == DataField.pk_field:
+            if str_pk:
+                columns[data_field] = [gen_unique_str() for _ in range(rows)]
+            elif err_type == DataErrorType.float_on_int_pk:
+                columns[data_field] = (np.arange(start, start + rows) + np.random.random(rows)).tolist()
+            else:
+                columns[data_field] = list(range(start, start + rows))
+        if data_field == DataField.int_field:
+            if DataField.pk_field in data_fields:
+                # if not auto_id, use the same value as pk to check the query results later
+                columns[data_field] = list(range(start, start + rows))
+            else:
+                columns[data_field] = np.random.randint(-999999, 9999999, size=rows).tolist()
+        if data_field in [DataField.float_field, DataField.double_field]:
+            if err_type == DataErrorType.int_on_float_scalar:
+                columns[data_field] = np.random.randint(-999999, 9999999, size=rows).tolist()
+            elif err_type == DataErrorType.str_on_float_scalar:
+                columns[data_field] = [gen_unique_str() for _ in range(rows)]
+            else:
+                columns[data_field] = np.random.random(rows).tolist()
+        if data_field == DataField.string_field:
+            columns[data_field] = [gen_unique_str() for _ in range(rows)]
+        if data_field == DataField.bool_field:
+            if err_type == DataErrorType.typo_on_bool:
+                columns[data_field] = [raw_token(random.choice(["True", "False", "TRUE", "FALSE", "0", "1"]))
+                                       for _ in range(rows)]
+            else:
+                columns[data_field] = (np.random.random(rows) < 0.5).tolist()
+        if data_field == DataField.json_field:
+            columns[data_field] = [{gen_unique_str(): random.randint(-999999, 9999999)} for _ in range(rows)]
+        if data_field in [DataField.array_bool_field, DataField.array_int_field,
+                          DataField.array_float_field, DataField.array_string_field]:
+            if err_type == DataErrorType.empty_array_field:
+                columns[data_field] = [[] for _ in range(rows)]
+            elif err_type == DataErrorType.mismatch_type_array_field:
+                columns[data_field] = ["mistype"] * rows
+            elif data_field == DataField.array_bool_field:
+                columns[data_field] = (np.random.random((rows, 2)) < 0.5).tolist()
+            elif data_field == DataField.array_int_field:
+                columns[data_field] = np.random.randint(-999999, 9999999, size=(rows, 2)).tolist()
+            elif data_field == DataField.array_float_field:
+                columns[data_field] = np.random.random((rows, 2)).tolist()
+            else:
+                columns[data_field] = [[gen_unique_str(), gen_unique_str()] for _ in range(rows)]
+        if data_field == DataField.vec_field:
+            vectors = gen_float_vectors(rows, dim) if float_vect else gen_binary_vectors(rows, (dim // 8))
+            if 0 <= wrong_row < rows:
+                if err_type == DataErrorType.one_entity_wrong_dim:
+                    wrong_dim = dim + 8     # add 8 to compatible with binary vectors
+                    vectors[wrong_row] = gen_float_vectors(1, wrong_dim)[0] if float_vect else \
+                        gen_binary_vectors(1, (wrong_dim // 8))[0]
+                elif err_type == DataErrorType.str_on_vector_field:
+                    vectors[wrong_row] = gen_str_invalid_vectors(1, dim)[0] if float_vect else \
+                        gen_str_invalid_vectors(1, dim // 8)[0]
+            columns[data_field] = vectors
+    return columns
+
+
 def gen_row_based_json_file(row_file, str_pk, data_fields, float_vect,
                             rows, dim, start_uid=0, err_type="", enable_dynamic_field=False,  **kwargs):
-
+    """
+    generate the row based json file {"rows": [...]} block by block,
+    each block of rows is generated as columns and serialized at once
+    """
     if err_type == DataErrorType.str_on_int_pk:
         str_pk = True
+    wrong_row = -1
     if err_type in [DataErrorType.one_entity_wrong_dim, DataErrorType.str_on_vector_field]:
-        wrong_dim = dim + 8     # add 8 to compatible with binary vectors
         wrong_row = kwargs.get("wrong_position", start_uid)
-
-    with open(row_file, "w") as f:
-        f.write("{")
-        f.write("\n")
-        f.write('"rows":[')
-        f.write("\n")
-        for i in range(rows):
-            if i > 0:
-                f.write(",")
-                f.write("\n")
-
-            # scalar fields
-            f.write('{')
-            for j in range(len(data_fields)):
-                data_field = data_fields[j]
-                if data_field == DataField.pk_field:
-                    if str_pk:
-                        line = '"uid":"' + str(gen_unique_str()) + '"'
-                        f.write(line)
-                        # f.write('"uid":"' + str(gen_unique_str()) + '"')
-                    else:
-                        if err_type == DataErrorType.float_on_int_pk:
-                            f.write('"uid":' + str(i + start_uid + random.random()) + '')
-                        else:
-                            f.write('"uid":' + str(i + start_uid) + '')
-                if data_field == DataField.int_field:
-                    if DataField.pk_field in data_fields:
-                        # if not auto_id, use the same value as pk to check the query results later
-                        f.write('"int_scalar":' + str(i + start_uid) + '')
-                    else:
-                        line = '"int_scalar":' + str(random.randint(-999999, 9999999)) + ''
-                        f.write(line)
-                if data_field == DataField.float_field:
-                    if err_type == DataErrorType.int_on_float_scalar:
-                        f.write('"float_scalar":' + str(random.randint(-999999, 9999999)) + '')
-                    elif err_type == DataErrorType.str_on_float_scalar:
-                        f.write('"float_scalar":"' + str(gen_unique_str()) + '"')
-                    else:
-                        line = '"float_scalar":' + str(random.random()) + ''
-                        f.write(line)
-                if data_field == DataField.double_field:
-                    if err_type == DataErrorType.int_on_float_scalar:
-                        f.write('"double_scalar":' + str(random.randint(-999999, 9999999)) + '')
-                    elif err_type == DataErrorType.str_on_float_scalar:
-                        f.write('"double_scalar":"' + str(gen_unique_str()) + '"')
-                    else:
-                        line = '"double_scalar":' + str(random.random()) + ''
-                        f.write(line)
-                if data_field == DataField.string_field:
-                    f.write('"string_scalar":"' + str(gen_unique_str()) + '"')
-                if data_field == DataField.bool_field:
-                    if err_type == DataErrorType.typo_on_bool:
-                        f.write('"bool_scalar":' + str(random.choice(["True", "False", "TRUE", "FALSE", "0", "1"])) + '')
-                    else:
-                        f.write('"bool_scalar":' + str(random.choice(["true", "false"])) + '')
-                if data_field == DataField.json_field:
-                    data = {
-                        gen_unique_str(): random.randint(-999999, 9999999),
-                    }
-                    f.write('"json":' + json.dumps(data) + '')
-                if data_field == DataField.array_bool_field:
-                    if err_type == DataErrorType.empty_array_field:
-                        f.write('"array_bool":[]')
-                    elif err_type == DataErrorType.mismatch_type_array_field:
-                        f.write('"array_bool": "mistype"')
-                    else:
-
-                        f.write('"array_bool":[' + str(random.choice(["true", "false"])) + ',' + str(random.choice(["true", "false"])) + ']')
-                if data_field == DataField.array_int_field:
-                    if err_type == DataErrorType.empty_array_field:
-                        f.write('"array_int":[]')
-                    elif err_type == DataErrorType.mismatch_type_array_field:
-                        f.write('"array_int": "mistype"')
-                    else:
-                        f.write('"array_int":[' + str(random.randint(-999999, 9999999)) + ',' + str(random.randint(-999999, 9999999)) + ']')
-                if data_field == DataField.array_float_field:
-                    if err_type == DataErrorType.empty_array_field:
-                        f.write('"array_float":[]')
-                    elif err_type == DataErrorType.mismatch_type_array_field:
-                        f.write('"array_float": "mistype"')
-                    else:
-                        f.write('"array_float":[' + str(random.random()) + ',' + str(random.random()) + ']')
-                if data_field == DataField.array_string_field:
-                    if err_type == DataErrorType.empty_array_field:
-                        f.write('"array_string":[]')
-                    elif err_type == DataErrorType.mismatch_type_array_field:
-                        f.write('"array_string": "mistype"')
-                    else:
-                        f.write('"array_string":["' + str(gen_unique_str()) + '","' + str(gen_unique_str()) + '"]')
-
-                if data_field == DataField.vec_field:
-                    # vector field
-                    if err_type == DataErrorType.one_entity_wrong_dim and i == wrong_row:
-                        vectors = gen_float_vectors(1, wrong_dim) if float_vect else gen_binary_vectors(1, (wrong_dim//8))
-                    elif err_type == DataErrorType.str_on_vector_field and i == wrong_row:
-                        vectors = gen_str_invalid_vectors(1, dim) if float_vect else gen_str_invalid_vectors(1, dim//8)
-                    else:
-                        vectors = gen_float_vectors(1, dim) if float_vect else gen_binary_vectors(1, (dim//8))
-                    line = '"vectors":' + ",".join(str(x).replace("'", '"') for x in vectors) + ''
-                    f.write(line)
-                # not write common for the last field
-                if j != len(data_fields) - 1:
-                    f.write(',')
+    block_rows = kwargs.get("block_rows", block_rows_by_size(row_bytes=dim * 20 + 200))
+
+    with JsonRowsWriter(row_file, root_key="rows") as writer:
+        for block_start in range(0, rows, block_rows):
+            n = min(block_rows, rows - block_start)
+            start = start_uid + block_start
+            columns = gen_json_columns_by_data_fields(data_fields, n, start, str_pk, float_vect, dim,
+                                                      err_type=err_type, wrong_row=wrong_row - block_start)
+            extra_fields = None
             if enable_dynamic_field:
-                d = {str(i+start_uid): i+start_uid, "name": fake.name(), "address": fake.address()}
-                d_str = json.dumps(d)
-                d_str = d_str[1:-1] # remove {}
-                f.write("," + d_str)
-            f.write('}')
-        f.write("\n")
-        f.write("]")
-        f.write("\n")
-        f.write("}")
-        f.write("\n")
+                extra_fields = [{str(i): i, "name": fake.name(), "address": fake.address()}
+                                for i in range(start, start + n)]
+            writer.write_columns(columns, extra_fields)
 
 
 def gen_column_base_json_file(col_file, str_pk, data_fields, float_vect,
@@ -362,31 +399,18 @@ def gen_column_base_json_file(col_file, str_pk, data_fields, float_vect,
         f.write("\n")
 
 
-def gen_vectors_in_numpy_file(dir, data_field, float_vector, rows, dim, vector_type="float32", force=False):
+def gen_vectors_in_numpy_file(dir, data_field, float_vector, rows, dim, vector_type="float32", force=False,
+                              num_workers=1, seed=None):
     file_name = f"{data_field}.npy"
     file = f'{dir}/{file_name}'
 
     if not os.path.exists(file) or force:
-        # vector columns
-        vectors = []
+        # vector columns, written chunk by chunk into a preallocated .npy file
         if rows > 0:
-            if vector_type == "float32":
-                vectors = gen_float_vectors(rows, dim)
-                arr = np.array(vectors)
-            elif vector_type == "fp16":
-                vectors = gen_fp16_vectors(rows, dim)[1]
-                arr = np.array(vectors, dtype=np.dtype("uint8"))
-            elif vector_type == "bf16":
-                vectors = gen_bf16_vectors(rows, dim)[1]
-                arr = np.array(vectors, dtype=np.dtype("uint8"))
-            elif vector_type == "binary":
-                vectors = gen_binary_vectors(rows, (dim // 8))
-                arr = np.array(vectors, dtype=np.dtype("uint8"))
-            else:
-                vectors = gen_binary_vectors(rows, (dim // 8))
-                arr = np.array(vectors, dtype=np.dtype("uint8"))
-            log.info(f"file_name: {file_name} data type: {arr.dtype} data shape: {arr.shape}")
-            np.save(file, arr)
+            if vector_type not in ("float32", "fp16", "bf16", "int8"):
+                vector_type = "binary"
+            write_npy_vectors(file, vector_type, rows, dim, seed=seed, num_workers=num_workers)
+            log.info(f"file_name: {file_name} vector type: {vector_type} rows: {rows} dim: {dim}")
     return file_name
 
 
@@ -528,8 +552,7 @@ def gen_sparse_vectors(rows, sparse_format="dok", empty_percentage=10):
 def gen_data_by_data_field(data_field, rows, start=0, float_vector=True, dim=128, array_length=None, sparse_format="dok", **kwargs):
     if array_length is None:
         array_length = random.randint(0, 10)
-    schema = kwargs.get("schema", None)
-    schema = schema.to_dict() if schema is not None else None
+    schema = schema_dict(kwargs.get("schema", None))
     nullable = False
     if schema is not None:
         fields = schema.get("fields", [])
@@ -675,9 +698,10 @@ def gen_subfolder(root, dim, rows, file_num):
 
 def gen_json_files(is_row_based, rows, dim, auto_id, str_pk,
                    float_vector, data_fields, file_nums, multi_folder,
-                   file_type, err_type, force, **kwargs):
+                   file_type, err_type, force, num_workers=1, seed=None, **kwargs):
     # gen json files
     files = []
+    tasks = []
     start_uid = 0
     # make sure pk field exists when not auto_id
     if (not auto_id) and (DataField.pk_field not in data_fields):
@@ -691,26 +715,29 @@ def gen_json_files(is_row_based, rows, dim, auto_id, str_pk,
             subfolder = gen_subfolder(root=data_source, dim=dim, rows=rows, file_num=i)
             file = f"{data_source}/{subfolder}/{file_name}"
         if not os.path.exists(file) or force:
+            task = dict(str_pk=str_pk, float_vect=float_vector, data_fields=data_fields, rows=rows, dim=dim,
+                        start_uid=start_uid, err_type=err_type, **kwargs)
             if is_row_based:
-                gen_row_based_json_file(row_file=file, str_pk=str_pk, float_vect=float_vector,
-                                        data_fields=data_fields, rows=rows, dim=dim,
-                                        start_uid=start_uid, err_type=err_type, **kwargs)
+                task["row_file"] = file
             else:
-                gen_column_base_json_file(col_file=file, str_pk=str_pk, float_vect=float_vector,
-                                          data_fields=data_fields, rows=rows, dim=dim,
-                                          start_uid=start_uid, err_type=err_type, **kwargs)
+                task["col_file"] = file
+            tasks.append(task)
             start_uid += rows
         if multi_folder:
             files.append(f"{subfolder}/{file_name}")
         else:
             files.append(file_name)
+    gen_file = gen_row_based_json_file if is_row_based else gen_column_base_json_file
+    run_file_tasks(gen_file, tasks, seed=seed, num_workers=num_workers)
     return files
 
 
 def gen_dict_data_by_data_field(data_fields, rows, start=0, float_vector=True, dim=128, array_length=None, enable_dynamic_field=False, **kwargs):
     schema = kwargs.get("schema", None)
     shuffle = kwargs.get("shuffle", False)
-    schema = schema.to_dict() if schema is not None else None
+    schema = schema_dict(schema)
+    # float_vector is overwritten by the float and binary fields below, DataField.vec_field follows the argument
+    vec_field_float = float_vector
     data = []
     nullable = False
     for r in range(rows):
@@ -726,6 +753,8 @@ def gen_dict_data_by_data_field(data_fields, rows, start=0, float_vector=True, d
                         nullable = field.get("nullable", False)
 
             if "vec" in data_field:
+                if data_field == DataField.vec_field:
+                    d[data_field] = gen_vectors(float_vector=vec_field_float, rows=1, dim=dim)[0]
                 if "float" in data_field:
                     float_vector = True
                     d[data_field] = gen_vectors(float_vector=float_vector, rows=1, dim=dim)[0]
@@ -808,57 +837,162 @@ def gen_dict_data_by_data_field(data_fields, rows, start=0, float_vector=True, d
     return data
 
 
+def gen_json_chunk(start, rows, data_fields, float_vector=True, dim=128, array_length=None,
+                   enable_dynamic_field=False, seed=None, **kwargs):
+    seed_random(derive_seed(seed, start))
+    return gen_dict_data_by_data_field(data_fields=data_fields, rows=rows, start=start,
+                                       float_vector=float_vector, dim=dim, array_length=array_length,
+                                       enable_dynamic_field=enable_dynamic_field, **kwargs)
+
+
+def gen_new_json_file(file, start, rows, **kwargs):
+    data = gen_json_chunk(start, rows, **kwargs)
+    # log.info(f"data: {data}")
+    with open(file, "w") as f:
+        json.dump(data, f)
+
+
 def gen_new_json_files(float_vector, rows, dim, data_fields, file_nums=1, array_length=None, file_size=None,
-                       err_type="", enable_dynamic_field=False, **kwargs):
-    schema = kwargs.get("schema", None)
+                       err_type="", enable_dynamic_field=False, num_workers=1, seed=None, **kwargs):
+    schema = kwargs["schema"] = schema_dict(kwargs.get("schema", None))
     dir_prefix = f"json-{uuid.uuid4()}"
     data_source_new = f"{data_source}/{dir_prefix}"
     schema_file = f"{data_source_new}/schema.json"
     Path(schema_file).parent.mkdir(parents=True, exist_ok=True)
     if schema is not None:
-        data = schema.to_dict()
         with open(schema_file, "w") as f:
-            json.dump(data, f)
+            json.dump(schema, f)
     files = []
+    tasks = []
     if file_size is not None:
         rows = 5000
     start_uid = 0
+    seed = base_seed(seed)
+    chunk_kwargs = dict(data_fields=data_fields, float_vector=float_vector, dim=dim, array_length=array_length,
+                        enable_dynamic_field=enable_dynamic_field, **kwargs)
     for i in range(file_nums):
         file_name = f"data-fields-{len(data_fields)}-rows-{rows}-dim-{dim}-file-num-{i}-{str(uuid.uuid4())}.json"
         file = f"{data_source_new}/{file_name}"
         Path(file).parent.mkdir(parents=True, exist_ok=True)
-        data = gen_dict_data_by_data_field(data_fields=data_fields, rows=rows, start=start_uid,
-                                           float_vector=float_vector, dim=dim, array_length=array_length,
-                                           enable_dynamic_field=enable_dynamic_field, **kwargs)
-        # log.info(f"data: {data}")
-        with open(file, "w") as f:
-            json.dump(data, f)
-        # get the file size
         if file_size is not None:
-            batch_file_size = os.path.getsize(f"{data_source_new}/{file_name}")
-            log.info(f"file_size with rows {rows} for {file_name}: {batch_file_size/1024/1024} MB")
-            # calculate the rows to be generated
-            total_batch = int(file_size*1024*1024*1024/batch_file_size)
-            total_rows = total_batch * rows
-            log.info(f"total_rows: {total_rows}")
-            all_data = []
-            for _ in range(total_batch):
-                all_data += data
+            # stream chunks with fresh pk ranges until the file reaches file_size GB,
+            # the total rows of a file are only known once it is written, so the chunks are parallelized
+            gen_chunk = partial(gen_json_chunk, seed=seed, **chunk_kwargs)
+            writer = JsonChunkWriter(f"{file}.tmp")
+            total_rows = write_chunks_to_size(writer, gen_chunk, int(file_size * GB), chunk_rows=rows,
+                                              start_uid=start_uid, num_workers=num_workers)
             file_name = f"data-fields-{len(data_fields)}-rows-{total_rows}-dim-{dim}-file-num-{i}-{str(uuid.uuid4())}.json"
-            with open(f"{data_source_new}/{file_name}", "w") as f:
-                json.dump(all_data, f)
+            os.rename(f"{file}.tmp", f"{data_source_new}/{file_name}")
             batch_file_size = os.path.getsize(f"{data_source_new}/{file_name}")
             log.info(f"file_size with rows {total_rows} for {file_name}: {batch_file_size/1024/1024/1024} GB")
+            start_uid += total_rows
+        else:
+            tasks.append(dict(file=file, start=start_uid, rows=rows, **chunk_kwargs))
+            start_uid += rows
         files.append(file_name)
-        start_uid += rows
+    run_file_tasks(gen_new_json_file, tasks, seed=seed, num_workers=num_workers)
     files = [f"{dir_prefix}/{f}" for f in files]
     return files
 
 
-def gen_npy_files(float_vector, rows, dim, data_fields, file_size=None, file_nums=1, err_type="", force=False, enable_dynamic_field=False, include_meta=True, **kwargs):
+def get_vector_type_by_data_field(data_field):
+    if "binary" in data_field:
+        return "binary"
+    if "brain_float16" in data_field:
+        return "bf16"
+    if "float16" in data_field:
+        return "fp16"
+    return "float32"
+
+
+def gen_numpy_data_by_data_field(data_field, rows, start=0, dim=128, nullable=False, shuffle_pk=False, rng=None):
+    """
+    generate the numpy array of one field, the same data as the gen_*_in_numpy_file functions,
+    the vectors are generated by rng (default seeded from np.random) in the layouts of write_npy_vectors
+    """
+    if "vec" in data_field:
+        rng = np.random.default_rng(np.random.randint(0, 2 ** 31)) if rng is None else rng
+        return gen_vector_chunk(rng, get_vector_type_by_data_field(data_field), rows, dim)
+    if data_field == "$meta":
+        data = [json.dumps({str(i): i, "name": fake.name(), "address": fake.address(), "number": i})
+                for i in range(start, rows + start)]
+    elif data_field == DataField.string_field:
+        data = [gen_unique_str(str(i)) for i in range(start, rows + start)]
+    elif data_field == DataField.text_field:
+        if nullable:
+            data = [None if random.random() < 0.5 else fake.text() + " milvus " for _ in range(rows)]
+        else:
+            data = [fake.text() + " milvus " for _ in range(rows)]
+    elif data_field == DataField.bool_field:
+        data = [random.choice([True, False]) for _ in range(rows)]
+    elif data_field == DataField.json_field:
+        data = [json.dumps({"name": fake.name(), "address": fake.address(), "number": i})
+                for i in range(start, rows + start)]
+    elif data_field == DataField.float_field:
+        data = [np.float32(random.random()) for _ in range(rows)]
+    elif data_field == DataField.double_field:
+        data = [np.float64(random.random()) for _ in range(rows)]
+    elif data_field == DataField.pk_field:
+        data = [i for i in range(start, start + rows)]
+    elif data_field == DataField.int_field:
+        data = [None for _ in range(rows)] if nullable else [random.randint(-999999, 9999999) for _ in range(rows)]
+    else:
+        raise Exception(f"unsupported field name {data_field} for numpy file")
+    arr = np.array(data)
+    if shuffle_pk and data_field in [DataField.pk_field, DataField.string_field]:
+        np.random.shuffle(arr)
+    return arr
+
+
+def gen_npy_chunk(start, rows, fields, dim=128, dims=None, nullables=None, shuffle_pk=False, seed=None):
+    seed_random(derive_seed(seed, start))
+    rng = np.random.default_rng(np.random.randint(0, 2 ** 31))
+    dims, nullables = dims or {}, nullables or {}
+    return {f: gen_numpy_data_by_data_field(f, rows, start=start, dim=dims.get(f, dim),
+                                            nullable=nullables.get(f, False), shuffle_pk=shuffle_pk, rng=rng)
+            for f in fields}
+
+
+def gen_npy_files_by_size(dir, data_fields, rows, dim, file_size, enable_dynamic_field=False, schema=None,
+                          shuffle_pk=False, num_workers=1, seed=None):
+    """
+    stream the numpy files of data_fields chunk by chunk until they reach file_size GB in total,
+    each chunk of rows gets its own pk range, so the memory used is bounded to one chunk per worker
+    """
+    dims, nullables = {}, {}
+    for field in (schema or {}).get("fields", []):
+        dims[field["name"]] = field.get("params", {}).get("dim", dim)
+        nullables[field["name"]] = field.get("nullable", False)
+    fields = list(data_fields) + (["$meta"] if enable_dynamic_field else [])
+    gen_chunk = partial(gen_npy_chunk, fields=fields, dim=dim, dims=dims, nullables=nullables,
+                        shuffle_pk=shuffle_pk, seed=base_seed(seed))
+    writer = NpyChunkWriter(dir, fields)
+    total_rows = write_chunks_to_size(writer, gen_chunk, int(file_size * GB), chunk_rows=rows, num_workers=num_workers)
+    log.info(f"file_size with rows {total_rows} for {list(writer.files.values())}: {writer.size/1024/1024/1024} GB")
+    return list(writer.files.values())
+
+
+def gen_npy_file_set(dir, data_fields, rows, dim, start=0, float_vector=True, enable_dynamic_field=False, force=False):
+    """generate one numpy file per field in dir with the pk range [start, start + rows)"""
+    files = []
+    for data_field in data_fields:
+        if "vec" in data_field:
+            vector_type = get_vector_type_by_data_field(data_field)
+            file_name = gen_vectors_in_numpy_file(dir=dir, data_field=data_field, float_vector=vector_type != "binary",
+                                                  vector_type=vector_type, rows=rows, dim=dim, force=force)
+        else:
+            file_name = gen_int_or_float_in_numpy_file(dir=dir, data_field=data_field, rows=rows, start=start, force=force)
+        files.append(file_name)
+    if enable_dynamic_field:
+        file_name = gen_dynamic_field_in_numpy_file(dir=dir, rows=rows, start=start, force=force)
+        files.append(file_name)
+    return files
+
+
+def gen_npy_files(float_vector, rows, dim, data_fields, file_size=None, file_nums=1, err_type="", force=False, enable_dynamic_field=False, include_meta=True,
+                  num_workers=1, seed=None, **kwargs):
     # gen numpy files
-    schema = kwargs.get("schema", None)
-    schema = schema.to_dict() if schema is not None else None
+    schema = schema_dict(kwargs.get("schema", None))
     u_id = f"numpy-{uuid.uuid4()}"
     data_source_new = f"{data_source}/{u_id}"
     schema_file = f"{data_source_new}/schema.json"
@@ -870,9 +1004,14 @@ def gen_npy_files(float_vector, rows, dim, data_fields, file_size=None, file_num
     start_uid = 0
     nullable = False
     shuffle_pk = kwargs.get("shuffle_pk", False)
-    if file_nums == 1:
+    if file_nums == 1 and file_size is not None:
+        files = gen_npy_files_by_size(dir=data_source_new, data_fields=data_fields, rows=rows, dim=dim,
+                                      file_size=file_size, schema=schema, shuffle_pk=shuffle_pk,
+                                      enable_dynamic_field=enable_dynamic_field and include_meta,
+                                      num_workers=num_workers, seed=seed)
+    elif file_nums == 1:
         # gen the numpy file without subfolders if only one set of files
-        for data_field in data_fields:
+        for i, data_field in enumerate(data_fields):
             if schema is not None:
                 fields = schema.get("fields", [])
                 for field in fields:
@@ -881,22 +1020,11 @@ def gen_npy_files(float_vector, rows, dim, data_fields, file_size=None, file_num
                             dim = field["params"].get("dim", dim)
                         nullable = field.get("nullable", False)
             if "vec" in data_field:
-                vector_type = "float32"
-                if "float" in data_field:
-                    float_vector = True
-                    vector_type = "float32"
-                if "binary" in data_field:
-                    float_vector = False
-                    vector_type = "binary"
-                if "brain_float16" in data_field:
-                    float_vector = True
-                    vector_type = "bf16"
-                if "float16" in data_field:
-                    float_vector = True
-                    vector_type = "fp16"
-
+                vector_type = get_vector_type_by_data_field(data_field)
+                float_vector = vector_type != "binary"
                 file_name = gen_vectors_in_numpy_file(dir=data_source_new, data_field=data_field, float_vector=float_vector,
-                                                      vector_type=vector_type, rows=rows, dim=dim, force=force)
+                                                      vector_type=vector_type, rows=rows, dim=dim, force=force,
+                                                      num_workers=num_workers, seed=derive_seed(seed, i))
             elif data_field == DataField.string_field:  # string field for numpy not supported yet at 2022-10-17
                 file_name = gen_string_in_numpy_file(dir=data_source_new, data_field=data_field, rows=rows, force=force, shuffle_pk=shuffle_pk)
             elif data_field == DataField.text_field:
@@ -912,42 +1040,19 @@ def gen_npy_files(float_vector, rows, dim, data_fields, file_size=None, file_num
         if enable_dynamic_field and include_meta:
             file_name = gen_dynamic_field_in_numpy_file(dir=data_source_new, rows=rows, force=force)
             files.append(file_name)
-        if file_size is not None:
-            batch_file_size = 0
-            for file_name in files:
-                batch_file_size += os.path.getsize(f"{data_source_new}/{file_name}")
-            log.info(f"file_size with rows {rows} for {files}: {batch_file_size/1024/1024} MB")
-            # calculate the rows to be generated
-            total_batch = int(file_size*1024*1024*1024/batch_file_size)
-            total_rows = total_batch * rows
-            new_files = []
-            for f in files:
-                arr = np.load(f"{data_source_new}/{f}")
-                all_arr = np.concatenate([arr for _ in range(total_batch)], axis=0)
-                file_name = f
-                np.save(f"{data_source_new}/{file_name}", all_arr)
-                log.info(f"file_name: {file_name} data type: {all_arr.dtype} data shape: {all_arr.shape}")
-                new_files.append(file_name)
-            files = new_files
-            batch_file_size = 0
-            for file_name in files:
-                batch_file_size += os.path.getsize(f"{data_source_new}/{file_name}")
-            log.info(f"file_size with rows {total_rows} for {files}: {batch_file_size/1024/1024/1024} GB")
-
     else:
+        subfolders = []
+        tasks = []
         for i in range(file_nums):
             subfolder = gen_subfolder(root=data_source_new, dim=dim, rows=rows, file_num=i)
-            dir = f"{data_source_new}/{subfolder}"
-            for data_field in data_fields:
-                if DataField.vec_field in data_field:
-                    file_name = gen_vectors_in_numpy_file(dir=dir, data_field=data_field, float_vector=float_vector, rows=rows, dim=dim, force=force)
-                else:
-                    file_name = gen_int_or_float_in_numpy_file(dir=dir, data_field=data_field, rows=rows, start=start_uid, force=force)
-                files.append(f"{subfolder}/{file_name}")
-            if enable_dynamic_field:
-                file_name = gen_dynamic_field_in_numpy_file(dir=dir, rows=rows, start=start_uid, force=force)
-                files.append(f"{subfolder}/{file_name}")
+            subfolders.append(subfolder)
+            tasks.append(dict(dir=f"{data_source_new}/{subfolder}", data_fields=data_fields, rows=rows, dim=dim,
+                              start=start_uid, float_vector=float_vector,
+                              enable_dynamic_field=enable_dynamic_field, force=force))
             start_uid += rows
+        file_sets = run_file_tasks(gen_npy_file_set, tasks, seed=seed, num_workers=num_workers)
+        for subfolder, file_set in zip(subfolders, file_sets):
+            files.extend(f"{subfolder}/{file_name}" for file_name in file_set)
     files = [f"{u_id}/{f}" for f in files]
     return files
 
@@ -959,86 +1064,176 @@ def gen_dynamic_field_data_in_parquet_file(rows, start=0):
     return data
 
 
+def gen_parquet_chunk(start, rows, data_fields, float_vector=True, dim=128, array_length=None,
+                      sparse_format="dok", with_meta=False, seed=None, **kwargs):
+    seed_random(derive_seed(seed, start))
+    all_field_data = {}
+    for data_field in data_fields:
+        data = gen_data_by_data_field(data_field=data_field, rows=rows, start=start,
+                                      float_vector=float_vector, dim=dim, array_length=array_length,
+                                      sparse_format=sparse_format, **kwargs)
+        all_field_data[data_field] = data
+    if with_meta:
+        all_field_data["$meta"] = gen_dynamic_field_data_in_parquet_file(rows=rows, start=start)
+    return pd.DataFrame(all_field_data)
+
+
+def gen_parquet_file(file, start, rows, row_group_size=None, **kwargs):
+    df = gen_parquet_chunk(start, rows, **kwargs)
+    log.info(f"df: \n{df}")
+    if row_group_size is not None:
+        df.to_parquet(file, engine='pyarrow', row_group_size=row_group_size)
+    else:
+        df.to_parquet(file, engine='pyarrow')
+
+
 def gen_parquet_files(float_vector, rows, dim, data_fields, file_size=None, row_group_size=None, file_nums=1,
                       array_length=None, err_type="", enable_dynamic_field=False, include_meta=True,
-                      sparse_format="doc", **kwargs):
-    schema = kwargs.get("schema", None)
+                      sparse_format="doc", num_workers=1, seed=None, **kwargs):
+    schema = kwargs["schema"] = schema_dict(kwargs.get("schema", None))
     u_id = f"parquet-{uuid.uuid4()}"
     data_source_new = f"{data_source}/{u_id}"
     schema_file = f"{data_source_new}/schema.json"
     Path(schema_file).parent.mkdir(parents=True, exist_ok=True)
     if schema is not None:
-        data = schema.to_dict()
         with open(schema_file, "w") as f:
-            json.dump(data, f)
+            json.dump(schema, f)
 
     # gen numpy files
     if err_type == "":
         err_type = "none"
     files = []
-    #  generate 5000 entities and check the file size, then calculate the rows to be generated
+    #  stream chunks of 5000 entities until the file reaches file_size GB
     if file_size is not None:
         rows = 5000
     start_uid = 0
+    seed = base_seed(seed)
+    chunk_kwargs = dict(data_fields=data_fields, float_vector=float_vector, dim=dim, array_length=array_length,
+                        sparse_format=sparse_format, **kwargs)
     if file_nums == 1:
-        all_field_data = {}
-        for data_field in data_fields:
-            data = gen_data_by_data_field(data_field=data_field, rows=rows, start=0,
-                                          float_vector=float_vector, dim=dim, array_length=array_length,
-                                          sparse_format=sparse_format, **kwargs)
-            all_field_data[data_field] = data
-        if enable_dynamic_field and include_meta:
-            all_field_data["$meta"] = gen_dynamic_field_data_in_parquet_file(rows=rows, start=0)
-        df = pd.DataFrame(all_field_data)
-        log.info(f"df: \n{df}")
         file_name = f"data-fields-{len(data_fields)}-rows-{rows}-dim-{dim}-file-num-{file_nums}-error-{err_type}-{str(uuid.uuid4())}.parquet"
-        if row_group_size is not None:
-            df.to_parquet(f"{data_source_new}/{file_name}", engine='pyarrow', row_group_size=row_group_size)
-        else:
-            df.to_parquet(f"{data_source_new}/{file_name}", engine='pyarrow')
-        # get the file size
+        gen_chunk = partial(gen_parquet_chunk, with_meta=enable_dynamic_field and include_meta, seed=seed, **chunk_kwargs)
         if file_size is not None:
-            batch_file_size = os.path.getsize(f"{data_source_new}/{file_name}")
-            log.info(f"file_size with rows {rows} for {file_name}: {batch_file_size/1024/1024} MB")
-            # calculate the rows to be generated
-            total_batch = int(file_size*1024*1024*1024/batch_file_size)
-            total_rows = total_batch * rows
-            all_df = pd.concat([df for _ in range(total_batch)], axis=0, ignore_index=True)
+            # each row group gets a fresh pk range, the memory used is bounded to one chunk per worker
+            tmp_file = f"{data_source_new}/{file_name}.tmp"
+            writer = ParquetChunkWriter(tmp_file, row_group_size=row_group_size)
+            total_rows = write_chunks_to_size(writer, gen_chunk, int(file_size * GB), chunk_rows=rows,
+                                              num_workers=num_workers)
             file_name = f"data-fields-{len(data_fields)}-rows-{total_rows}-dim-{dim}-file-num-{file_nums}-error-{err_type}-{str(uuid.uuid4())}.parquet"
-            log.info(f"all df: \n {all_df}")
-            if row_group_size is not None:
-                all_df.to_parquet(f"{data_source_new}/{file_name}", engine='pyarrow', row_group_size=row_group_size)
-            else:
-                all_df.to_parquet(f"{data_source_new}/{file_name}", engine='pyarrow')
+            os.rename(tmp_file, f"{data_source_new}/{file_name}")
             batch_file_size = os.path.getsize(f"{data_source_new}/{file_name}")
             log.info(f"file_size with rows {total_rows} for {file_name}: {batch_file_size/1024/1024} MB")
+        elif num_workers > 1:
+            # fan the row groups out to the workers
+            chunk_rows = row_group_size or -(-rows // num_workers)
+            writer = ParquetChunkWriter(f"{data_source_new}/{file_name}", row_group_size=row_group_size)
+            write_chunks(writer, gen_chunk, rows, chunk_rows=chunk_rows, num_workers=num_workers)
+        else:
+            gen_parquet_file(f"{data_source_new}/{file_name}", 0, rows, row_group_size=row_group_size,
+                             with_meta=enable_dynamic_field and include_meta, seed=seed, **chunk_kwargs)
         files.append(file_name)
     else:
+        tasks = []
         for i in range(file_nums):
-            all_field_data = {}
-            for data_field in data_fields:
-                data = gen_data_by_data_field(data_field=data_field, rows=rows, start=0,
-                                              float_vector=float_vector, dim=dim, array_length=array_length)
-                all_field_data[data_field] = data
-            if enable_dynamic_field:
-                all_field_data["$meta"] = gen_dynamic_field_data_in_parquet_file(rows=rows, start=0)
-            df = pd.DataFrame(all_field_data)
             file_name = f"data-fields-{len(data_fields)}-rows-{rows}-dim-{dim}-file-num-{i}-error-{err_type}-{str(uuid.uuid4())}.parquet"
-            if row_group_size is not None:
-                df.to_parquet(f"{data_source_new}/{file_name}", engine='pyarrow', row_group_size=row_group_size)
-            else:
-                df.to_parquet(f"{data_source_new}/{file_name}", engine='pyarrow')
+            tasks.append(dict(file=f"{data_source_new}/{file_name}", start=start_uid, rows=rows,
+                              row_group_size=row_group_size, with_meta=enable_dynamic_field, **chunk_kwargs))
             files.append(file_name)
             start_uid += rows
+        run_file_tasks(gen_parquet_file, tasks, seed=seed, num_workers=num_workers)
     files = [f"{u_id}/{f}" for f in files]
     return files
 
 
+def gen_parquet_files_by_schema(schema, rows=100, file_size=None, row_group_size=None, file_nums=1,
+                                array_length=None, null_ratio=0.0, num_workers=1, seed=None, checksum=None):
+    """
+    Generate parquet files of a collection schema from arrow RecordBatches, without pandas
+
+    :param schema: collection schema, the fields and dims of the files are read from it
+    :type schema: CollectionSchema
+
+    :param rows: rows of every file, or of every chunk when file_size is set
+    :type rows: int
+
+    :param file_size: size of every file in GB
+    :type file_size: float
+
+    :param row_group_size: max rows of a parquet row group
+    :type row_group_size: int
+
+    :param file_nums: number of files, the files have disjoint pk ranges
+    :type file_nums: int
+
+    :param num_workers: number of processes generating the batches
+    :type num_workers: int
+
+    :param seed: base seed, each batch is generated with a seed derived from it
+    :type seed: int
+
+    :param checksum: checksums of the generated rows are added to it, keyed by the returned file names
+    :type checksum: ImportChecksum
+
+    Return: List
+        File names relative to data_source
+    """
+    u_id = f"parquet-{uuid.uuid4()}"
+    data_source_new = f"{data_source}/{u_id}"
+    Path(data_source_new).mkdir(parents=True, exist_ok=True)
+    with open(f"{data_source_new}/schema.json", "w") as f:
+        json.dump(schema.to_dict(), f, default=str)
+    seed = base_seed(seed)
+    gen_chunk = partial(gen_arrow_batch, schema=schema_dict(schema), seed=seed, array_length=array_length, null_ratio=null_ratio)
+    files = []
+    start_uid = 0
+    for i in range(file_nums):
+        tmp_file = f"{data_source_new}/file-num-{i}.parquet.tmp"
+        writer = ParquetChunkWriter(tmp_file, row_group_size=row_group_size)
+        if checksum is not None:
+            writer = ChecksumWriter(writer, checksum, file=tmp_file)
+        if file_size is not None:
+            total_rows = write_chunks_to_size(writer, gen_chunk, int(file_size * GB), chunk_rows=rows,
+                                              start_uid=start_uid, num_workers=num_workers)
+        else:
+            chunk_rows = row_group_size or max(1, -(-rows // max(num_workers, 1)))
+            total_rows = write_chunks(writer, gen_chunk, rows, chunk_rows=chunk_rows, start_uid=start_uid,
+                                      num_workers=num_workers)
+        file_name = f"data-fields-{len(schema.fields)}-rows-{total_rows}-file-num-{i}-{str(uuid.uuid4())}.parquet"
+        os.rename(tmp_file, f"{data_source_new}/{file_name}")
+        if checksum is not None:
+            checksum.rename_file(tmp_file, f"{u_id}/{file_name}")
+        log.info(f"generated {file_name} with {total_rows} rows, "
+                 f"size {os.path.getsize(f'{data_source_new}/{file_name}') / 1024 / 1024:.2f} MB")
+        files.append(f"{u_id}/{file_name}")
+        start_uid += total_rows
+    return files
+
+
+def gen_files_by_cache(cache, gen_func, **kwargs):
+    """
+    Generate the files by gen_func(**kwargs), through the dataset cache when it is given
+
+    Only reproducible datasets are cached: a seed is set, no error is injected and no checksum is
+    collected during the generation.
+
+    :param cache: common.dataset_cache.DatasetCache or None
+    :param gen_func: generator of the files, e.g. gen_parquet_files
+    :return list
+        file names relative to data_source
+    """
+    if cache is None or kwargs.get("seed") is None or kwargs.get("err_type") or kwargs.get("checksum") is not None:
+        return gen_func(**kwargs)
+    if "force" in kwargs:
+        # files of the same name may be left by a generation with another seed
+        kwargs["force"] = True
+    return cache.get_or_create(gen_func, **kwargs)
+
+
 def prepare_bulk_insert_json_files(minio_endpoint="", bucket_name="milvus-bucket",
                                    is_row_based=True, rows=100, dim=128,
                                    auto_id=True, str_pk=False, float_vector=True,
                                    data_fields=[], file_nums=1, multi_folder=False,
-                                   file_type=".json", err_type="", force=False, **kwargs):
+                                   file_type=".json", err_type="", force=False, cache=None, **kwargs):
     """
     Generate files based on the params in json format and copy them to minio
 
@@ -1087,9 +1282,16 @@ def prepare_bulk_insert_json_files(minio_endpoint="", bucket_name="milvus-bucket
     :param force: re-generate the file(s) regardless existing or not
     :type force: boolean
 
+    :param cache: reuse the files of the same params and seed from the dataset cache
+    :type cache: DatasetCache
+
     :param **kwargs
         * *wrong_position* (``int``) --
         indicate the error entity in the file if DataErrorType.one_entity_wrong_dim
+        * *num_workers* (``int``) --
+        number of processes generating the files
+        * *seed* (``int``) --
+        base seed, each file is generated with a seed derived from it
 
     :return list
         file names list
@@ -1098,29 +1300,32 @@ def prepare_bulk_insert_json_files(minio_endpoint="", bucket_name="milvus-bucket
     log.info(f"data_fields: {data_fields}")
     log.info(f"data_fields_c: {data_fields_c}")
 
-    files = gen_json_files(is_row_based=is_row_based, rows=rows, dim=dim,
-                           auto_id=auto_id, str_pk=str_pk, float_vector=float_vector,
-                           data_fields=data_fields_c, file_nums=file_nums, multi_folder=multi_folder,
-                           file_type=file_type, err_type=err_type, force=force, **kwargs)
+    files = gen_files_by_cache(cache, gen_json_files, is_row_based=is_row_based, rows=rows, dim=dim,
+                               auto_id=auto_id, str_pk=str_pk, float_vector=float_vector,
+                               data_fields=data_fields_c, file_nums=file_nums, multi_folder=multi_folder,
+                               file_type=file_type, err_type=err_type, force=force, **kwargs)
 
-    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name, force=force)
+    # the objects of cached files are only uploaded when missing or different
+    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name,
+                        force=force and cache is None)
     return files
 
 
 def prepare_bulk_insert_new_json_files(minio_endpoint="", bucket_name="milvus-bucket",
                                     rows=100, dim=128, float_vector=True, file_size=None,
                                     data_fields=[], file_nums=1, enable_dynamic_field=False,
-                                    err_type="", force=False, **kwargs):
+                                    err_type="", force=False, cache=None, **kwargs):
 
     log.info(f"data_fields: {data_fields}")
-    files = gen_new_json_files(float_vector=float_vector, rows=rows, dim=dim,  data_fields=data_fields, file_nums=file_nums, file_size=file_size, err_type=err_type, enable_dynamic_field=enable_dynamic_field, **kwargs)
+    files = gen_files_by_cache(cache, gen_new_json_files, float_vector=float_vector, rows=rows, dim=dim,  data_fields=data_fields, file_nums=file_nums, file_size=file_size, err_type=err_type, enable_dynamic_field=enable_dynamic_field, **kwargs)
 
-    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name, force=force)
+    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name,
+                        force=force and cache is None)
     return files
 
 
 def prepare_bulk_insert_numpy_files(minio_endpoint="", bucket_name="milvus-bucket", rows=100, dim=128, enable_dynamic_field=False, file_size=None,
-                                    data_fields=[DataField.vec_field], float_vector=True, file_nums=1, force=False, include_meta=True, **kwargs):
+                                    data_fields=[DataField.vec_field], float_vector=True, file_nums=1, force=False, include_meta=True, cache=None, **kwargs):
     """
     Generate column based files based on params in numpy format and copy them to the minio
     Note: each field in data_fields would be generated one numpy file.
@@ -1147,21 +1352,31 @@ def prepare_bulk_insert_numpy_files(minio_endpoint="", bucket_name="milvus-bucke
     :param force: re-generate the file(s) regardless existing or not
     :type force: boolean
 
+    :param num_workers: number of processes generating the files (or parquet row groups / chunks of a single file)
+    :type num_workers: int
+
+    :param seed: base seed, each file or chunk is generated with a seed derived from it
+    :type seed: int
+
+    :param cache: reuse the files of the same params and seed from the dataset cache
+    :type cache: DatasetCache
+
     Return: List
         File name list or file name with sub-folder list
     """
-    files = gen_npy_files(rows=rows, dim=dim, float_vector=float_vector, file_size=file_size,
-                          data_fields=data_fields, enable_dynamic_field=enable_dynamic_field,
-                          file_nums=file_nums, force=force, include_meta=include_meta, **kwargs)
+    files = gen_files_by_cache(cache, gen_npy_files, rows=rows, dim=dim, float_vector=float_vector, file_size=file_size,
+                               data_fields=data_fields, enable_dynamic_field=enable_dynamic_field,
+                               file_nums=file_nums, force=force, include_meta=include_meta, **kwargs)
 
-    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name, force=force)
+    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name,
+                        force=force and cache is None)
     return files
 
 
 def prepare_bulk_insert_parquet_files(minio_endpoint="", bucket_name="milvus-bucket", rows=100, dim=128, array_length=None,
                                       file_size=None, row_group_size=None, enable_dynamic_field=False,
                                       data_fields=[DataField.vec_field], float_vector=True, file_nums=1, force=False,
-                                      include_meta=True, sparse_format="doc", **kwargs):
+                                      include_meta=True, sparse_format="doc", cache=None, **kwargs):
     """
     Generate column based files based on params in parquet format and copy them to the minio
     Note: each field in data_fields would be generated one parquet file.
@@ -1188,49 +1403,58 @@ def prepare_bulk_insert_parquet_files(minio_endpoint="", bucket_name="milvus-buc
     :param force: re-generate the file(s) regardless existing or not
     :type force: boolean
 
+    :param num_workers: number of processes generating the files (or parquet row groups / chunks of a single file)
+    :type num_workers: int
+
+    :param seed: base seed, each file or chunk is generated with a seed derived from it
+    :type seed: int
+
+    :param cache: reuse the files of the same params and seed from the dataset cache
+    :type cache: DatasetCache
+
     Return: List
         File name list or file name with sub-folder list
     """
-    files = gen_parquet_files(rows=rows, dim=dim, float_vector=float_vector, enable_dynamic_field=enable_dynamic_field,
-                              data_fields=data_fields, array_length=array_length, file_size=file_size, row_group_size=row_group_size,
-                              file_nums=file_nums, include_meta=include_meta, sparse_format=sparse_format, **kwargs)
-    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name, force=force)
+    files = gen_files_by_cache(cache, gen_parquet_files, rows=rows, dim=dim, float_vector=float_vector, enable_dynamic_field=enable_dynamic_field,
+                               data_fields=data_fields, array_length=array_length, file_size=file_size, row_group_size=row_group_size,
+                               file_nums=file_nums, include_meta=include_meta, sparse_format=sparse_format, **kwargs)
+    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name,
+                        force=force and cache is None)
     return files
 
 
-def gen_csv_file(file, float_vector, data_fields, rows, dim, start_uid):
-    with open(file, "w") as f:
-        # field name
-        for i in range(len(data_fields)):
-            f.write(data_fields[i])
-            if i != len(data_fields) - 1:
-                f.write(",")
-        f.write("\n")
-
-        for i in range(rows):
-            # field value
-            for j in range(len(data_fields)):
-                data_field = data_fields[j]
+def gen_csv_file(file, float_vector, data_fields, rows, dim, start_uid, block_rows=None):
+    """generate the csv file block by block, each block is formatted column by column"""
+    block_rows = block_rows or block_rows_by_size(row_bytes=dim * 20 + 100)
+    with CsvWriter(file, header=data_fields) as writer:
+        for block_start in range(0, rows, block_rows):
+            n = min(block_rows, rows - block_start)
+            start = start_uid + block_start
+            columns = []
+            for data_field in data_fields:
                 if data_field == DataField.pk_field:
-                    f.write(str(i + start_uid))
-                if data_field == DataField.int_field:
-                    f.write(str(random.randint(-999999, 9999999)))
-                if data_field == DataField.float_field:
-                    f.write(str(random.random()))
-                if data_field == DataField.string_field:
-                    f.write(str(gen_unique_str()))
-                if data_field == DataField.bool_field:
-                    f.write(str(random.choice(["true", "false"])))
-                if data_field == DataField.vec_field:
-                    vectors = gen_float_vectors(1, dim) if float_vector else gen_binary_vectors(1, dim//8)
-                    f.write('"' + ','.join(str(x) for x in vectors) + '"')
-                if j != len(data_fields) - 1:
-                    f.write(",")
-            f.write("\n")
+                    cells = np.arange(start, start + n).astype(str)
+                elif data_field == DataField.int_field:
+                    cells = np.random.randint(-999999, 9999999, size=n).astype(str)
+                elif data_field == DataField.float_field:
+                    cells = np.random.random(n).astype(np.float32).astype(str)
+                elif data_field == DataField.double_field:
+                    cells = np.random.random(n).astype(str)
+                elif data_field == DataField.string_field:
+                    cells = [gen_unique_str() for _ in range(n)]
+                elif data_field == DataField.bool_field:
+                    cells = np.where(np.random.random(n) < 0.5, "true", "false")
+                elif data_field in [DataField.vec_field, DataField.binary_vec_field]:
+                    cells = format_csv_vectors(gen_float_vectors(n, dim) if float_vector else gen_binary_vectors(n, dim // 8))
+                else:
+                    cells = [""] * n
+                columns.append(list(cells))
+            writer.write_columns(columns)
 
 
-def gen_csv_files(rows, dim, auto_id, float_vector, data_fields, file_nums, force):
+def gen_csv_files(rows, dim, auto_id, float_vector, data_fields, file_nums, force, num_workers=1, seed=None):
     files = []
+    tasks = []
     start_uid = 0
     if (not auto_id) and (DataField.pk_field not in data_fields):
         data_fields.append(DataField.pk_field)
@@ -1238,13 +1462,16 @@ def gen_csv_files(rows, dim, auto_id, float_vector, data_fields, file_nums, forc
         file_name = gen_file_name(is_row_based=True, rows=rows, dim=dim, auto_id=auto_id, float_vector=float_vector, data_fields=data_fields, file_num=i, file_type=".csv", str_pk=False, err_type="")
         file = f"{data_source}/{file_name}"
         if not os.path.exists(file) or force:
-            gen_csv_file(file, float_vector, data_fields, rows, dim, start_uid)
+            tasks.append(dict(file=file, float_vector=float_vector, data_fields=data_fields, rows=rows, dim=dim,
+                              start_uid=start_uid))
         start_uid += rows
         files.append(file_name)
+    run_file_tasks(gen_csv_file, tasks, seed=seed, num_workers=num_workers)
     return files
 
 
-def prepare_bulk_insert_csv_files(minio_endpoint="", bucket_name="milvus-bucket", rows=100, dim=128, auto_id=True, float_vector=True, data_fields=[], file_nums=1, force=False):
+def prepare_bulk_insert_csv_files(minio_endpoint="", bucket_name="milvus-bucket", rows=100, dim=128, auto_id=True, float_vector=True, data_fields=[], file_nums=1, force=False,
+                                  num_workers=1, seed=None, cache=None):
     """
     Generate row based files based on params in csv format and copy them to minio
 
@@ -1267,7 +1494,7 @@ def prepare_bulk_insert_csv_files(minio_endpoint="", bucket_name="milvus-bucket"
     :type float_vector: boolean
 
     :param: data_fields: data fields to be generated in the file(s):
-            It supports one or all of [pk, vectors, int, float, string, boolean]
+            It supports one or all of [pk, vectors, int, float, double, string, boolean]
             Note: it automatically adds pk field if auto_id=False
     :type data_fields: list
 
@@ -1276,10 +1503,21 @@ def prepare_bulk_insert_csv_files(minio_endpoint="", bucket_name="milvus-bucket"
 
     :param force: re-generate the file(s) regardless existing or not
     :type force: boolean
+
+    :param num_workers: number of processes generating the files
+    :type num_workers: int
+
+    :param seed: base seed, each file is generated with a seed derived from it
+    :type seed: int
+
+    :param cache: reuse the files of the same params and seed from the dataset cache
+    :type cache: DatasetCache
     """
     data_fields_c = copy.deepcopy(data_fields)
     log.info(f"data_fields: {data_fields}")
     log.info(f"data_fields_c: {data_fields_c}")
-    files = gen_csv_files(rows=rows, dim=dim, auto_id=auto_id, float_vector=float_vector, data_fields=data_fields_c, file_nums=file_nums, force=force)
-    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name, force=force)
+    files = gen_files_by_cache(cache, gen_csv_files, rows=rows, dim=dim, auto_id=auto_id, float_vector=float_vector, data_fields=data_fields_c, file_nums=file_nums, force=force,
+                               num_workers=num_workers, seed=seed)
+    copy_files_to_minio(host=minio_endpoint, r_source=data_source, files=files, bucket_name=bucket_name,
+                        force=force and cache is None)
     return files
@@ -0,0 +1,362 @@
+import hashlib
+import json
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+from pymilvus import CollectionSchema, DataType
+
+from common.bulk_insert_writer import ChunkWriter
+from utils.util_log import test_log as log
+
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+NULL_HASH = np.uint64(0x6E756C6C6E756C6C)
+MASK64 = (1 << 64) - 1
+
+INT_TYPES = (DataType.INT8, DataType.INT16, DataType.INT32, DataType.INT64)
+BYTES_VECTOR_TYPES = (DataType.BINARY_VECTOR, DataType.FLOAT16_VECTOR, DataType.BFLOAT16_VECTOR,
+                      DataType.INT8_VECTOR)
+
+
+def mix64(x) -> np.ndarray:
+    """splitmix64 finalizer on a uint64 array"""
+    x = np.array(x, dtype=np.uint64)
+    x ^= x >> np.uint64(30)
+    x *= _M1
+    x ^= x >> np.uint64(27)
+    x *= _M2
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def _digest(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _digests(items: Sequence[bytes]) -> np.ndarray:
+    return np.fromiter((_digest(b) for b in items), dtype=np.uint64, count=len(items))
+
+
+def _positional_hash(matrix: np.ndarray) -> np.ndarray:
+    """order dependent hash of every row of a (rows, width) unsigned int matrix"""
+    if matrix.shape[1] == 0:
+        return np.zeros(matrix.shape[0], dtype=np.uint64)
+    positions = np.arange(matrix.shape[1], dtype=np.uint64) * _GOLDEN
+    return mix64(matrix.astype(np.uint64) ^ positions).sum(axis=1, dtype=np.uint64)
+
+
+def _to_bytes(value) -> bytes:
+    """binary, float16, bfloat16 and int8 vectors as returned by query (bytes or [bytes]) or generated (uint8 list)"""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, list) and len(value) == 1 and isinstance(value[0], (bytes, bytearray)):
+        return bytes(value[0])
+    arr = np.asarray(value)
+    if arr.dtype == np.int8 or (arr.dtype.kind == "i" and arr.size and arr.min() < 0):
+        return arr.astype(np.int8).tobytes()
+    return arr.astype(np.uint8).tobytes()
+
+
+def _sparse_items(value):
+    """sparse vector as sorted (index, float32 value) pairs, from a dict, an indices/values struct or json"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    if isinstance(value, dict) and "indices" in value and "values" in value:
+        value = dict(zip(value["indices"], value["values"]))
+    return sorted((int(k), float(np.float32(v))) for k, v in value.items())
+
+
+def _canonical_json(value) -> bytes:
+    if isinstance(value, (str, bytes)):
+        value = json.loads(value)
+    return json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+
+
+def _array_bytes(value, element_type) -> bytes:
+    if element_type == DataType.VARCHAR:
+        return "\x00".join(value).encode()
+    np_type = {DataType.BOOL: np.bool_, DataType.FLOAT: np.float32, DataType.DOUBLE: np.float64}.get(element_type,
+                                                                                                  np.int64)
+    return np.asarray(value, dtype=np_type).tobytes()
+
+
+def _hash_non_null(values, field) -> np.ndarray:
+    dtype = field.dtype
+    if dtype in INT_TYPES:
+        return mix64(np.asarray(values, dtype=np.int64).view(np.uint64))
+    if dtype == DataType.FLOAT:
+        return mix64(np.asarray(values, dtype=np.float32).view(np.uint32))
+    if dtype == DataType.DOUBLE:
+        return mix64(np.asarray(values, dtype=np.float64).view(np.uint64))
+    if dtype == DataType.BOOL:
+        return mix64(np.asarray(values, dtype=np.bool_).astype(np.uint64) + _GOLDEN)
+    if dtype == DataType.VARCHAR:
+        return _digests([v.encode() for v in values])
+    if dtype == DataType.JSON:
+        return _digests([_canonical_json(v) for v in values])
+    if dtype == DataType.ARRAY:
+        return _digests([_array_bytes(v, field.element_type) for v in values])
+    if dtype == DataType.FLOAT_VECTOR:
+        matrix = np.asarray(values, dtype=np.float32).reshape(len(values), -1)
+        return _positional_hash(matrix.view(np.uint32))
+    if dtype in BYTES_VECTOR_TYPES:
+        rows = [_to_bytes(v) for v in values]
+        if len({len(r) for r in rows}) <= 1:
+            matrix = np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(len(rows), -1)
+            return _positional_hash(matrix)
+        return _digests(rows)
+    if dtype == DataType.SPARSE_FLOAT_VECTOR:
+        return _digests([np.asarray(_sparse_items(v), dtype=np.float64).tobytes() for v in values])
+    raise Exception(f"unsupported data type {dtype} of field {field.name}")
+
+
+def hash_column(values, field) -> np.ndarray:
+    """
+    uint64 hash of every value of a column, values are normalized to the representation returned
+    by query, so the generated data and the query results of the same row hash the same
+    """
+    if isinstance(values, pa.ChunkedArray) or isinstance(values, pa.Array):
+        values = values.to_pylist()
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return _hash_non_null(values, field)
+    values = list(values)
+    hashes = np.full(len(values), NULL_HASH, dtype=np.uint64)
+    valid = [i for i, v in enumerate(values) if v is not None]
+    if valid:
+        hashes[valid] = _hash_non_null([values[i] for i in valid], field)
+    return hashes
+
+
+def _columns_of(chunk) -> Dict[str, object]:
+    """columns of a generated chunk: RecordBatch, DataFrame, {field: array} or list of row dicts"""
+    if isinstance(chunk, (pa.RecordBatch, pa.Table)):
+        return {name: chunk.column(name) for name in chunk.schema.names}
+    if isinstance(chunk, list):
+        names = chunk[0].keys() if chunk else []
+        return {name: [row.get(name) for row in chunk] for name in names}
+    if hasattr(chunk, "columns") and hasattr(chunk, "iloc"):
+        return {name: chunk[name].tolist() for name in chunk.columns}
+    return dict(chunk)
+
+
+@dataclass
+class BucketMismatch:
+    bucket: int
+    pk_range: tuple
+    field: str
+    expected_count: int
+    actual_count: int
+    files: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ReconcileReport:
+    checked_buckets: List[int] = field(default_factory=list)
+    expected_rows: int = 0
+    actual_rows: int = 0
+    mismatches: List[BucketMismatch] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.mismatches
+
+    @property
+    def missing_ranges(self) -> List[tuple]:
+        """pk ranges of the checked buckets with missing or corrupted rows"""
+        return sorted({m.pk_range for m in self.mismatches})
+
+
+class ImportChecksum:
+    """
+    Order independent checksums of bulk insert data, per file, per column and per pk range bucket.
+
+    Every row of a column contributes mix(pk hash, value hash) to the count, the sum and the xor of
+    its bucket (pk // bucket_size), so the checksums of a bucket do not depend on the row order or
+    on how the rows are split into chunks and files, and a value moved to another row changes them.
+    The checksums are computed while the files are generated and reconciled against the collection
+    bucket by bucket with query_iterator, see reconcile.
+
+    Only int64 primary keys provided by the data are supported, auto id pks are unknown at
+    generation time. Dynamic fields are not verified.
+    """
+
+    def __init__(self, schema: CollectionSchema, bucket_size=100000, fields: Optional[Sequence[str]] = None):
+        """
+        Args:
+            schema: Collection schema
+            bucket_size: Number of pks of a bucket, the unit of reconciliation and of error localization
+            fields: Fields to verify, default to all the fields present in the files
+        """
+        self.schema = schema
+        self.bucket_size = bucket_size
+        pk = [f for f in schema.fields if f.is_primary][0]
+        if pk.auto_id or pk.dtype != DataType.INT64:
+            raise Exception("ImportChecksum needs an int64 primary key without auto id")
+        self.pk_field = pk.name
+        self.fields = {f.name: f for f in schema.fields
+                       if not getattr(f, "is_function_output", False) and (fields is None or f.name in fields)}
+        # file -> field -> bucket -> [count, sum, xor]
+        self.files: Dict[str, Dict[str, Dict[int, List[int]]]] = {}
+
+    def update(self, chunk, file=""):
+        """add a generated chunk of a file"""
+        accumulate(self.files.setdefault(file, {}), _columns_of(chunk), self.pk_field, self.fields, self.bucket_size)
+
+    def rename_file(self, old, new):
+        if old in self.files:
+            self.files[new] = self.files.pop(old)
+
+    def merged(self) -> Dict[str, Dict[int, List[int]]]:
+        res = {}
+        for table in self.files.values():
+            merge_into(res, table)
+        return res
+
+    @property
+    def buckets(self) -> List[int]:
+        return sorted({b for table in self.files.values() for stats in table.values() for b in stats})
+
+    @property
+    def total_rows(self) -> int:
+        return sum(stats[0] for table in self.files.values() for stats in table.get(self.pk_field, {}).values())
+
+    def files_of_bucket(self, bucket) -> List[str]:
+        return [file for file, table in self.files.items() if bucket in table.get(self.pk_field, {})]
+
+    def pk_range(self, bucket) -> tuple:
+        return bucket * self.bucket_size, (bucket + 1) * self.bucket_size
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"bucket_size": self.bucket_size, "files": self.files}, f)
+
+    def load(self, path):
+        with open(path) as f:
+            data = json.load(f)
+        self.bucket_size = data["bucket_size"]
+        self.files = {file: {name: {int(b): stats for b, stats in buckets.items()} for name, buckets in table.items()}
+                      for file, table in data["files"].items()}
+        return self
+
+
+def accumulate(table: Dict[str, Dict[int, List[int]]], columns: Dict[str, object], pk_field, fields, bucket_size):
+    """add the rows of the columns to the bucket checksums of table"""
+    pks = np.asarray(columns[pk_field].to_pylist() if isinstance(columns[pk_field], (pa.Array, pa.ChunkedArray))
+                     else columns[pk_field], dtype=np.int64)
+    if len(pks) == 0:
+        return
+    buckets = pks // bucket_size
+    order = np.argsort(buckets, kind="stable")
+    sorted_buckets = buckets[order]
+    starts = np.flatnonzero(np.concatenate([[True], sorted_buckets[1:] != sorted_buckets[:-1]]))
+    counts = np.diff(np.append(starts, len(order)))
+    pk_hashes = mix64(pks.view(np.uint64) + _GOLDEN)
+    for name, values in columns.items():
+        if name not in fields:
+            continue
+        row_hashes = mix64(hash_column(values, fields[name]) ^ pk_hashes)[order]
+        sums = np.add.reduceat(row_hashes, starts, dtype=np.uint64)
+        xors = np.bitwise_xor.reduceat(row_hashes, starts)
+        stats = table.setdefault(name, {})
+        for b, c, s, x in zip(sorted_buckets[starts].tolist(), counts.tolist(), sums.tolist(), xors.tolist()):
+            cur = stats.setdefault(b, [0, 0, 0])
+            cur[0] += c
+            cur[1] = (cur[1] + s) & MASK64
+            cur[2] ^= x
+
+
+def merge_into(target: Dict[str, Dict[int, List[int]]], table: Dict[str, Dict[int, List[int]]]):
+    for name, stats in table.items():
+        target_stats = target.setdefault(name, {})
+        for b, (c, s, x) in stats.items():
+            cur = target_stats.setdefault(b, [0, 0, 0])
+            cur[0] += c
+            cur[1] = (cur[1] + s) & MASK64
+            cur[2] ^= x
+
+
+class ChecksumWriter(ChunkWriter):
+    """ChunkWriter that feeds every chunk to an ImportChecksum before writing it with the wrapped writer"""
+
+    def __init__(self, writer: ChunkWriter, checksum: ImportChecksum, file=""):
+        super().__init__()
+        self.writer = writer
+        self.checksum = checksum
+        self.file = file
+
+    @property
+    def size(self) -> int:
+        return self.writer.size
+
+    def write(self, chunk, rows: int):
+        self.checksum.update(chunk, self.file)
+        self.writer.write(chunk, rows)
+        self.rows += rows
+
+    def close(self):
+        self.writer.close()
+
+
+def reconcile(collection, checksum: ImportChecksum, sample_ratio=1.0, buckets: Optional[Sequence[int]] = None,
+              batch_size=1000, seed=None) -> ReconcileReport:
+    """
+    Compare the checksums of the generated data with the collection, bucket by bucket
+
+    Only one query_iterator batch is kept in memory, so multi GB imports are verified exactly
+    for the checked buckets, and a mismatch gives the pk range and the files to look at.
+
+    Args:
+        collection: pymilvus Collection, loaded
+        checksum: Checksums computed when the files were generated
+        sample_ratio: Ratio of the buckets checked, 1.0 checks all of them
+        buckets: Buckets to check, overrides sample_ratio
+        batch_size: Batch size of query_iterator
+        seed: Seed of the bucket sampling
+
+    Returns:
+        ReconcileReport: checked buckets and mismatches
+    """
+    expected = checksum.merged()
+    if buckets is None:
+        buckets = checksum.buckets
+        if sample_ratio < 1.0:
+            k = max(1, int(round(len(buckets) * sample_ratio)))
+            buckets = sorted(random.Random(seed).sample(buckets, k))
+    report = ReconcileReport(checked_buckets=list(buckets))
+    output_fields = list(checksum.fields)
+    for bucket in buckets:
+        low, high = checksum.pk_range(bucket)
+        actual: Dict[str, Dict[int, List[int]]] = {}
+        iterator = collection.query_iterator(batch_size=batch_size,
+                                             expr=f"{checksum.pk_field} >= {low} and {checksum.pk_field} < {high}",
+                                             output_fields=output_fields)
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                columns = {name: [row.get(name) for row in rows] for name in output_fields}
+                accumulate(actual, columns, checksum.pk_field, checksum.fields, checksum.bucket_size)
+        finally:
+            iterator.close()
+        expected_count = expected.get(checksum.pk_field, {}).get(bucket, [0])[0]
+        actual_count = actual.get(checksum.pk_field, {}).get(bucket, [0])[0]
+        report.expected_rows += expected_count
+        report.actual_rows += actual_count
+        for name in output_fields:
+            exp = expected.get(name, {}).get(bucket, [0, 0, 0])
+            act = actual.get(name, {}).get(bucket, [0, 0, 0])
+            if exp != act:
+                report.mismatches.append(BucketMismatch(bucket=bucket, pk_range=(low, high), field=name,
+                                                        expected_count=exp[0], actual_count=act[0],
+                                                        files=checksum.files_of_bucket(bucket)))
+    log.info(f"reconciled {len(report.checked_buckets)} buckets, expected rows {report.expected_rows}, "
+             f"actual rows {report.actual_rows}, mismatches {len(report.mismatches)}")
+    for m in report.mismatches[:20]:
+        log.info(f"mismatch of field {m.field} in pk range {m.pk_range}: expected {m.expected_count} rows, "
+                 f"got {m.actual_count} rows, files {m.files}")
+    return report
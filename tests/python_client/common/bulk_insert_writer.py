@@ -0,0 +1,449 @@
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import ujson
+from npy_append_array import NpyAppendArray
+
+from utils.util_log import test_log as log
+
+GB = 1024 * 1024 * 1024
+MB = 1024 * 1024
+# strings with this prefix are written as raw (unquoted) tokens, used to inject invalid json values
+RAW_TOKEN_PREFIX = "__raw_token__:"
+_RAW_TOKEN_PATTERN = re.compile(r'"__raw_token__:([^"]*)"')
+
+
+def raw_token(token) -> str:
+    """mark a value to be written without quotes, e.g. raw_token("True") writes the invalid json token True"""
+    return f"{RAW_TOKEN_PREFIX}{token}"
+
+
+def block_rows_by_size(row_bytes, block_size=4 * MB) -> int:
+    """number of rows of a block of about block_size bytes"""
+    return max(1, int(block_size // max(row_bytes, 1)))
+
+
+def encode_json_rows(columns: Dict[str, Sequence], extra_fields: Optional[List[Dict]] = None, default=None) -> str:
+    """
+    Encode a block of rows given as columns to comma separated json objects, without the enclosing brackets.
+    The whole block is serialized by a single ujson call.
+
+    Args:
+        columns: field name -> values of the block, the field order is kept in every row
+        extra_fields: extra key/values of every row, e.g. dynamic fields
+        default: serializer of the values ujson does not support, e.g. common_func.to_serializable
+    """
+    names = list(columns)
+    rows = [dict(zip(names, values)) for values in zip(*columns.values())]
+    if extra_fields is not None:
+        for row, extra in zip(rows, extra_fields):
+            row.update(extra)
+    text = ujson.dumps(rows, default=default) if default is not None else ujson.dumps(rows)
+    text = text[1:-1]
+    if RAW_TOKEN_PREFIX in text:
+        text = _RAW_TOKEN_PATTERN.sub(r"\1", text)
+    return text
+
+
+def format_csv_vectors(vectors) -> List[str]:
+    """format a (rows, dim) block as quoted csv cells "[x, y, ...]" """
+    cells = np.asarray(vectors).astype(str)
+    return ['"[' + ", ".join(row) + ']"' for row in cells.tolist()]
+
+
+def encode_csv_rows(columns: Sequence[Sequence[str]]) -> str:
+    """join the formatted cells of a block, one string column per field, into csv lines"""
+    return "\n".join(",".join(cells) for cells in zip(*columns)) + "\n"
+
+
+class ChunkWriter:
+    """
+    Base class of the streaming bulk insert file writers.
+
+    A writer appends chunks of rows to the output file(s) and reports the number of bytes written,
+    only the current chunk is kept in memory.
+    """
+
+    def __init__(self):
+        self.rows = 0
+
+    @property
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def write(self, chunk, rows: int):
+        self._write(chunk)
+        self.rows += rows
+
+    def _write(self, chunk):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class NpyChunkWriter(ChunkWriter):
+    """
+    Append {field: np.ndarray} chunks to one .npy file per field with NpyAppendArray.
+
+    The dtype of every file is fixed by the first chunk. Unicode columns are padded to
+    `str_width_ratio` times the longest string of the first chunk, since a .npy file has a single
+    fixed width, a later chunk with a longer string raises instead of being silently truncated.
+    """
+
+    def __init__(self, dir, fields: List[str], str_width_ratio=2):
+        super().__init__()
+        self.dir = dir
+        self.files = {field: f"{field}.npy" for field in fields}
+        self.str_width_ratio = str_width_ratio
+        self.dtypes: Dict[str, np.dtype] = {}
+        self.writers: Dict[str, NpyAppendArray] = {}
+        for field, file_name in self.files.items():
+            self.writers[field] = NpyAppendArray(f"{dir}/{file_name}", delete_if_exists=True)
+
+    @property
+    def size(self) -> int:
+        return sum(os.path.getsize(f"{self.dir}/{f}") for f in self.files.values()
+                   if os.path.exists(f"{self.dir}/{f}"))
+
+    def _fix_dtype(self, field, arr):
+        if arr.dtype == object:
+            raise Exception(f"field {field} has object data (e.g. None values), it can not be appended to a npy file")
+        if field not in self.dtypes:
+            dtype = arr.dtype
+            if dtype.kind == "U":
+                dtype = np.dtype(f"<U{max(dtype.itemsize // 4, 1) * self.str_width_ratio}")
+            self.dtypes[field] = dtype
+        dtype = self.dtypes[field]
+        if dtype.kind == "U" and arr.dtype.itemsize > dtype.itemsize:
+            raise Exception(f"field {field} has strings longer than {dtype.itemsize // 4} chars, "
+                            f"increase str_width_ratio")
+        return arr.astype(dtype, copy=False)
+
+    def _write(self, chunk: Dict[str, np.ndarray]):
+        for field, writer in self.writers.items():
+            writer.append(self._fix_dtype(field, chunk[field]))
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+class NpyMemmapWriter(ChunkWriter):
+    """
+    Write a (rows, width) array of a fixed dtype to a .npy file through a memory map.
+
+    The header is written up front by np.lib.format.open_memmap with the final shape, then every
+    chunk is copied in place into the mapped rows and flushed, so only the current chunk is kept
+    in memory whatever the number of rows, and nothing is appended or reallocated.
+    """
+
+    def __init__(self, file, rows: int, width: int, dtype, flush_size=256 * MB):
+        super().__init__()
+        self.file = file
+        self.total_rows = rows
+        self.mm = np.lib.format.open_memmap(file, mode="w+", dtype=np.dtype(dtype), shape=(rows, width))
+        self.header_size = self.mm.offset
+        self.row_bytes = self.mm.dtype.itemsize * width
+        self.flush_rows = block_rows_by_size(self.row_bytes, flush_size)
+        self.unflushed = 0
+
+    @property
+    def size(self) -> int:
+        return self.header_size + self.rows * self.row_bytes
+
+    def _write(self, chunk: np.ndarray):
+        n = len(chunk)
+        if self.rows + n > self.total_rows:
+            raise Exception(f"{self.file} holds {self.total_rows} rows, can not write {self.rows + n} rows")
+        self.mm[self.rows:self.rows + n] = chunk
+        # bound the dirty pages of the mapping
+        self.unflushed += n
+        if self.unflushed >= self.flush_rows:
+            self.mm.flush()
+            self.unflushed = 0
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.flush()
+            # the file is unmapped when the memmap is released
+            self.mm = None
+
+
+class ParquetChunkWriter(ChunkWriter):
+    """
+    Append pandas DataFrame or pyarrow RecordBatch chunks as parquet row groups,
+    the arrow schema is fixed by the first chunk
+    """
+
+    def __init__(self, file, row_group_size=None):
+        super().__init__()
+        self.file = file
+        self.row_group_size = row_group_size
+        self.sink = pa.OSFile(file, "wb")
+        self.writer: Optional[pq.ParquetWriter] = None
+        self.schema = None
+
+    @property
+    def size(self) -> int:
+        return self.sink.tell() if not self.sink.closed else os.path.getsize(self.file)
+
+    def _write(self, chunk):
+        if isinstance(chunk, pa.RecordBatch):
+            table = pa.Table.from_batches([chunk])
+        else:
+            table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = pq.ParquetWriter(self.sink, self.schema)
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.sink.close()
+
+
+class JsonChunkWriter(ChunkWriter):
+    """
+    Append lists of row dicts to a file holding a single json list, the format of gen_new_json_files
+    """
+
+    def __init__(self, file):
+        super().__init__()
+        self.file = file
+        self.f = open(file, "w")
+        self.f.write("[")
+
+    @property
+    def size(self) -> int:
+        return self.f.tell() if not self.f.closed else os.path.getsize(self.file)
+
+    def _write(self, data: List[Dict]):
+        if not data:
+            return
+        if self.rows > 0:
+            self.f.write(", ")
+        self.f.write(ujson.dumps(data)[1:-1])
+
+    def close(self):
+        if not self.f.closed:
+            self.f.write("]")
+            self.f.close()
+
+
+class JsonRowsWriter(ChunkWriter):
+    """
+    Write blocks of columns as the rows of a json file, {"rows": [...]} when root_key is set
+    (the format of gen_row_based_json_file) or a plain list of rows otherwise.
+    Each block is encoded at once by encode_json_rows and written with one buffered write.
+    """
+
+    def __init__(self, file, root_key="rows", default=None, buffer_size=4 * MB):
+        super().__init__()
+        self.file = file
+        self.root_key = root_key
+        self.default = default
+        self.f = open(file, "w", buffering=buffer_size)
+        self.f.write(f'{{\n"{root_key}":[\n' if root_key else "[\n")
+
+    @property
+    def size(self) -> int:
+        return self.f.tell() if not self.f.closed else os.path.getsize(self.file)
+
+    def write_columns(self, columns: Dict[str, Sequence], extra_fields: Optional[List[Dict]] = None):
+        rows = len(next(iter(columns.values())))
+        if rows > 0:
+            self.write(encode_json_rows(columns, extra_fields, default=self.default), rows)
+
+    def _write(self, text: str):
+        if self.rows > 0:
+            self.f.write(",\n")
+        self.f.write(text)
+
+    def close(self):
+        if not self.f.closed:
+            self.f.write("\n]\n}\n" if self.root_key else "\n]\n")
+            self.f.close()
+
+
+class CsvWriter(ChunkWriter):
+    """Write the header and then blocks of formatted string columns as csv lines"""
+
+    def __init__(self, file, header: Sequence[str], buffer_size=4 * MB):
+        super().__init__()
+        self.file = file
+        self.f = open(file, "w", buffering=buffer_size)
+        self.f.write(",".join(header) + "\n")
+
+    @property
+    def size(self) -> int:
+        return self.f.tell() if not self.f.closed else os.path.getsize(self.file)
+
+    def write_columns(self, columns: Sequence[Sequence[str]]):
+        rows = len(columns[0]) if columns else 0
+        if rows > 0:
+            self.write(encode_csv_rows(columns), rows)
+
+    def _write(self, text: str):
+        self.f.write(text)
+
+    def close(self):
+        if not self.f.closed:
+            self.f.close()
+
+
+def _gen_chunks(executor, gen_chunk, starts, rows):
+    if executor is None:
+        return map(gen_chunk, starts, rows)
+    return executor.map(gen_chunk, starts, rows)
+
+
+def write_chunks(writer: ChunkWriter, gen_chunk: Callable, rows: int, chunk_rows: int, start_uid=0,
+                 num_workers=1) -> int:
+    """
+    Write `rows` rows generated as chunks of chunk_rows, with the pk range [start_uid, start_uid + rows).
+    When num_workers > 1 the chunks are generated in a process pool, num_workers chunks at a time,
+    and written in pk order.
+
+    Returns:
+        int: total rows written
+    """
+    executor = ProcessPoolExecutor(max_workers=num_workers) if num_workers > 1 else None
+    starts = list(range(start_uid, start_uid + rows, chunk_rows))
+    sizes = [min(chunk_rows, start_uid + rows - start) for start in starts]
+    wave = max(num_workers, 1)
+    try:
+        with writer:
+            for i in range(0, len(starts), wave):
+                for chunk, size in zip(_gen_chunks(executor, gen_chunk, starts[i:i + wave], sizes[i:i + wave]),
+                                       sizes[i:i + wave]):
+                    writer.write(chunk, size)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return writer.rows
+
+
+def write_chunks_to_size(writer: ChunkWriter, gen_chunk: Callable, target_size: int, chunk_rows: int,
+                         start_uid=0, min_chunk_rows=None, num_workers=1) -> int:
+    """
+    Stream freshly generated chunks into the writer until target_size bytes are written
+
+    Every chunk is generated with its own pk range [start, start + rows), so all the primary keys
+    of the file are unique. After the first chunk the rows of the next chunks are sized from the
+    measured bytes per row, so the file ends close to target_size instead of overshooting by a chunk.
+
+    Args:
+        writer: Writer of the output format
+        gen_chunk: gen_chunk(start, rows) returns the chunk data accepted by the writer,
+            it must be picklable (module level function or functools.partial) when num_workers > 1
+        target_size: Target size in bytes
+        chunk_rows: Max rows generated per chunk, it bounds the memory used
+        start_uid: First primary key
+        min_chunk_rows: Min rows of the tail chunks, default 1% of chunk_rows
+        num_workers: Number of processes generating chunks, up to num_workers chunks are
+            generated at once and written in pk order
+
+    Returns:
+        int: total rows written
+    """
+    min_chunk_rows = min_chunk_rows or max(1, chunk_rows // 100)
+    executor = ProcessPoolExecutor(max_workers=num_workers) if num_workers > 1 else None
+    try:
+        with writer:
+            writer.write(gen_chunk(start_uid, chunk_rows), chunk_rows)
+            while writer.size < target_size:
+                bytes_per_row = writer.size / writer.rows
+                rows_needed = math.ceil((target_size - writer.size) / bytes_per_row)
+                n_chunks = min(num_workers, math.ceil(rows_needed / chunk_rows))
+                rows = min(chunk_rows, max(min_chunk_rows, math.ceil(rows_needed / n_chunks)))
+                starts = [start_uid + writer.rows + i * rows for i in range(n_chunks)]
+                for chunk in _gen_chunks(executor, gen_chunk, starts, [rows] * n_chunks):
+                    writer.write(chunk, rows)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    log.info(f"streamed {writer.rows} rows, {writer.size / 1024 / 1024:.2f} MB "
+             f"for target {target_size / 1024 / 1024:.2f} MB")
+    return writer.rows
+
+
+# numpy layout of the vector types: dtype and values per row for the dim
+NPY_VECTOR_LAYOUTS = {
+    "float32": (np.float32, lambda dim: dim),
+    "fp16": (np.uint8, lambda dim: dim * 2),
+    "bf16": (np.uint8, lambda dim: dim * 2),
+    "int8": (np.int8, lambda dim: dim),
+    "binary": (np.uint8, lambda dim: dim // 8),
+}
+
+
+def gen_vector_chunk(rng: np.random.Generator, vector_type, rows, dim) -> np.ndarray:
+    """
+    Vectors of a vector type in their .npy layout: l2 normalized float32, the little endian bytes of
+    float16 / bfloat16, int8, or packed bits of binary vectors (dim // 8 bytes)
+    """
+    if vector_type == "float32":
+        vectors = rng.random((rows, dim), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), np.finfo(np.float32).tiny)
+        return vectors
+    if vector_type == "fp16":
+        return rng.random((rows, dim), dtype=np.float32).astype("<f2").view(np.uint8)
+    if vector_type == "bf16":
+        # bfloat16 is the high half of the float32 bits
+        bits = rng.random((rows, dim), dtype=np.float32).view(np.uint32) >> 16
+        return bits.astype("<u2").view(np.uint8)
+    if vector_type == "int8":
+        return rng.integers(-128, 128, (rows, dim), dtype=np.int8)
+    if vector_type == "binary":
+        return rng.integers(0, 256, (rows, dim // 8), dtype=np.uint8)
+    raise Exception(f"unsupported vector type {vector_type}, expected one of {list(NPY_VECTOR_LAYOUTS)}")
+
+
+def _vector_chunk(start, rows, vector_type, dim, seed):
+    return gen_vector_chunk(np.random.default_rng([seed, start]), vector_type, rows, dim)
+
+
+def write_npy_vectors(file, vector_type, rows, dim, seed=None, chunk_size=64 * MB, num_workers=1) -> int:
+    """
+    Write rows random vectors to a .npy file chunk by chunk with NpyMemmapWriter, in constant memory
+
+    Args:
+        file: Path of the .npy file
+        vector_type: One of float32, fp16, bf16, int8 and binary
+        rows: Number of vectors
+        dim: Dim of the vectors
+        seed: Base seed, every chunk is generated from (seed, start row), drawn from np.random when None
+            so the global seeding of the generators still applies
+        chunk_size: Bytes of a chunk, it bounds the memory used
+        num_workers: Number of processes generating chunks
+
+    Returns:
+        int: rows written
+    """
+    if vector_type not in NPY_VECTOR_LAYOUTS:
+        raise Exception(f"unsupported vector type {vector_type}, expected one of {list(NPY_VECTOR_LAYOUTS)}")
+    dtype, width = NPY_VECTOR_LAYOUTS[vector_type]
+    width = width(dim)
+    seed = int(np.random.randint(0, 2 ** 31)) if seed is None else seed
+    chunk_rows = block_rows_by_size(np.dtype(dtype).itemsize * width, chunk_size)
+    gen_chunk = partial(_vector_chunk, vector_type=vector_type, dim=dim, seed=seed)
+    writer = NpyMemmapWriter(file, rows, width, dtype)
+    total_rows = write_chunks(writer, gen_chunk, rows, chunk_rows=chunk_rows, num_workers=num_workers)
+    log.info(f"wrote {total_rows} {vector_type} vectors of dim {dim} to {file}, "
+             f"size {os.path.getsize(file) / MB:.2f} MB")
+    return total_rows
@@ -5,19 +5,22 @@ import string
 import json
 import time
 import uuid
+import functools
 from functools import singledispatch
 import numpy as np
 import pandas as pd
 from ml_dtypes import bfloat16
 from sklearn import preprocessing
-from npy_append_array import NpyAppendArray
 from faker import Faker
 from pathlib import Path
-from minio import Minio
 from base.schema_wrapper import ApiCollectionSchemaWrapper, ApiFieldSchemaWrapper
 from common import common_type as ct
 from common.common_params import ExprCheckParams
+from common.minio_comm import MinioUploader, gen_minio_client
+from common.bulk_insert_writer import JsonRowsWriter, block_rows_by_size, write_npy_vectors
+from common.text_corpus_generator import ZipfTextCorpusGenerator
 from utils.util_log import test_log as log
+from utils.util_fts import analyzer_token_cache
 from customize.milvus_operator import MilvusOperator
 import pickle
 from collections import Counter
@@ -149,6 +152,8 @@ def patch_faker_text(fake_instance, vocabularies_distribution):
 def get_bm25_ground_truth(corpus, queries, top_k=100, language="en"):
     """
     Get the ground truth for BM25 search.
+    The corpus is tokenized and indexed on every call, use common.bm25_oracle.BM25Oracle
+    to query the same corpus many times or to follow upsert and delete.
     :param corpus: The corpus of documents
     :param queries: The query string or list of query strings
     :return: The ground truth for BM25 search
@@ -276,9 +281,9 @@ def analyze_documents_with_analyzer_params(texts, analyzer_params):
         token = param_info.param_token
     )
     freq = Counter()
-    res = client.run_analyzer(texts, analyzer_params, with_detail=True, with_hash=True)
-    for r in res:
-        freq.update(t['token'] for t in r.tokens)
+    # tokens are cached by (analyzer params, text), only unseen texts are sent to the server
+    for tokens in analyzer_token_cache.tokenize(client, texts, analyzer_params):
+        freq.update(tokens)
     log.info(f"word freq {freq.most_common(10)}")
     return freq
 
@@ -618,8 +623,37 @@ def generate_random_sentence(language):
         "Hindi": "hi_IN"
     }
     lang_code = language_map.get(language, "en_US")
-    faker = Faker(lang_code)
-    return faker.sentence()
+    return get_faker(lang_code).sentence()
+
+
+@functools.lru_cache(maxsize=None)
+def get_faker(locale="en_US"):
+    # creating a Faker instance loads all its providers, reuse one instance per locale
+    return Faker(locale)
+
+
+text_corpus_generators = {}
+
+
+def get_text_corpus_generator(language="en"):
+    """
+    Get the shared Zipf text corpus generator of the language,
+    documents have 5 to 30 words, close to the length of Faker.text()
+    """
+    language = "zh" if language in ["zh", "cn", "chinese"] else language
+    if language not in text_corpus_generators:
+        target_words = zh_vocabularies_distribution if language == "zh" else en_vocabularies_distribution
+        text_corpus_generators[language] = ZipfTextCorpusGenerator(language=language, min_words=5, max_words=30,
+                                                                   target_words=target_words)
+    return text_corpus_generators[language]
+
+
+def gen_text_corpus(nb, language="en"):
+    """
+    Generate nb text documents in bulk
+    :return: TextCorpus, .texts gives the documents and .term_frequency() the exact word frequency
+    """
+    return get_text_corpus_generator(language).generate(nb)
 
 
 def gen_digits_by_length(length=8):
@@ -1719,12 +1753,8 @@ def prepare_bulk_insert_data(schema=None,
         files = gen_npy_files_for_bulk_insert(data, schema, data_dir)
     log.info(f"generated {len(files)} {file_type} files for bulk insert, cost {time.time() - t0} s")
     log.info("upload file to minio")
-    client = Minio(minio_endpoint, access_key="minioadmin", secret_key="minioadmin", secure=False)
-    for file_name in files:
-        file_size = os.path.getsize(os.path.join(data_dir, file_name)) / 1024 / 1024
-        t0 = time.time()
-        client.fput_object(bucket_name, file_name, os.path.join(data_dir, file_name))
-        log.info(f"upload file {file_name} to minio, size: {file_size:.2f} MB, cost {time.time() - t0:.2f} s")
+    uploader = MinioUploader(gen_minio_client(minio_endpoint, max_connections=24), bucket_name)
+    uploader.upload_files([(os.path.join(data_dir, file_name), file_name) for file_name in files], force=True)
     return files
 
 
@@ -1959,7 +1989,7 @@ def get_dense_anns_field_name_list(schema=None):
 
 def gen_varchar_data(length: int, nb: int, text_mode=False):
     if text_mode:
-        return [fake.text() for _ in range(nb)]
+        return gen_text_corpus(nb).texts
     else:
         return ["".join([chr(random.randint(97, 122)) for _ in range(length)]) for _ in range(nb)]
 
@@ -2170,26 +2200,17 @@ def gen_json_files_for_bulk_insert(data, schema, data_dir):
     data_source = os.path.join(data_dir, file_name)
     Path(data_source).parent.mkdir(parents=True, exist_ok=True)
     log.info(f"file name: {data_source}")
-    with open(data_source, "w") as f:
-        f.write("{")
-        f.write("\n")
-        f.write('"rows":[')
-        f.write("\n")
-        for i in range(nb):
-            entity_value = [None for _ in range(len(fields_name))]
-            for j in range(len(data)):
+    block_rows = block_rows_by_size(row_bytes=dim * 20 + 200)
+    with JsonRowsWriter(data_source, root_key="rows", default=to_serializable) as writer:
+        for start in range(0, nb, block_rows):
+            end = min(start + block_rows, nb)
+            columns = {}
+            for j, field_name in enumerate(fields_name):
                 if j == vec_field_index:
-                    entity_value[j] = [random.random() for _ in range(dim)]
+                    columns[field_name] = np.random.random((end - start, dim)).tolist()
                 else:
-                    entity_value[j] = data[j][i]
-            entity = dict(zip(fields_name, entity_value))
-            f.write(json.dumps(entity, indent=4, default=to_serializable))
-            if i != nb - 1:
-                f.write(",")
-            f.write("\n")
-        f.write("]")
-        f.write("\n")
-        f.write("}")
+                    columns[field_name] = data[j][start:end] if j < len(data) else [None] * (end - start)
+            writer.write_columns(columns)
     return files
 
 
@@ -2211,10 +2232,7 @@ def gen_npy_files_for_bulk_insert(data, schema, data_dir):
         log.info(f"save file {data_source}")
         if vec_field_name in file:
             log.info(f"generate {nb} vectors with dim {dim} for {data_source}")
-            with NpyAppendArray(data_source, "wb") as npaa:
-                for j in range(nb):
-                    vector = np.array([[random.random() for _ in range(dim)]])
-                    npaa.append(vector)
+            write_npy_vectors(data_source, "float32", nb, dim)
 
         elif isinstance(data[i][0], dict):
             tmp = []
@@ -3462,71 +3480,6 @@ def get_activate_func_from_metric_type(metric_type):
     return activate_function
 
 
-def get_hybrid_search_base_results_rrf(search_res_dict_array, round_decimal=-1):
-    """
-    merge the element in the dicts array
-    search_res_dict_array : the dict array in which the elements to be merged
-    return: the sorted id and score answer
-    """
-    # calculate hybrid search base line
-
-    search_res_dict_merge = {}
-    ids_answer = []
-    score_answer = []
-
-    for i, result in enumerate(search_res_dict_array, 0):
-        for key, distance in result.items():
-            search_res_dict_merge[key] = search_res_dict_merge.get(key, 0) + distance
-
-    if round_decimal != -1 :
-        for k, v in search_res_dict_merge.items():
-            multiplier = math.pow(10.0, round_decimal)
-            v = math.floor(v*multiplier+0.5) / multiplier
-            search_res_dict_merge[k] = v
-
-    sorted_list = sorted(search_res_dict_merge.items(), key=lambda x: x[1], reverse=True)
-
-    for sort in sorted_list:
-        ids_answer.append(int(sort[0]))
-        score_answer.append(float(sort[1]))
-
-    return ids_answer, score_answer
-
-
-def get_hybrid_search_base_results(search_res_dict_array, weights, metric_types, round_decimal=-1):
-    """
-    merge the element in the dicts array
-    search_res_dict_array : the dict array in which the elements to be merged
-    return: the sorted id and score answer
-    """
-    # calculate hybrid search base line
-
-    search_res_dict_merge = {}
-    ids_answer = []
-    score_answer = []
-
-    for i, result in enumerate(search_res_dict_array, 0):
-        activate_function = get_activate_func_from_metric_type(metric_types[i])
-        for key, distance in result.items():
-            activate_distance = activate_function(distance)
-            weight = weights[i]
-            search_res_dict_merge[key] = search_res_dict_merge.get(key, 0) + activate_function(distance) * weights[i]
-
-    if round_decimal != -1 :
-        for k, v in search_res_dict_merge.items():
-            multiplier = math.pow(10.0, round_decimal)
-            v = math.floor(v*multiplier+0.5) / multiplier
-            search_res_dict_merge[k] = v
-
-    sorted_list = sorted(search_res_dict_merge.items(), key=lambda x: x[1], reverse=True)
-
-    for sort in sorted_list:
-        ids_answer.append(int(sort[0]))
-        score_answer.append(float(sort[1]))
-
-    return ids_answer, score_answer
-
-
 def gen_bf16_vectors(num, dim):
     """
     generate brain float16 vector data
@@ -3622,10 +3575,7 @@ def gen_int8_vectors(num, dim):
 
 def gen_text_vectors(nb, language="en"):
 
-    fake = Faker("en_US")
-    if language == "zh":
-        fake = Faker("zh_CN")
-    vectors = [" milvus " + fake.text() for _ in range(nb)]
+    vectors = [" milvus " + text for text in gen_text_corpus(nb, language=language).texts]
     return vectors
 
 
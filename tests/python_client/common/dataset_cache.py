@@ -0,0 +1,291 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.bulk_insert_data import data_source
+from common.bulk_insert_writer import GB, MB
+from utils.util_log import test_log as log
+
+# the files of the generators, any change of them invalidates the cached datasets
+GENERATOR_MODULES = ("bulk_insert_data.py", "bulk_insert_writer.py", "arrow_batch_generator.py")
+# generator kwargs that do not change the generated data
+NON_DATA_KWARGS = ("force",)
+MANIFEST = "manifest.json"
+
+
+@lru_cache()
+def generator_version() -> str:
+    """hash of the generator sources, used as the generator version of the cache keys"""
+    h = hashlib.sha256()
+    common_dir = Path(__file__).parent
+    for name in GENERATOR_MODULES:
+        h.update((common_dir / name).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def _json_default(o):
+    if hasattr(o, "to_dict"):
+        return o.to_dict()
+    if isinstance(o, np.generic):
+        return o.item()
+    return str(o)
+
+
+def dataset_key(generator: str, **kwargs) -> str:
+    """
+    content address of a dataset: sha256 of the generator name, its data kwargs (schema, rows, dim,
+    seed, ...) and the generator version
+    """
+    spec = {k: v for k, v in kwargs.items() if k not in NON_DATA_KWARGS}
+    text = json.dumps({"generator": generator, "kwargs": spec, "version": generator_version()},
+                      sort_keys=True, default=_json_default)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    reused_bytes: int = 0
+    generated_bytes: int = 0
+    gen_seconds: float = 0.0
+
+    def merge(self, other: "CacheStats"):
+        for k, v in asdict(other).items():
+            setattr(self, k, getattr(self, k) + v)
+
+
+class DatasetCache:
+    """
+    Content addressed cache of the generated bulk insert files.
+
+    A dataset is keyed by dataset_key(generator, **kwargs), so a second request of the same schema,
+    rows, dim, seed and format returns the files generated by the first one instead of generating
+    them again. The entries live in data_source/<name>/<key>/ with a manifest of the files, the
+    returned file names are relative to data_source and are used as the object names as well, so the
+    uploads of a reused dataset are skipped by MinioUploader when the identical objects are already
+    in the bucket.
+
+    Entries are published by an atomic rename, which makes the cache safe to share between processes
+    (pytest-xdist workers, warm up pools). When the entries exceed max_size the least recently used
+    ones are evicted.
+    """
+
+    def __init__(self, name="cache", max_size: Optional[float] = 50 * GB):
+        """
+        Args:
+            name: Folder of the cache under data_source
+            max_size: Max total size of the entries in bytes, None for no limit
+        """
+        self.name = name
+        self.root = f"{data_source}/{name}"
+        self.max_size = max_size
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        Path(self.root).mkdir(parents=True, exist_ok=True)
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _entry_dir(self, key) -> str:
+        return f"{self.root}/{key}"
+
+    def _load(self, key) -> Optional[Dict]:
+        manifest_file = f"{self._entry_dir(key)}/{MANIFEST}"
+        try:
+            with open(manifest_file) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not all(os.path.exists(f"{self._entry_dir(key)}/{f}") for f in manifest["files"]):
+            log.warning(f"dataset cache entry {key} is incomplete, discard it")
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            return None
+        return manifest
+
+    @staticmethod
+    def _save_manifest(entry_dir, manifest):
+        tmp_file = f"{entry_dir}/{MANIFEST}.{uuid.uuid4()}"
+        with open(tmp_file, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_file, f"{entry_dir}/{MANIFEST}")
+
+    def _file_names(self, key, files) -> List[str]:
+        return [f"{self.name}/{key}/{f}" for f in files]
+
+    def get_or_create(self, gen_func: Callable[..., List[str]], **kwargs) -> List[str]:
+        """
+        Files of the dataset gen_func(**kwargs) generates, generated on a miss only
+
+        Args:
+            gen_func: Generator writing files under data_source and returning their names relative
+                to data_source, e.g. gen_parquet_files
+            kwargs: Kwargs of gen_func, they must fully determine the data, i.e. include the seed
+
+        Returns:
+            List[str]: file names relative to data_source
+        """
+        key = dataset_key(gen_func.__name__, **kwargs)
+        with self._key_lock(key):
+            manifest = self._load(key)
+            if manifest is not None:
+                manifest["last_used"] = time.time()
+                self._save_manifest(self._entry_dir(key), manifest)
+                with self._lock:
+                    self.stats.hits += 1
+                    self.stats.reused_bytes += manifest["size"]
+                log.info(f"dataset cache hit {key}: {len(manifest['files'])} files of {gen_func.__name__}, "
+                         f"{manifest['size'] / MB:.2f} MB")
+                return self._file_names(key, manifest["files"])
+
+            t0 = time.time()
+            before = set(os.listdir(data_source))
+            files = gen_func(**kwargs)
+            tt = time.time() - t0
+            manifest = self._publish(key, gen_func.__name__, files, before)
+            with self._lock:
+                self.stats.misses += 1
+                self.stats.generated_bytes += manifest["size"]
+                self.stats.gen_seconds += tt
+            log.info(f"dataset cache miss {key}: generated {len(files)} files of {gen_func.__name__}, "
+                     f"{manifest['size'] / MB:.2f} MB in {tt:.2f} s")
+        self.evict(keep=(key,))
+        return self._file_names(key, manifest["files"])
+
+    def _publish(self, key, generator, files, before) -> Dict:
+        """move the generated files into a new entry, published by renaming its folder"""
+        tmp_dir = f"{self.root}/.tmp-{key}-{uuid.uuid4()}"
+        Path(tmp_dir).mkdir(parents=True)
+        moved = set()
+        for f in files:
+            top = f.split("/")[0]
+            if top in moved:
+                continue
+            if "/" in f and top not in before:
+                # a folder created by this generation, e.g. parquet-<uuid>, is moved as a whole
+                shutil.move(f"{data_source}/{top}", f"{tmp_dir}/{top}")
+                moved.add(top)
+            else:
+                Path(f"{tmp_dir}/{f}").parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(f"{data_source}/{f}", f"{tmp_dir}/{f}")
+        now = time.time()
+        manifest = {"key": key, "generator": generator, "version": generator_version(), "files": files,
+                    "size": sum(os.path.getsize(f"{tmp_dir}/{f}") for f in files), "created": now,
+                    "last_used": now}
+        self._save_manifest(tmp_dir, manifest)
+        try:
+            os.rename(tmp_dir, self._entry_dir(key))
+        except OSError:
+            # published by another process meanwhile, the datasets are identical
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            manifest = self._load(key) or manifest
+        return manifest
+
+    def entries(self) -> List[Dict]:
+        entries = []
+        for key in os.listdir(self.root):
+            if key.startswith("."):
+                continue
+            try:
+                with open(f"{self._entry_dir(key)}/{MANIFEST}") as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    @property
+    def size(self) -> int:
+        return sum(e["size"] for e in self.entries())
+
+    def evict(self, keep: Sequence[str] = ()) -> List[str]:
+        """remove the least recently used entries until the total size is within max_size"""
+        if self.max_size is None:
+            return []
+        entries = sorted(self.entries(), key=lambda e: e["last_used"])
+        total = sum(e["size"] for e in entries)
+        evicted = []
+        for e in entries:
+            if total <= self.max_size:
+                break
+            if e["key"] in keep:
+                continue
+            shutil.rmtree(self._entry_dir(e["key"]), ignore_errors=True)
+            total -= e["size"]
+            evicted.append(e["key"])
+        if evicted:
+            with self._lock:
+                self.stats.evictions += len(evicted)
+            log.info(f"dataset cache evicted {len(evicted)} entries, size {total / MB:.2f} MB")
+        return evicted
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        Path(self.root).mkdir(parents=True, exist_ok=True)
+
+    def warm(self, datasets: Sequence[Tuple[Callable, Dict]], num_workers=4) -> List[List[str]]:
+        """
+        Generate the missing datasets in a process pool, e.g. in a session fixture before the tests run
+
+        Args:
+            datasets: (gen_func, kwargs) of every dataset, gen_func must be a module level function
+            num_workers: Number of datasets generated at the same time
+
+        Returns:
+            List[List[str]]: files of every dataset
+        """
+        t0 = time.time()
+        if num_workers > 1 and len(datasets) > 1:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                results = list(executor.map(_warm_dataset, [self.name] * len(datasets),
+                                            [gen_func for gen_func, _ in datasets],
+                                            [kwargs for _, kwargs in datasets]))
+        else:
+            results = [_warm_dataset(self.name, gen_func, kwargs) for gen_func, kwargs in datasets]
+        for _, stats in results:
+            self.stats.merge(stats)
+        self.evict()
+        log.info(f"dataset cache warmed {len(datasets)} datasets in {time.time() - t0:.2f} s, {self.summary()}")
+        return [files for files, _ in results]
+
+    def summary(self) -> Dict:
+        res = asdict(self.stats)
+        requests = self.stats.hits + self.stats.misses
+        res["hit_rate"] = self.stats.hits / requests if requests else 0.0
+        return res
+
+
+def _warm_dataset(name, gen_func, kwargs) -> Tuple[List[str], CacheStats]:
+    # eviction is left to the parent, it sees all the warmed entries
+    cache = DatasetCache(name, max_size=None)
+    return cache.get_or_create(gen_func, **kwargs), cache.stats
+
+
+def load_datasets(file) -> List[Tuple[Callable, Dict]]:
+    """
+    Datasets to warm from a json file, a list of {"generator": "gen_parquet_files", "kwargs": {...}},
+    the generators are looked up in common.bulk_insert_data
+    """
+    from common import bulk_insert_data
+    with open(file) as f:
+        datasets = json.load(f)
+    res = []
+    for d in datasets:
+        gen_func = getattr(bulk_insert_data, d["generator"], None)
+        if gen_func is None:
+            raise Exception(f"unknown bulk insert generator {d['generator']} in {file}")
+        res.append((gen_func, d.get("kwargs", {})))
+    return res
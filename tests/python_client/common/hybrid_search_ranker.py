@@ -0,0 +1,155 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize_scores(scores: np.ndarray, metric_type: str) -> np.ndarray:
+    """
+    Vectorized version of common_func.get_activate_func_from_metric_type,
+    maps the distances of a metric type to [0, 1] where larger is better
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if metric_type == "COSINE":
+        return (1 + scores) * 0.5
+    if metric_type == "IP":
+        return 0.5 + np.arctan(scores) / np.pi
+    if metric_type == "BM25":
+        return 2 * np.arctan(scores) / np.pi
+    return 1.0 - 2 * np.arctan(scores) / np.pi
+
+
+def round_scores(scores: np.ndarray, round_decimal=-1) -> np.ndarray:
+    if round_decimal == -1:
+        return scores
+    multiplier = 10.0 ** round_decimal
+    return np.floor(scores * multiplier + 0.5) / multiplier
+
+
+def pad_results(ids: Sequence[Sequence], scores: Optional[Sequence[Sequence]] = None) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert ragged per-query ids/scores lists to (nq, k) arrays and the mask of the valid entries,
+    every id is a valid pk, so the padding is tracked by the mask instead of a sentinel id
+
+    Args:
+        ids: ids of each query, e.g. [hits.ids for hits in search_res]
+        scores: scores of each query, e.g. [hits.distances for hits in search_res]
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: padded ids, padded scores and valid mask
+    """
+    nq = len(ids)
+    k = max((len(row) for row in ids), default=0)
+    # int64 pks keep an int64 array, varchar pks an object array
+    is_int = all(isinstance(pk, (int, np.integer)) for row in ids for pk in row[:1])
+    padded_ids = np.zeros((nq, k), dtype=np.int64 if is_int else object)
+    padded_scores = np.zeros((nq, k), dtype=np.float64)
+    valid = np.zeros((nq, k), dtype=bool)
+    for i in range(nq):
+        padded_ids[i, :len(ids[i])] = ids[i]
+        valid[i, :len(ids[i])] = True
+        if scores is not None:
+            padded_scores[i, :len(scores[i])] = scores[i]
+    return padded_ids, padded_scores, valid
+
+
+def pad_search_results(search_res) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """pad_results of the hits of every query of a search result"""
+    return pad_results([hits.ids for hits in search_res], [hits.distances for hits in search_res])
+
+
+def merge_scores(ids_list: List[np.ndarray], scores_list: List[np.ndarray],
+                 valid_list: Optional[List[np.ndarray]] = None, top_k=None, offset=0, round_decimal=-1):
+    """
+    Sum the scores of the same id across requests for every query and keep the top k,
+    sorted by score desc and then by id asc, the order used by the proxy reducer for ties.
+    Rounding is applied to the output scores after sorting.
+    Entries out of valid_list are ignored, all the entries are valid when it is None.
+    """
+    nq = ids_list[0].shape[0]
+    if valid_list is None:
+        valid_list = [np.ones(ids.shape, dtype=bool) for ids in ids_list]
+    query_idx = np.concatenate([np.repeat(np.arange(nq), ids.shape[1]) for ids in ids_list])
+    all_ids = np.concatenate([ids.ravel() for ids in ids_list])
+    all_scores = np.concatenate([np.asarray(scores, dtype=np.float64).ravel() for scores in scores_list])
+    valid = np.concatenate([np.asarray(v, dtype=bool).ravel() for v in valid_list])
+    query_idx, all_ids, all_scores = query_idx[valid], all_ids[valid], all_scores[valid]
+    # sorted codes of the ids, so int64 and varchar pks are grouped and ordered the same way
+    unique_ids, id_codes = np.unique(all_ids, return_inverse=True)
+    id_codes = id_codes.ravel()
+
+    # group the (query, id) pairs, then sum the scores of each group
+    order = np.lexsort((id_codes, query_idx))
+    query_idx, id_codes, all_scores = query_idx[order], id_codes[order], all_scores[order]
+    is_first = np.ones(len(id_codes), dtype=bool)
+    is_first[1:] = (query_idx[1:] != query_idx[:-1]) | (id_codes[1:] != id_codes[:-1])
+    group_starts = np.flatnonzero(is_first)
+    merged_scores = np.add.reduceat(all_scores, group_starts) if len(group_starts) else all_scores[:0]
+    merged_codes = id_codes[group_starts]
+    merged_query = query_idx[group_starts]
+
+    # rank inside each query: score desc, id asc
+    rank_order = np.lexsort((merged_codes, -merged_scores, merged_query))
+    merged_codes, merged_scores, merged_query = \
+        merged_codes[rank_order], merged_scores[rank_order], merged_query[rank_order]
+    merged_ids = unique_ids[merged_codes]
+    counts = np.bincount(merged_query, minlength=nq)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    res_ids, res_scores = [], []
+    for q in range(nq):
+        begin = starts[q] + offset
+        end = starts[q] + counts[q] if top_k is None else min(begin + top_k, starts[q] + counts[q])
+        res_ids.append(merged_ids[begin:end].tolist())
+        res_scores.append(round_scores(merged_scores[begin:end], round_decimal).tolist())
+    return res_ids, res_scores
+
+
+def rrf_fusion(ids_list: List[np.ndarray], valid_list: Optional[List[np.ndarray]] = None, k=60, top_k=None,
+               offset=0, round_decimal=-1):
+    """
+    Reference RRFRanker for all nq at once
+
+    Args:
+        ids_list: (nq, limit) id array of each AnnSearchRequest, ordered by rank
+        valid_list: (nq, limit) mask of the returned ids of each AnnSearchRequest, None if all are returned
+        k: RRF smoothing parameter, score of rank r (0 based) is 1 / (k + r + 1)
+        top_k: limit of the hybrid search, None returns all merged ids
+        offset: offset of the hybrid search
+        round_decimal: round_decimal of the hybrid search
+
+    Returns:
+        Tuple[List[List[int]], List[List[float]]]: ids and scores of each query
+    """
+    ids_list = [np.asarray(ids) for ids in ids_list]
+    scores_list = [np.broadcast_to(1.0 / (k + np.arange(ids.shape[1]) + 1), ids.shape) for ids in ids_list]
+    return merge_scores(ids_list, scores_list, valid_list=valid_list, top_k=top_k, offset=offset,
+                        round_decimal=round_decimal)
+
+
+def weighted_fusion(ids_list: List[np.ndarray], scores_list: List[np.ndarray], weights: Sequence[float],
+                    metric_types: Sequence[str], valid_list: Optional[List[np.ndarray]] = None, norm_score=True,
+                    top_k=None, offset=0, round_decimal=-1):
+    """
+    Reference WeightedRanker for all nq at once
+
+    Args:
+        ids_list: (nq, limit) id array of each AnnSearchRequest
+        scores_list: (nq, limit) distance array of each AnnSearchRequest
+        weights: weight of each request
+        metric_types: metric type of each request, used to normalize the distances
+        valid_list: (nq, limit) mask of the returned ids of each AnnSearchRequest, None if all are returned
+        norm_score: normalize the distances with the metric type activation function before weighting
+        top_k: limit of the hybrid search, None returns all merged ids
+        offset: offset of the hybrid search
+        round_decimal: round_decimal of the hybrid search
+
+    Returns:
+        Tuple[List[List[int]], List[List[float]]]: ids and scores of each query
+    """
+    ids_list = [np.asarray(ids) for ids in ids_list]
+    weighted = []
+    for scores, weight, metric_type in zip(scores_list, weights, metric_types):
+        scores = normalize_scores(scores, metric_type) if norm_score else np.asarray(scores, dtype=np.float64)
+        weighted.append(scores * weight)
+    return merge_scores(ids_list, weighted, valid_list=valid_list, top_k=top_k, offset=offset,
+                        round_decimal=round_decimal)
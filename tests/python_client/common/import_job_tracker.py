@@ -0,0 +1,254 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from utils.util_log import test_log as log
+
+MB = 1024 * 1024
+COMPLETED = "Completed"
+# REST job states and pymilvus BulkInsertState.state_name of the failed tasks
+FAILED_STATES = ("Failed", "Failed and cleaned")
+
+
+@dataclass
+class JobSnapshot:
+    ts: float
+    state: str
+    progress: float = 0.0
+    imported_rows: int = 0
+    total_rows: int = 0
+    file_size: int = 0
+    reason: str = ""
+
+    def same_progress(self, other: "JobSnapshot") -> bool:
+        return (self.state, self.progress, self.imported_rows) == (other.state, other.progress, other.imported_rows)
+
+
+def rest_progress_fetcher(import_job_client) -> Callable[[str], JobSnapshot]:
+    """
+    Fetcher of the RESTful v2 import jobs, import_job_client has a get_import_job_progress(job_id) method
+    returning the json response of /v2/vectordb/jobs/import/get_progress
+    """
+    def fetch(job_id):
+        rsp = import_job_client.get_import_job_progress(job_id)
+        if rsp.get("code", 0) != 0 or "data" not in rsp:
+            raise Exception(f"get progress of import job {job_id} failed: {rsp}")
+        data = rsp["data"]
+        return JobSnapshot(ts=time.time(), state=data.get("state", ""), progress=float(data.get("progress", 0)),
+                           imported_rows=int(data.get("importedRows", 0)), total_rows=int(data.get("totalRows", 0)),
+                           file_size=int(data.get("fileSize", 0)), reason=data.get("reason", ""))
+    return fetch
+
+
+def bulk_insert_state_fetcher(utility_wrap, timeout=None) -> Callable[[int], JobSnapshot]:
+    """Fetcher of the bulk insert tasks of pymilvus utility, utility_wrap is an ApiUtilityWrapper"""
+    def fetch(task_id):
+        state, succ = utility_wrap.get_bulk_insert_state(task_id=task_id, timeout=timeout)
+        if not succ:
+            raise Exception(f"get state of bulk insert task {task_id} failed: {state}")
+        return JobSnapshot(ts=time.time(), state=state.state_name, progress=float(state.progress),
+                           imported_rows=int(state.row_count), reason=state.failed_reason)
+    return fetch
+
+
+@dataclass
+class JobTimeline:
+    """Progress time series of one job, a snapshot is only kept when the state or the progress changes"""
+    job_id: object
+    start_ts: float
+    snapshots: List[JobSnapshot] = field(default_factory=list)
+    last: Optional[JobSnapshot] = None
+    end_ts: Optional[float] = None
+    poll_errors: int = 0
+
+    @property
+    def state(self) -> str:
+        return self.last.state if self.last is not None else ""
+
+    @property
+    def finished(self) -> bool:
+        return self.end_ts is not None
+
+    def add(self, snapshot: JobSnapshot, target_states: Sequence[str]) -> bool:
+        """record a snapshot, returns True if the job made progress since the last poll"""
+        changed = self.last is None or not snapshot.same_progress(self.last)
+        if changed:
+            self.snapshots.append(snapshot)
+        self.last = snapshot
+        if self.end_ts is None and (snapshot.state in target_states or snapshot.state in FAILED_STATES):
+            self.end_ts = snapshot.ts
+        return changed
+
+    def time_in_state(self) -> Dict[str, float]:
+        """seconds spent in every state, at the resolution of the polling interval"""
+        res = {}
+        end_ts = self.end_ts if self.end_ts is not None else (self.last.ts if self.last else self.start_ts)
+        for i, snapshot in enumerate(self.snapshots):
+            # the time before the first poll is counted in the first state seen
+            begin = self.start_ts if i == 0 else snapshot.ts
+            end = self.snapshots[i + 1].ts if i + 1 < len(self.snapshots) else end_ts
+            if end > begin:
+                res[snapshot.state] = res.get(snapshot.state, 0.0) + end - begin
+        return res
+
+    def metrics(self) -> Dict:
+        end_ts = self.end_ts if self.end_ts is not None else (self.last.ts if self.last else self.start_ts)
+        duration = max(end_ts - self.start_ts, 1e-9)
+        last = self.last or JobSnapshot(ts=self.start_ts, state="")
+        return {
+            "job_id": self.job_id,
+            "state": last.state,
+            "reason": last.reason,
+            "progress": last.progress,
+            "imported_rows": last.imported_rows,
+            "total_rows": last.total_rows,
+            "file_size": last.file_size,
+            "seconds": duration,
+            "rows_per_second": last.imported_rows / duration,
+            "mb_per_second": last.file_size / MB / duration,
+            "time_in_state": self.time_in_state(),
+            "poll_errors": self.poll_errors,
+        }
+
+
+class ImportJobTracker:
+    """
+    Track many import jobs at once.
+
+    Every round polls all the unfinished jobs concurrently, then sleeps an adaptive interval:
+    it restarts from min_interval when any job made progress and grows by `backoff` up to
+    max_interval while nothing changes, so finished jobs are seen quickly without hammering
+    the server during long imports. The snapshots of every job are kept as a time series,
+    from which the throughput (rows/s, MB/s) and the time spent in each state are computed.
+    """
+
+    def __init__(self, fetch_progress: Callable[[object], JobSnapshot], min_interval=0.5, max_interval=5.0,
+                 backoff=1.5, max_workers=16, target_states: Sequence[str] = (COMPLETED,)):
+        """
+        Args:
+            fetch_progress: fetch_progress(job_id) returns the JobSnapshot of a job,
+                see rest_progress_fetcher and bulk_insert_state_fetcher
+            min_interval: Polling interval in seconds after a round with progress
+            max_interval: Max polling interval in seconds
+            backoff: Growth factor of the interval after a round without progress
+            max_workers: Max number of jobs polled at the same time
+            target_states: States of a successfully finished job
+        """
+        self.fetch_progress = fetch_progress
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self.target_states = tuple(target_states)
+        self.timelines: Dict[object, JobTimeline] = {}
+
+    def track(self, job_ids: Iterable, start_ts=None):
+        """start tracking jobs, start_ts is the time the jobs were created, default to now"""
+        start_ts = time.time() if start_ts is None else start_ts
+        for job_id in job_ids:
+            if job_id not in self.timelines:
+                self.timelines[job_id] = JobTimeline(job_id, start_ts)
+
+    def _poll(self, job_id):
+        try:
+            return job_id, self.fetch_progress(job_id)
+        except Exception as e:
+            log.warning(f"poll import job {job_id} failed: {e}")
+            return job_id, None
+
+    def poll_once(self, job_ids: Optional[Iterable] = None) -> bool:
+        """
+        Poll the unfinished jobs concurrently
+
+        Returns:
+            bool: True if any job made progress
+        """
+        job_ids = list(self.timelines) if job_ids is None else list(job_ids)
+        self.track(job_ids)
+        pending = [job_id for job_id in job_ids if not self.timelines[job_id].finished]
+        if not pending:
+            return False
+        progressed = False
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pending)))) as executor:
+            for job_id, snapshot in executor.map(self._poll, pending):
+                timeline = self.timelines[job_id]
+                if snapshot is None:
+                    timeline.poll_errors += 1
+                    continue
+                progressed |= timeline.add(snapshot, self.target_states)
+        return progressed
+
+    def wait(self, job_ids: Optional[Iterable] = None, timeout=1800) -> bool:
+        """
+        Poll until all the jobs are finished or timeout
+
+        Returns:
+            bool: True if all the jobs reached one of the target states
+        """
+        job_ids = list(self.timelines) if job_ids is None else list(job_ids)
+        self.track(job_ids)
+        t0 = time.time()
+        interval = self.min_interval
+        while True:
+            progressed = self.poll_once(job_ids)
+            if all(self.timelines[job_id].finished for job_id in job_ids):
+                break
+            remaining = timeout - (time.time() - t0)
+            if remaining <= 0:
+                log.info(f"wait import jobs timeout after {timeout}s, unfinished: "
+                         f"{[job_id for job_id in job_ids if not self.timelines[job_id].finished]}")
+                break
+            interval = self.min_interval if progressed else min(interval * self.backoff, self.max_interval)
+            time.sleep(min(interval, remaining))
+        return all(self.timelines[job_id].state in self.target_states for job_id in job_ids)
+
+    def states(self, job_ids: Optional[Iterable] = None) -> Dict:
+        job_ids = list(self.timelines) if job_ids is None else job_ids
+        return {job_id: self.timelines[job_id].state for job_id in job_ids}
+
+    def metrics(self, job_ids: Optional[Iterable] = None) -> List[Dict]:
+        job_ids = list(self.timelines) if job_ids is None else job_ids
+        return [self.timelines[job_id].metrics() for job_id in job_ids]
+
+    def summary(self, job_ids: Optional[Iterable] = None) -> Dict:
+        """
+        Aggregated throughput of the jobs, from the earliest start to the latest end
+
+        Returns:
+            Dict: jobs, succeeded, failed, rows, bytes, seconds, rows_per_second, mb_per_second, time_in_state
+        """
+        job_ids = list(self.timelines) if job_ids is None else list(job_ids)
+        timelines = [self.timelines[job_id] for job_id in job_ids]
+        metrics = [t.metrics() for t in timelines]
+        if not timelines:
+            return {}
+        start = min(t.start_ts for t in timelines)
+        end = max(t.start_ts + m["seconds"] for t, m in zip(timelines, metrics))
+        seconds = max(end - start, 1e-9)
+        rows = sum(m["imported_rows"] for m in metrics)
+        size = sum(m["file_size"] for m in metrics)
+        time_in_state = {}
+        for m in metrics:
+            for state, tt in m["time_in_state"].items():
+                time_in_state[state] = time_in_state.get(state, 0.0) + tt
+        return {
+            "jobs": len(timelines),
+            "succeeded": sum(1 for t in timelines if t.state in self.target_states),
+            "failed": sum(1 for t in timelines if t.state in FAILED_STATES),
+            "rows": rows,
+            "bytes": size,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds,
+            "mb_per_second": size / MB / seconds,
+            "time_in_state": time_in_state,
+        }
+
+    def log_summary(self, job_ids: Optional[Iterable] = None) -> Dict:
+        summary = self.summary(job_ids)
+        if summary:
+            log.info(f"import {summary['jobs']} jobs ({summary['succeeded']} succeeded, {summary['failed']} failed): "
+                     f"{summary['rows']} rows, {summary['bytes'] / MB:.2f} MB in {summary['seconds']:.2f} s, "
+                     f"{summary['rows_per_second']:.2f} rows/s, {summary['mb_per_second']:.2f} MB/s, "
+                     f"time in state: { {k: round(v, 2) for k, v in summary['time_in_state'].items()} }")
+        return summary
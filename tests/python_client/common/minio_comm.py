@@ -1,10 +1,138 @@
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+import urllib3
 from minio import Minio
 from minio.error import S3Error
 from utils.util_log import test_log as log
 
+MB = 1024 * 1024
+# parts of 64MB keep the number of parts of a 10GB file around 160, the minimum part size of s3 is 5MB
+DEFAULT_PART_SIZE = 64 * MB
+
+
+def gen_minio_client(host, access_key="minioadmin", secret_key="minioadmin", secure=False, max_connections=10):
+    """
+    Minio client with a connection pool large enough for concurrent uploads,
+    the default pool of the minio client keeps only 10 connections per host
+    """
+    http_client = urllib3.PoolManager(
+        timeout=urllib3.Timeout(connect=300, read=300),
+        maxsize=max_connections,
+        retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
+    return Minio(host, access_key=access_key, secret_key=secret_key, secure=secure, http_client=http_client)
+
+
+def local_etag(file_path, part_size=DEFAULT_PART_SIZE):
+    """
+    ETag s3 computes for the file: md5 of the content for a single part upload, otherwise
+    md5 of the concatenated part md5s suffixed with the number of parts
+    """
+    size = os.path.getsize(file_path)
+    part_md5s = []
+    with open(file_path, "rb") as f:
+        while True:
+            data = f.read(part_size)
+            if not data:
+                break
+            part_md5s.append(hashlib.md5(data).digest())
+    if size <= part_size:
+        return part_md5s[0].hex() if part_md5s else hashlib.md5(b"").hexdigest()
+    return f"{hashlib.md5(b''.join(part_md5s)).hexdigest()}-{len(part_md5s)}"
+
+
+@dataclass
+class UploadResult:
+    object_name: str
+    size: int
+    seconds: float
+    skipped: bool = False
+
+
+class MinioUploader:
+    """
+    Upload local files to a bucket concurrently.
+
+    Files are uploaded by a thread pool, each file with multipart uploads of part_size, and a file is
+    skipped when the bucket already has an object of the same size and ETag, so staging the same
+    dataset again only costs the stat calls. Throughput of every batch is logged.
+    """
 
-def copy_files_to_bucket(client, r_source, target_files, bucket_name, force=False):
+    def __init__(self, client: Minio, bucket_name, max_workers=8, part_size=DEFAULT_PART_SIZE,
+                 num_parallel_uploads=3, check_etag=True):
+        """
+        Args:
+            client: Minio client, see gen_minio_client to size its connection pool
+            bucket_name: Target bucket
+            max_workers: Number of files uploaded at the same time
+            part_size: Multipart part size in bytes
+            num_parallel_uploads: Number of parts of one file uploaded at the same time
+            check_etag: Compare the ETag besides the size before skipping an existing object
+        """
+        self.client = client
+        self.bucket_name = bucket_name
+        self.max_workers = max_workers
+        self.part_size = part_size
+        self.num_parallel_uploads = num_parallel_uploads
+        self.check_etag = check_etag
+        self.uploaded_bytes = 0
+        self.upload_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def is_identical(self, file_path, object_name) -> bool:
+        try:
+            stat = self.client.stat_object(self.bucket_name, object_name)
+        except S3Error:
+            return False
+        if stat.size != os.path.getsize(file_path):
+            return False
+        if not self.check_etag:
+            return True
+        return (stat.etag or "").strip('"') == local_etag(file_path, self.part_size)
+
+    def upload_file(self, file_path, object_name, force=False) -> UploadResult:
+        size = os.path.getsize(file_path)
+        if not force and self.is_identical(file_path, object_name):
+            log.info(f"skip copy {object_name} to minio, identical object exists")
+            return UploadResult(object_name, size, 0.0, skipped=True)
+        t0 = time.time()
+        self.client.fput_object(self.bucket_name, object_name, file_path, part_size=self.part_size,
+                                num_parallel_uploads=self.num_parallel_uploads)
+        tt = time.time() - t0
+        with self._lock:
+            self.uploaded_bytes += size
+            self.upload_seconds += tt
+        log.info(f"copied {object_name} to minio, size: {size / MB:.2f} MB, cost {tt:.2f} s")
+        return UploadResult(object_name, size, tt)
+
+    def upload_files(self, files: Sequence[Tuple[str, str]], force=False) -> List[UploadResult]:
+        """
+        Upload (file_path, object_name) pairs, results keep the input order
+
+        Returns:
+            List[UploadResult]: result of every file
+        """
+        t0 = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(files)))) as executor:
+            futures = [executor.submit(self.upload_file, file_path, object_name, force)
+                       for file_path, object_name in files]
+            results = [f.result() for f in futures]
+        tt = time.time() - t0
+        uploaded = sum(r.size for r in results if not r.skipped)
+        skipped = sum(1 for r in results if r.skipped)
+        log.info(f"uploaded {len(results) - skipped} files ({uploaded / MB:.2f} MB), skipped {skipped} files "
+                 f"in {tt:.2f} s, throughput {uploaded / MB / max(tt, 1e-9):.2f} MB/s")
+        return results
+
+
+def copy_files_to_bucket(client, r_source, target_files, bucket_name, force=False, max_workers=8,
+                         part_size=DEFAULT_PART_SIZE):
     # check the bucket exist
     found = client.bucket_exists(bucket_name)
     if not found:
@@ -12,32 +140,20 @@ def copy_files_to_bucket(client, r_source, target_files, bucket_name, force=Fals
         return
 
     # copy target files from root source folder
-    os.chdir(r_source)
-    for target_file in target_files:
-        found = False
-        try:
-            result = client.stat_object(bucket_name, target_file)
-            found = True
-        except S3Error as exc:
-            pass
-
-        if force or not found:
-            res = client.fput_object(bucket_name, target_file, f"{r_source}/{target_file}")
-            log.info(f"copied {res.object_name} to minio")
-        else:
-            log.info(f"skip copy {target_file} to minio")
+    uploader = MinioUploader(client, bucket_name, max_workers=max_workers, part_size=part_size)
+    return uploader.upload_files([(os.path.join(r_source, f), f) for f in target_files], force=force)
 
 
 def copy_files_to_minio(host, r_source, files, bucket_name, access_key="minioadmin", secret_key="minioadmin",
-                        secure=False, force=False):
-    client = Minio(
-        host,
-        access_key=access_key,
-        secret_key=secret_key,
-        secure=secure,
-    )
+                        secure=False, force=False, max_workers=8, part_size=DEFAULT_PART_SIZE):
+    """
+    copy the files of r_source to the bucket concurrently by a MinioUploader, generate all the files
+    first and copy them in one call, so they share the thread pool and the connection pool
+    """
+    client = gen_minio_client(host, access_key=access_key, secret_key=secret_key, secure=secure,
+                              max_connections=max_workers * 3)
     try:
-        copy_files_to_bucket(client, r_source=r_source, target_files=files, bucket_name=bucket_name, force=force)
+        return copy_files_to_bucket(client, r_source=r_source, target_files=files, bucket_name=bucket_name,
+                                    force=force, max_workers=max_workers, part_size=part_size)
     except S3Error as exc:
-        log.error("fail to copy files to minio", exc)
-
+        log.error(f"fail to copy files to minio: {exc}")
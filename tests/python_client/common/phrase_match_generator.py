@@ -6,6 +6,8 @@ from typing import List, Dict
 import numpy as np
 import random
 
+from common.text_match_oracle import TextMatchOracle
+
 
 class PhraseMatchTestGenerator:
     def __init__(self, language="en"):
@@ -17,6 +19,7 @@ class PhraseMatchTestGenerator:
         """
         self.language = language
         self.index = None
+        self.oracle = None
         self.documents = []
 
         # English vocabulary
@@ -240,6 +243,9 @@ class PhraseMatchTestGenerator:
         writer.commit()
         self.index.reload()
 
+        # in-process positional index, answers many phrase queries without a tantivy search each
+        self.oracle = TextMatchOracle.from_rows(self.documents, ["text"], tokenize_func=self.tokenize_text)
+
         return self.documents
 
     def _generate_random_word(self, exclude_words: List[str]) -> str:
@@ -336,13 +342,14 @@ class PhraseMatchTestGenerator:
 
         return queries
 
-    def get_query_results(self, query: str, slop: int) -> List[Dict]:
+    def get_query_results(self, query: str, slop: int, use_oracle: bool = False) -> List[Dict]:
         """
         Get all documents that match the phrase query
 
         Args:
             query: Query phrase
             slop: Maximum allowed word gap
+            use_oracle: Answer with the positional inverted index instead of a Tantivy search
 
         Returns:
             List[Dict]: List of matching documents with their ids and texts
@@ -350,6 +357,9 @@ class PhraseMatchTestGenerator:
         if self.index is None:
             raise RuntimeError("No documents indexed. Call generate_test_data first.")
 
+        if use_oracle:
+            return sorted(self.oracle.phrase_match("text", query, slop))
+
         # Clean and normalize query
         query_terms = self.tokenize_text(query)
 
@@ -0,0 +1,139 @@
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+from faker import Faker
+
+LANGUAGE_LOCALES = {
+    "en": "en_US",
+    "zh": "zh_CN",
+    "jp": "ja_JP",
+    "fr": "fr_FR",
+    "de": "de_DE",
+}
+
+
+def build_vocabulary(language="en", vocab_size=None) -> List[str]:
+    """
+    Build a vocabulary from the Faker word list of the language,
+    extended with unique two-word compounds when vocab_size is larger than the word list
+    """
+    words = list(dict.fromkeys(w.lower() for w in Faker(LANGUAGE_LOCALES.get(language, language)).get_words_list()))
+    if vocab_size is None or vocab_size <= len(words):
+        return words if vocab_size is None else words[:vocab_size]
+    seen = set(words)
+    for word in (a + b for a in list(words) for b in list(words)):
+        if len(words) >= vocab_size:
+            break
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+class TextCorpus:
+    """
+    Generated corpus kept as a flat word id array plus document offsets,
+    strings are only materialized when texts is read.
+    """
+
+    def __init__(self, vocabulary: np.ndarray, word_ids: np.ndarray, offsets: np.ndarray, separator=" "):
+        self.vocabulary = vocabulary
+        self.word_ids = word_ids
+        self.offsets = offsets
+        self.separator = separator
+        self._texts = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def texts(self) -> List[str]:
+        if self._texts is None:
+            words = self.vocabulary[self.word_ids].tolist()
+            offsets = self.offsets.tolist()
+            sep = self.separator
+            self._texts = [sep.join(words[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+        return self._texts
+
+    def term_frequency(self) -> Counter:
+        """Exact number of occurrences of every word in the corpus, same as common_func.analyze_documents"""
+        counts = np.bincount(self.word_ids, minlength=len(self.vocabulary))
+        nonzero = np.flatnonzero(counts)
+        return Counter(dict(zip(self.vocabulary[nonzero].tolist(), counts[nonzero].tolist())))
+
+    def document_frequency(self) -> Counter:
+        """Exact number of documents containing every word"""
+        doc_of_word = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        pairs = np.unique(doc_of_word.astype(np.int64) * len(self.vocabulary) + self.word_ids)
+        counts = np.bincount(pairs % len(self.vocabulary), minlength=len(self.vocabulary))
+        nonzero = np.flatnonzero(counts)
+        return Counter(dict(zip(self.vocabulary[nonzero].tolist(), counts[nonzero].tolist())))
+
+
+class ZipfTextCorpusGenerator:
+    """
+    Text corpus generator sampling word ids from a Zipf distribution over a per-language vocabulary.
+
+    Documents are generated as NumPy arrays in one pass instead of one Faker call per document,
+    target words can be injected into a controlled fraction of the documents, and the exact
+    term frequency of the generated corpus is known without tokenizing it again.
+    The statistics match the server tokens for whitespace separated lowercase words
+    (standard/whitespace analyzers), compound words of languages like Chinese may be split
+    differently by the jieba analyzer.
+    """
+
+    def __init__(self, language="en", vocab_size=None, zipf_a=1.1, min_words=10, max_words=100,
+                 target_words: Optional[Dict[str, float]] = None, separator=" ", seed=None):
+        """
+        Args:
+            language: Language of the vocabulary, 'en', 'zh', 'jp', 'fr', 'de' or a Faker locale
+            vocab_size: Size of the vocabulary, default to the Faker word list of the language
+            zipf_a: Exponent of the Zipf distribution, the word of rank r has probability ~ 1 / r ** zipf_a
+            min_words: Minimum number of words of a document
+            max_words: Maximum number of words of a document
+            target_words: word -> probability (0-1) that a document contains the word,
+                same meaning as common_func.en_vocabularies_distribution
+            separator: Separator used to join the words of a document
+            seed: Seed of the random generator
+        """
+        self.language = language
+        self.min_words = min_words
+        self.max_words = max_words
+        self.separator = separator
+        self.target_words = dict(target_words or {})
+        self.rng = np.random.default_rng(seed)
+        words = build_vocabulary(language, vocab_size)
+        for word in self.target_words:
+            if word not in words:
+                words.append(word)
+        self.vocabulary = np.array(words, dtype=object)
+        self.word_to_id = {w: i for i, w in enumerate(words)}
+        # target words only appear where they are injected
+        sampled = [i for i, w in enumerate(words) if w not in self.target_words]
+        ranks = np.arange(1, len(sampled) + 1, dtype=np.float64)
+        weights = 1.0 / ranks ** zipf_a
+        self.sampled_ids = np.array(self.rng.permutation(sampled), dtype=np.int32)
+        self.cdf = np.cumsum(weights / weights.sum())
+
+    def generate(self, nb: int) -> TextCorpus:
+        """
+        Generate nb documents
+
+        Returns:
+            TextCorpus: generated corpus, read .texts for the strings
+        """
+        lengths = self.rng.integers(self.min_words, self.max_words + 1, size=nb)
+        offsets = np.zeros(nb + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        ranks = np.searchsorted(self.cdf, self.rng.random(int(offsets[-1])), side="right")
+        word_ids = self.sampled_ids[np.minimum(ranks, len(self.sampled_ids) - 1)]
+        for word, probability in self.target_words.items():
+            docs = np.flatnonzero((self.rng.random(nb) < probability) & (lengths > 0))
+            # put the target word at a random position of the selected documents
+            positions = offsets[docs] + (self.rng.random(len(docs)) * lengths[docs]).astype(np.int64)
+            word_ids[positions] = self.word_to_id[word]
+        return TextCorpus(self.vocabulary, word_ids, offsets, separator=self.separator)
+
+    def texts(self, nb: int) -> List[str]:
+        return self.generate(nb).texts
@@ -0,0 +1,175 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+from utils.util_log import test_log as log
+
+
+class TextMatchOracle:
+    """
+    Positional inverted index used as the ground truth of TEXT_MATCH and PHRASE_MATCH.
+
+    Every document is tokenized once when it is indexed, queries are answered by posting list
+    lookups and intersections, so thousands of random text/phrase match expressions can be
+    verified without scanning the corpus again.
+
+    The query format is the one produced by common_func.generate_random_query_from_freq_dict:
+        [{"field": "text", "value": "milvus"}, "and", {"not": {"field": "word", "value": "hello"}}, ...]
+    """
+
+    def __init__(self, tokenize_func: Optional[Callable[[str], List[str]]] = None, language="en"):
+        """
+        Args:
+            tokenize_func: Tokenizer applied to documents and query values, it should behave like the
+                analyzer of the field, e.g. PhraseMatchTestGenerator.tokenize_text.
+                Default to common_func.custom_tokenizer(language), the tokenizer used by split_dataframes
+            language: Language of the default tokenizer
+        """
+        if tokenize_func is None:
+            from common.common_func import custom_tokenizer
+            tokenizer = custom_tokenizer(language)
+
+            def tokenize_func(text):
+                return tokenizer.tokenize([text], update_vocab=True, return_as="string", show_progress=False)[0]
+        self.tokenize_func = tokenize_func
+        self.language = language
+        self.ids: List = []
+        self.id_to_row: Dict = {}
+        # field -> token -> {row: positions}
+        self.postings: Dict[str, Dict[str, Dict[int, List[int]]]] = {}
+        self._posting_rows_cache: Dict = {}
+
+    @classmethod
+    def from_dataframe(cls, df, fields: Sequence[str], pk_field="id", **kwargs):
+        """Build the index over the given text fields of a dataframe"""
+        oracle = cls(**kwargs)
+        oracle.add_documents(df[pk_field].tolist(), {field: df[field].tolist() for field in fields})
+        return oracle
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict], fields: Sequence[str], pk_field="id", **kwargs):
+        """Build the index over the given text fields of a list of row dicts"""
+        oracle = cls(**kwargs)
+        oracle.add_documents([row[pk_field] for row in rows],
+                             {field: [row.get(field) for row in rows] for field in fields})
+        return oracle
+
+    @property
+    def all_ids(self) -> Set:
+        return set(self.ids)
+
+    def add_documents(self, ids: Sequence, field_texts: Dict[str, Sequence[str]]):
+        """
+        Tokenize and index documents
+
+        Args:
+            ids: Primary keys of the documents
+            field_texts: field name -> texts, aligned with ids, None texts are not indexed
+        """
+        start = len(self.ids)
+        for pk in ids:
+            self.id_to_row[pk] = len(self.ids)
+            self.ids.append(pk)
+        for field, texts in field_texts.items():
+            field_postings = self.postings.setdefault(field, {})
+            for offset, text in enumerate(texts):
+                if not isinstance(text, str):
+                    continue
+                row = start + offset
+                for position, token in enumerate(self.tokenize_func(text)):
+                    field_postings.setdefault(token, {}).setdefault(row, []).append(position)
+        self._posting_rows_cache = {}
+        log.debug(f"TextMatchOracle indexed {len(ids)} docs for fields {list(field_texts)}")
+
+    def _posting_rows(self, field: str, token: str) -> np.ndarray:
+        key = (field, token)
+        rows = self._posting_rows_cache.get(key)
+        if rows is None:
+            rows = np.fromiter(self.postings.get(field, {}).get(token, {}).keys(), dtype=np.int64)
+            rows.sort()
+            self._posting_rows_cache[key] = rows
+        return rows
+
+    def _to_ids(self, rows: Iterable[int]) -> Set:
+        return {self.ids[row] for row in rows}
+
+    def term_match(self, field: str, value: str) -> Set:
+        """
+        Ids matching TEXT_MATCH(field, value), a document matches if it contains any token of value
+        """
+        tokens = set(self.tokenize_func(value))
+        if not tokens:
+            return set()
+        rows = np.unique(np.concatenate([self._posting_rows(field, token) for token in tokens]))
+        return self._to_ids(rows)
+
+    def all_terms_match(self, field: str, tokens: Sequence[str]) -> Set:
+        """Ids of the documents containing all the tokens, intersecting the shortest posting list first"""
+        postings = sorted((self._posting_rows(field, token) for token in set(tokens)), key=len)
+        if not postings:
+            return set()
+        rows = postings[0]
+        for posting in postings[1:]:
+            if len(rows) == 0:
+                break
+            rows = np.intersect1d(rows, posting, assume_unique=True)
+        return self._to_ids(rows)
+
+    def phrase_match(self, field: str, phrase: str, slop: int = 0) -> Set:
+        """
+        Ids matching PHRASE_MATCH(field, phrase, slop)
+
+        With positions shifted by the token offset in the phrase (p - i), two consecutive phrase
+        tokens match if their shifted positions differ by at most `slop`, so a slop of 2 also
+        allows two adjacent tokens to be swapped, like the tantivy phrase query.
+        This is exactly the tantivy result for two-token phrases. For longer phrases with slop > 0,
+        tantivy walks the posting lists in doc frequency order, so its result may depend on the
+        segment layout, and this oracle gives the order independent result.
+        """
+        tokens = self.tokenize_func(phrase)
+        if not tokens:
+            return set()
+        field_postings = self.postings.get(field, {})
+        candidates = self.all_terms_match(field, tokens)
+        matched = set()
+        for pk in candidates:
+            row = self.id_to_row[pk]
+            prev_positions = np.asarray(field_postings[tokens[0]][row])
+            for offset, token in enumerate(tokens[1:], start=1):
+                positions = np.asarray(field_postings[token][row])
+                # (len(positions) x len(prev_positions)) window check on the shifted positions
+                shifted_diff = (positions[:, None] - offset) - (prev_positions[None, :] - offset + 1)
+                window = (np.abs(shifted_diff) <= slop) & (positions[:, None] != prev_positions[None, :])
+                prev_positions = positions[window.any(axis=1)]
+                if len(prev_positions) == 0:
+                    break
+            if len(prev_positions) > 0:
+                matched.add(pk)
+        return matched
+
+    def evaluate_term(self, node) -> Set:
+        if "not" in node:
+            return self.all_ids - self.evaluate_term(node["not"])
+        return self.term_match(node["field"], node["value"])
+
+    def evaluate(self, query: List) -> Set:
+        """
+        Evaluate a query list of terms and "and"/"or" operators, "and" binds tighter than "or"
+
+        Returns:
+            Set: ids matching the whole expression
+        """
+        result = set()
+        conjunction = None
+        for item in query:
+            if isinstance(item, dict):
+                ids = self.evaluate_term(item)
+                conjunction = ids if conjunction is None else conjunction & ids
+            elif item == "or":
+                result |= conjunction if conjunction is not None else set()
+                conjunction = None
+            elif item != "and":
+                raise ValueError(f"Invalid query item: {item}")
+        if conjunction is not None:
+            result |= conjunction
+        return result
@@ -56,6 +56,9 @@ def pytest_addoption(parser):
 
     parser.addoption("--tei_reranker_endpoint", action="store", default="http://text-rerank-service.milvus-ci.svc.cluster.local:80", help="tei rerank endpoint")
     parser.addoption("--vllm_reranker_endpoint", action="store", default="http://vllm-rerank-service.milvus-ci.svc.cluster.local:80", help="vllm rerank endpoint")
+    parser.addoption("--dataset_cache_size", action="store", default=50, help="max size in GB of the bulk insert dataset cache")
+    parser.addoption("--warm_datasets", action="store", default="", help="json file of the bulk insert datasets to pre-generate")
+    parser.addoption("--warm_workers", action="store", default=4, help="number of processes pre-generating the datasets")
 
 @pytest.fixture
 def host(request):
@@ -256,6 +259,19 @@ def initialize_env(request):
     param_info.prepare_param_info(host, port, handler, replica_num, user, password, secure, uri, token, minio_bucket)
 
 
+@pytest.fixture(scope="session")
+def dataset_cache(request):
+    """ bulk insert dataset cache shared by the session, the datasets of --warm_datasets are generated in parallel first """
+    from common.bulk_insert_writer import GB
+    from common.dataset_cache import DatasetCache, load_datasets
+    cache = DatasetCache(max_size=float(request.config.getoption("--dataset_cache_size")) * GB)
+    warm_datasets = request.config.getoption("--warm_datasets")
+    if warm_datasets:
+        cache.warm(load_datasets(warm_datasets), num_workers=int(request.config.getoption("--warm_workers")))
+    yield cache
+    log.info(f"[dataset_cache] {cache.summary()}")
+
+
 # TODO: construct invalid index params for all index types
 @pytest.fixture(params=[{"metric_type": "L3", "index_type": "IVF_FLAT"},
                         {"metric_type": "L2", "index_type": "IVF_FLAT", "params": {"nlist": -1}}])
@@ -10,6 +10,7 @@ from utils.util_pymilvus import *
 from common.common_type import CaseLabel, CheckTasks
 from common import common_type as ct
 from common import common_func as cf
+from common import hybrid_search_ranker as hybrid_ranker
 from utils.util_log import test_log as log
 from base.client_base import TestcaseBase
 import heapq
@@ -166,8 +167,6 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         req_list = []
         weights = [0.2, 0.3, 0.5]
         metrics = []
-        search_res_dict_array = []
-        search_res_dict_array_nq = []
         vectors = cf.gen_vectors(nq, dim, vector_data_type)
 
         # get hybrid search req list
@@ -184,32 +183,23 @@ class TestCollectionHybridSearchValid(TestcaseBase):
 
         # get the result of search with the same params of the following hybrid search
         single_search_param = {"metric_type": "COSINE", "params": {"nprobe": 32}, "offset": offset}
-        for k in range(nq):
-            for i in range(len(vector_name_list)):
-                search_res_dict = {}
-                search_res_dict_array = []
-                vectors_search = vectors[k]
-                # 5. search to get the baseline of hybrid_search
-                search_res = collection_w.search([vectors_search], vector_name_list[i],
-                                                 single_search_param, default_limit,
-                                                 default_search_exp,
-                                                 check_task=CheckTasks.check_search_results,
-                                                 check_items={"nq": 1,
-                                                              "ids": insert_ids,
-                                                              "pk_name": ct.default_int64_field_name,
-                                                              "limit": default_limit})[0]
-                ids = search_res[0].ids
-                distance_array = search_res[0].distances
-                for j in range(len(ids)):
-                    search_res_dict[ids[j]] = distance_array[j]
-                search_res_dict_array.append(search_res_dict)
-            search_res_dict_array_nq.append(search_res_dict_array)
-
-        # 6. calculate hybrid search baseline
-        score_answer_nq = []
-        for k in range(nq):
-            ids_answer, score_answer = cf.get_hybrid_search_base_results(search_res_dict_array_nq[k], weights, metrics)
-            score_answer_nq.append(score_answer)
+        # 5. search every vector field with all the nq vectors to get the baseline of hybrid_search
+        search_res_arrays = []
+        for i in range(len(vector_name_list)):
+            search_res = collection_w.search(vectors, vector_name_list[i],
+                                             single_search_param, default_limit,
+                                             default_search_exp,
+                                             check_task=CheckTasks.check_search_results,
+                                             check_items={"nq": nq,
+                                                          "ids": insert_ids,
+                                                          "pk_name": ct.default_int64_field_name,
+                                                          "limit": default_limit})[0]
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
+        ids_list, scores_list, valid_list = zip(*search_res_arrays)
+
+        # 6. calculate hybrid search baseline of all nq at once
+        _, score_answer_nq = hybrid_ranker.weighted_fusion(ids_list, scores_list, weights, metrics,
+                                                           valid_list=valid_list)
         # 7. hybrid search
         hybrid_res = collection_w.hybrid_search(req_list, WeightedRanker(*weights), default_limit,
                                                 offset=offset,
@@ -1132,10 +1122,9 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         vector_name_list.append(ct.default_float_vec_field_name)
         # 3. prepare search params for each vector field
         req_list = []
-        search_res_dict_array = []
+        search_res_arrays = []
         for i in range(len(vector_name_list)):
             vectors = [[random.random() for _ in range(default_dim)] for _ in range(1)]
-            search_res_dict = {}
             search_param = {
                 "data": vectors,
                 "anns_field": vector_name_list[i],
@@ -1153,12 +1142,11 @@ class TestCollectionHybridSearchValid(TestcaseBase):
                                                           "ids": insert_ids,
                                                           "limit": default_limit,
                                                           "pk_name": ct.default_int64_field_name})[0]
-            ids = search_res[0].ids
-            for j in range(len(ids)):
-                search_res_dict[ids[j]] = 1 / (j + 60 + 1)
-            search_res_dict_array.append(search_res_dict)
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
         # 4. calculate hybrid search base line for RRFRanker
-        ids_answer, score_answer = cf.get_hybrid_search_base_results_rrf(search_res_dict_array)
+        ids_list, _, valid_list = zip(*search_res_arrays)
+        ids_answer, score_answer = hybrid_ranker.rrf_fusion(ids_list, valid_list=valid_list, k=60)
+        ids_answer, score_answer = ids_answer[0], score_answer[0]
         # 5. hybrid search
         hybrid_search_0 = collection_w.hybrid_search(req_list, RRFRanker(), default_limit,
                                                      check_task=CheckTasks.check_search_results,
@@ -1203,10 +1191,9 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         vector_name_list.append(ct.default_float_vec_field_name)
         # 3. prepare search params for each vector field
         req_list = []
-        search_res_dict_array = []
+        search_res_arrays = []
         for i in range(len(vector_name_list)):
             vectors = [[random.random() for _ in range(dim)] for _ in range(1)]
-            search_res_dict = {}
             search_param = {
                 "data": vectors,
                 "anns_field": vector_name_list[i],
@@ -1224,12 +1211,11 @@ class TestCollectionHybridSearchValid(TestcaseBase):
                                                           "ids": insert_ids,
                                                           "limit": default_limit,
                                                           "pk_name": ct.default_int64_field_name})[0]
-            ids = search_res[0].ids
-            for j in range(len(ids)):
-                search_res_dict[ids[j]] = 1 / (j + k + 1)
-            search_res_dict_array.append(search_res_dict)
-        # 4. calculate hybrid search baseline for RRFRanker
-        ids_answer, score_answer = cf.get_hybrid_search_base_results_rrf(search_res_dict_array)
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
+        # 4. calculate hybrid search base line for RRFRanker
+        ids_list, _, valid_list = zip(*search_res_arrays)
+        ids_answer, score_answer = hybrid_ranker.rrf_fusion(ids_list, valid_list=valid_list, k=k)
+        ids_answer, score_answer = ids_answer[0], score_answer[0]
         # 5. hybrid search
         hybrid_res = collection_w.hybrid_search(req_list, RRFRanker(k), default_limit,
                                                 offset=offset,
@@ -1345,10 +1331,9 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         vector_name_list.append(ct.default_float_vec_field_name)
         # 3. prepare search params for each vector field
         req_list = []
-        search_res_dict_array = []
+        search_res_arrays = []
         for i in range(len(vector_name_list)):
             vectors = [[random.random() for _ in range(default_dim)] for _ in range(1)]
-            search_res_dict = {}
             search_param = {
                 "data": vectors,
                 "anns_field": vector_name_list[i],
@@ -1366,12 +1351,11 @@ class TestCollectionHybridSearchValid(TestcaseBase):
                                                           "ids": insert_ids,
                                                           "limit": default_limit,
                                                           "pk_name": ct.default_int64_field_name})[0]
-            ids = search_res[0].ids
-            for j in range(len(ids)):
-                search_res_dict[ids[j]] = 1 / (j + k + 1)
-            search_res_dict_array.append(search_res_dict)
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
         # 4. calculate hybrid search base line for RRFRanker
-        ids_answer, score_answer = cf.get_hybrid_search_base_results_rrf(search_res_dict_array)
+        ids_list, _, valid_list = zip(*search_res_arrays)
+        ids_answer, score_answer = hybrid_ranker.rrf_fusion(ids_list, valid_list=valid_list, k=k)
+        ids_answer, score_answer = ids_answer[0], score_answer[0]
         # 5. hybrid search
         hybrid_res = collection_w.hybrid_search(req_list, RRFRanker(k), default_limit,
                                                 check_task=CheckTasks.check_search_results,
@@ -1403,13 +1387,12 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         # 3. prepare search params
         req_list = []
         weights = [0.2, 0.3, 0.5]
-        search_res_dict_array = []
+        search_res_arrays = []
         if limit > default_nb:
             limit = default_limit
         metrics = []
         for i in range(len(vector_name_list)):
             vectors = [[random.random() for _ in range(default_dim)] for _ in range(1)]
-            search_res_dict = {}
             search_param = {
                 "data": vectors,
                 "anns_field": vector_name_list[i],
@@ -1428,13 +1411,12 @@ class TestCollectionHybridSearchValid(TestcaseBase):
                                                           "ids": insert_ids,
                                                           "limit": limit,
                                                           "pk_name": ct.default_int64_field_name})[0]
-            ids = search_res[0].ids
-            distance_array = search_res[0].distances
-            for j in range(len(ids)):
-                search_res_dict[ids[j]] = distance_array[j]
-            search_res_dict_array.append(search_res_dict)
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
         # 4. calculate hybrid search base line
-        ids_answer, score_answer = cf.get_hybrid_search_base_results(search_res_dict_array, weights, metrics, 5)
+        ids_list, scores_list, valid_list = zip(*search_res_arrays)
+        ids_answer, score_answer = hybrid_ranker.weighted_fusion(ids_list, scores_list, weights, metrics,
+                                                                 valid_list=valid_list, round_decimal=5)
+        ids_answer, score_answer = ids_answer[0], score_answer[0]
         # 5. hybrid search
         hybrid_res = collection_w.hybrid_search(req_list, WeightedRanker(*weights), limit,
                                                 round_decimal=5,
@@ -1545,8 +1527,6 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         req_list = []
         weights = [0.2, 0.3, 0.5]
         metrics = []
-        search_res_dict_array = []
-        search_res_dict_array_nq = []
         vectors = cf.gen_vectors(nq, dim, vector_data_type)
 
         # get hybrid search req list
@@ -1563,32 +1543,23 @@ class TestCollectionHybridSearchValid(TestcaseBase):
 
         # get the result of search with the same params of the following hybrid search
         single_search_param = {"metric_type": "COSINE", "params": {"nprobe": 10}}
-        for k in range(nq):
-            for i in range(len(vector_name_list)):
-                search_res_dict = {}
-                search_res_dict_array = []
-                vectors_search = vectors[k]
-                # 5. search to get the base line of hybrid_search
-                search_res = collection_w.search([vectors_search], vector_name_list[i],
-                                                 single_search_param, default_limit,
-                                                 default_search_exp,
-                                                 check_task=CheckTasks.check_search_results,
-                                                 check_items={"nq": 1,
-                                                              "ids": insert_ids,
-                                                              "limit": default_limit,
-                                                              "pk_name": ct.default_int64_field_name})[0]
-                ids = search_res[0].ids
-                distance_array = search_res[0].distances
-                for j in range(len(ids)):
-                    search_res_dict[ids[j]] = distance_array[j]
-                search_res_dict_array.append(search_res_dict)
-            search_res_dict_array_nq.append(search_res_dict_array)
-
-        # 6. calculate hybrid search base line
-        score_answer_nq = []
-        for k in range(nq):
-            ids_answer, score_answer = cf.get_hybrid_search_base_results(search_res_dict_array_nq[k], weights, metrics)
-            score_answer_nq.append(score_answer)
+        # 5. search every vector field with all the nq vectors to get the base line of hybrid_search
+        search_res_arrays = []
+        for i in range(len(vector_name_list)):
+            search_res = collection_w.search(vectors, vector_name_list[i],
+                                             single_search_param, default_limit,
+                                             default_search_exp,
+                                             check_task=CheckTasks.check_search_results,
+                                             check_items={"nq": nq,
+                                                          "ids": insert_ids,
+                                                          "limit": default_limit,
+                                                          "pk_name": ct.default_int64_field_name})[0]
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
+        ids_list, scores_list, valid_list = zip(*search_res_arrays)
+
+        # 6. calculate hybrid search base line of all nq at once
+        _, score_answer_nq = hybrid_ranker.weighted_fusion(ids_list, scores_list, weights, metrics,
+                                                           valid_list=valid_list)
         # 7. hybrid search
         output_fields = [default_int64_field_name]
         hybrid_res = collection_w.hybrid_search(req_list, WeightedRanker(*weights), default_limit,
@@ -1628,8 +1599,6 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         req_list = []
         weights = [0.2, 0.3, 0.5]
         metrics = []
-        search_res_dict_array = []
-        search_res_dict_array_nq = []
         vectors = cf.gen_vectors(nq, dim, vector_data_type)
 
         # get hybrid search req list
@@ -1646,32 +1615,23 @@ class TestCollectionHybridSearchValid(TestcaseBase):
 
         # get the result of search with the same params of the following hybrid search
         single_search_param = {"metric_type": "COSINE", "params": {"nprobe": 10}}
-        for k in range(nq):
-            for i in range(len(vector_name_list)):
-                search_res_dict = {}
-                search_res_dict_array = []
-                vectors_search = vectors[k]
-                # 5. search to get the base line of hybrid_search
-                search_res = collection_w.search([vectors_search], vector_name_list[i],
-                                                 single_search_param, default_limit,
-                                                 default_search_exp,
-                                                 check_task=CheckTasks.check_search_results,
-                                                 check_items={"nq": 1,
-                                                              "ids": insert_ids,
-                                                              "limit": default_limit,
-                                                              "pk_name": ct.default_int64_field_name})[0]
-                ids = search_res[0].ids
-                distance_array = search_res[0].distances
-                for j in range(len(ids)):
-                    search_res_dict[ids[j]] = distance_array[j]
-                search_res_dict_array.append(search_res_dict)
-            search_res_dict_array_nq.append(search_res_dict_array)
-
-        # 6. calculate hybrid search base line
-        score_answer_nq = []
-        for k in range(nq):
-            ids_answer, score_answer = cf.get_hybrid_search_base_results(search_res_dict_array_nq[k], weights, metrics)
-            score_answer_nq.append(score_answer)
+        # 5. search every vector field with all the nq vectors to get the base line of hybrid_search
+        search_res_arrays = []
+        for i in range(len(vector_name_list)):
+            search_res = collection_w.search(vectors, vector_name_list[i],
+                                             single_search_param, default_limit,
+                                             default_search_exp,
+                                             check_task=CheckTasks.check_search_results,
+                                             check_items={"nq": nq,
+                                                          "ids": insert_ids,
+                                                          "limit": default_limit,
+                                                          "pk_name": ct.default_int64_field_name})[0]
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
+        ids_list, scores_list, valid_list = zip(*search_res_arrays)
+
+        # 6. calculate hybrid search base line of all nq at once
+        _, score_answer_nq = hybrid_ranker.weighted_fusion(ids_list, scores_list, weights, metrics,
+                                                           valid_list=valid_list)
         # 7. hybrid search
         output_fields = [default_int64_field_name, default_float_field_name, default_string_field_name,
                          default_json_field_name]
@@ -1711,8 +1671,6 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         req_list = []
         weights = [0.2, 0.3, 0.5]
         metrics = []
-        search_res_dict_array = []
-        search_res_dict_array_nq = []
         vectors = cf.gen_vectors(nq, default_dim, vector_data_type=DataType.FLOAT_VECTOR)
 
         # get hybrid search req list
@@ -1729,36 +1687,27 @@ class TestCollectionHybridSearchValid(TestcaseBase):
 
         # get the result of search with the same params of the following hybrid search
         single_search_param = {"metric_type": "COSINE", "params": {"nprobe": 10}}
-        for k in range(nq):
-            for i in range(len(vector_name_list)):
-                search_res_dict = {}
-                search_res_dict_array = []
-                vectors_search = vectors[k]
-                # 5. search to get the base line of hybrid_search
-                search_res = collection_w.search([vectors_search], vector_name_list[i],
-                                                 single_search_param, default_limit,
-                                                 default_search_exp, _async=_async,
-                                                 check_task=CheckTasks.check_search_results,
-                                                 check_items={"nq": 1,
-                                                              "ids": insert_ids,
-                                                              "limit": default_limit,
-                                                              "pk_name": ct.default_int64_field_name,
-                                                              "_async": _async})[0]
-                if _async:
-                    search_res.done()
-                    search_res = search_res.result()
-                ids = search_res[0].ids
-                distance_array = search_res[0].distances
-                for j in range(len(ids)):
-                    search_res_dict[ids[j]] = distance_array[j]
-                search_res_dict_array.append(search_res_dict)
-            search_res_dict_array_nq.append(search_res_dict_array)
-
-        # 6. calculate hybrid search base line
-        score_answer_nq = []
-        for k in range(nq):
-            ids_answer, score_answer = cf.get_hybrid_search_base_results(search_res_dict_array_nq[k], weights, metrics)
-            score_answer_nq.append(score_answer)
+        # 5. search every vector field with all the nq vectors to get the base line of hybrid_search
+        search_res_arrays = []
+        for i in range(len(vector_name_list)):
+            search_res = collection_w.search(vectors, vector_name_list[i],
+                                             single_search_param, default_limit,
+                                             default_search_exp, _async=_async,
+                                             check_task=CheckTasks.check_search_results,
+                                             check_items={"nq": nq,
+                                                          "ids": insert_ids,
+                                                          "limit": default_limit,
+                                                          "pk_name": ct.default_int64_field_name,
+                                                          "_async": _async})[0]
+            if _async:
+                search_res.done()
+                search_res = search_res.result()
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
+        ids_list, scores_list, valid_list = zip(*search_res_arrays)
+
+        # 6. calculate hybrid search base line of all nq at once
+        _, score_answer_nq = hybrid_ranker.weighted_fusion(ids_list, scores_list, weights, metrics,
+                                                           valid_list=valid_list)
         # 7. hybrid search
         hybrid_res = collection_w.hybrid_search(req_list, WeightedRanker(*weights), default_limit,
                                                 output_fields=output_fields, _async=_async,
@@ -1836,8 +1785,6 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         req_list = []
         weights = [0.2, 0.3, 0.5]
         metrics = []
-        search_res_dict_array = []
-        search_res_dict_array_nq = []
         vectors = cf.gen_vectors(nq, default_dim, vector_data_type)
 
         # get hybrid search req list
@@ -1854,32 +1801,23 @@ class TestCollectionHybridSearchValid(TestcaseBase):
 
         # get the result of search with the same params of the following hybrid search
         single_search_param = {"metric_type": "COSINE", "params": {"nprobe": 10}}
-        for k in range(nq):
-            for i in range(len(vector_name_list)):
-                search_res_dict = {}
-                search_res_dict_array = []
-                vectors_search = vectors[k]
-                # 5. search to get the base line of hybrid_search
-                search_res = collection_w.search([vectors_search], vector_name_list[i],
-                                                 single_search_param, default_limit,
-                                                 default_search_exp,
-                                                 check_task=CheckTasks.check_search_results,
-                                                 check_items={"nq": 1,
-                                                              "ids": insert_ids,
-                                                              "limit": default_limit,
-                                                              "pk_name": ct.default_int64_field_name})[0]
-                ids = search_res[0].ids
-                distance_array = search_res[0].distances
-                for j in range(len(ids)):
-                    search_res_dict[ids[j]] = distance_array[j]
-                search_res_dict_array.append(search_res_dict)
-            search_res_dict_array_nq.append(search_res_dict_array)
-
-        # 6. calculate hybrid search base line
-        score_answer_nq = []
-        for k in range(nq):
-            ids_answer, score_answer = cf.get_hybrid_search_base_results(search_res_dict_array_nq[k], weights, metrics)
-            score_answer_nq.append(score_answer)
+        # 5. search every vector field with all the nq vectors to get the base line of hybrid_search
+        search_res_arrays = []
+        for i in range(len(vector_name_list)):
+            search_res = collection_w.search(vectors, vector_name_list[i],
+                                             single_search_param, default_limit,
+                                             default_search_exp,
+                                             check_task=CheckTasks.check_search_results,
+                                             check_items={"nq": nq,
+                                                          "ids": insert_ids,
+                                                          "limit": default_limit,
+                                                          "pk_name": ct.default_int64_field_name})[0]
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
+        ids_list, scores_list, valid_list = zip(*search_res_arrays)
+
+        # 6. calculate hybrid search base line of all nq at once
+        _, score_answer_nq = hybrid_ranker.weighted_fusion(ids_list, scores_list, weights, metrics,
+                                                           valid_list=valid_list)
         # 7. hybrid search
         hybrid_res = collection_w.hybrid_search(req_list, WeightedRanker(*weights), default_limit,
                                                 check_task=CheckTasks.check_search_results,
@@ -1979,13 +1917,12 @@ class TestCollectionHybridSearchValid(TestcaseBase):
         vector_name_list = cf.extract_vector_field_name_list(collection_w)
         # 3. prepare search params
         req_list = []
-        search_res_dict_array = []
+        search_res_arrays = []
         k = 60
 
         for i in range(len(vector_name_list)):
             # vector = cf.gen_sparse_vectors(1, dim)
             vector = insert_vectors[0][i + 3][-1:]
-            search_res_dict = {}
             search_param = {
                 "data": vector,
                 "anns_field": vector_name_list[i],
@@ -1999,12 +1936,11 @@ class TestCollectionHybridSearchValid(TestcaseBase):
                                              default_search_params, default_limit,
                                              default_search_exp,
                                              )[0]
-            ids = search_res[0].ids
-            for j in range(len(ids)):
-                search_res_dict[ids[j]] = 1 / (j + k + 1)
-            search_res_dict_array.append(search_res_dict)
+            search_res_arrays.append(hybrid_ranker.pad_search_results(search_res))
         # 4. calculate hybrid search base line for RRFRanker
-        ids_answer, score_answer = cf.get_hybrid_search_base_results_rrf(search_res_dict_array)
+        ids_list, _, valid_list = zip(*search_res_arrays)
+        ids_answer, score_answer = hybrid_ranker.rrf_fusion(ids_list, valid_list=valid_list, k=k)
+        ids_answer, score_answer = ids_answer[0], score_answer[0]
         # 5. hybrid search
         hybrid_res = collection_w.hybrid_search(req_list, RRFRanker(k), default_limit,
                                                 check_task=CheckTasks.check_search_results,
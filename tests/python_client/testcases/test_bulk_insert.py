@@ -17,8 +17,12 @@ from common.bulk_insert_data import (
     prepare_bulk_insert_new_json_files,
     prepare_bulk_insert_numpy_files,
     prepare_bulk_insert_parquet_files,
+    gen_parquet_files_by_schema,
+    data_source,
     DataField as df,
 )
+from common.bulk_insert_verifier import ImportChecksum, reconcile
+from common.minio_comm import copy_files_to_minio
 from faker import Faker
 fake = Faker()
 default_vec_only_fields = [df.vec_field]
@@ -2710,6 +2714,50 @@ class TestBulkInsert(TestcaseBaseBulkInsert):
             check_items={"nq": ct.default_nq,
                          "limit": ct.default_limit})
 
+    @pytest.mark.tags(CaseLabel.L2)
+    @pytest.mark.parametrize("dim", [128])
+    @pytest.mark.parametrize("entities", [200000])
+    @pytest.mark.parametrize("file_nums", [3])
+    def test_bulk_insert_verify_with_checksums(self, dim, entities, file_nums):
+        """
+        collection schema: [int64 pk, int64, float, varchar, json, array int64, float vector, sparse vector]
+        Steps:
+        1. generate parquet files and compute the bucket checksums while generating them
+        2. import the files and load the collection
+        3. reconcile all the pk range buckets with query_iterator, verify no bucket mismatches
+        """
+        self._connect()
+        c_name = cf.gen_unique_str("bulk_insert")
+        fields = [
+            cf.gen_int64_field(name=df.pk_field, is_primary=True, auto_id=False),
+            cf.gen_int64_field(name=df.int_field),
+            cf.gen_float_field(name=df.float_field),
+            cf.gen_string_field(name=df.string_field),
+            cf.gen_json_field(name=df.json_field),
+            cf.gen_array_field(name=df.array_int_field, element_type=DataType.INT64),
+            cf.gen_float_vec_field(name=df.float_vec_field, dim=dim),
+            cf.gen_sparse_vec_field(name=df.sparse_vec_field),
+        ]
+        schema = cf.gen_collection_schema(fields=fields)
+        checksum = ImportChecksum(schema, bucket_size=20000)
+        files = gen_parquet_files_by_schema(schema, rows=entities // file_nums, file_nums=file_nums,
+                                            checksum=checksum)
+        copy_files_to_minio(host=self.minio_endpoint, r_source=data_source, files=files,
+                            bucket_name=self.bucket_name, force=True)
+        self.collection_wrap.init_collection(c_name, schema=schema)
+        task_id, _ = self.utility_wrap.do_bulk_insert(collection_name=c_name, files=files)
+        completed, _ = self.utility_wrap.wait_for_bulk_insert_tasks_completed(task_ids=[task_id], timeout=600)
+        assert completed
+        assert self.collection_wrap.num_entities == checksum.total_rows
+
+        self.collection_wrap.create_index(field_name=df.float_vec_field, index_params=ct.default_index)
+        self.collection_wrap.create_index(field_name=df.sparse_vec_field, index_params=ct.default_sparse_inverted_index)
+        self.collection_wrap.load()
+        report = reconcile(self.collection_wrap.collection, checksum)
+        assert report.actual_rows == checksum.total_rows
+        assert report.passed, f"mismatched pk ranges: {report.missing_ranges}"
+
+
 class TestImportWithTextEmbeddingFunction(TestcaseBase):
     """
     ******************************************************************
@@ -2967,4 +3015,4 @@ class TestImportWithFunctionNegative(TestcaseBase):
             )
             tt = time.time() - t0
             log.info(f"bulk insert state:{success} in {tt} with states:{states}")
-            assert not success
\ No newline at end of file
+            assert not success
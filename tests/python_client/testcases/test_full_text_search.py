@@ -14,6 +14,7 @@ from common import common_func as cf
 from common import common_type as ct
 from utils.util_log import test_log as log
 from base.client_base import TestcaseBase
+from common.bm25_oracle import BM25Oracle
 
 import random
 import pytest
@@ -4466,3 +4467,46 @@ class TestFullTextSearchMultiAnalyzerInvalid(TestcaseBase):
         schema.add_function(bm25_func)
         c_name = cf.gen_unique_str(prefix)
         self.init_collection_wrap(name=c_name, schema=schema)
+
+
+class TestBM25Oracle:
+    """ BM25 oracle against get_bm25_ground_truth, without milvus"""
+
+    @pytest.mark.tags(CaseLabel.L1)
+    @pytest.mark.parametrize("language", ["en", "zh", "de"])
+    def test_bm25_oracle_after_add_delete_upsert(self, language):
+        """
+        target: the incremental BM25 oracle follows insert, delete and upsert
+        method: 1. add documents in two batches, the second one with terms unseen in the first
+                2. delete and upsert some documents
+                3. search with queries made of the words of the remaining documents
+        expected: the scores of every document equal the ones of get_bm25_ground_truth on the
+                  remaining corpus, up to the (k1 + 1) factor
+        """
+        fake = {"en": fake_en, "zh": fake_zh, "de": fake_de}[language]
+        docs = {i: fake.text() for i in range(300)}
+        oracle = BM25Oracle(language=language)
+        oracle.add_documents([docs[i] for i in range(200)], ids=list(range(200)))
+        oracle.add_documents([docs[i] for i in range(200, 300)], ids=list(range(200, 300)))
+        deleted = list(range(0, 300, 7))
+        oracle.delete_documents(deleted)
+        for pk in deleted:
+            docs.pop(pk)
+        upserted = [pk for pk in range(1, 300, 11) if pk in docs]
+        for pk in upserted:
+            docs[pk] = fake.text()
+        oracle.upsert_documents([docs[pk] for pk in upserted], ids=upserted)
+
+        ids = list(docs)
+        corpus = [docs[pk] for pk in ids]
+        queries = [docs[pk][:50] for pk in upserted[:5] + ids[-5:]]
+        expected, expected_scores = cf.get_bm25_ground_truth(corpus, queries, top_k=len(corpus), language=language)
+        res_ids, res_scores = oracle.search(queries, top_k=len(corpus))
+        row_of_text = {text: row for row, text in enumerate(corpus)}
+        for i in range(len(queries)):
+            expected_by_id = {ids[row_of_text[text]]: score * (oracle.k1 + 1)
+                              for text, score in zip(expected[i], expected_scores[i]) if score > 0}
+            res_by_id = dict(zip(res_ids[i], res_scores[i]))
+            assert res_by_id.keys() == expected_by_id.keys()
+            for pk, score in res_by_id.items():
+                assert score == pytest.approx(expected_by_id[pk], rel=1e-4)
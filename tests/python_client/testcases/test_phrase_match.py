@@ -54,7 +54,7 @@ class TestQueryPhraseMatch(TestcaseBase):
                2. Create collection with appropriate schema (primary key, text field with analyzer, vector field)
                3. Build both vector (IVF_SQ8) and inverted indexes
                4. Execute phrase match queries with various slop values
-               5. Compare results against Tantivy reference implementation
+               5. Compare results against the positional index of the generator
         expected: Milvus phrase match results should exactly match the reference implementation
                  results for all queries and slop values
         note: Test is marked to xfail for jieba tokenizer due to known issues
@@ -109,9 +109,9 @@ class TestQueryPhraseMatch(TestcaseBase):
             # Execute query
             results, _ = collection_w.query(expr=expr, output_fields=["id", "text"])
             if tokenizer == "standard":
-                # Get expected matches using Tantivy
+                # Get expected matches from the positional index of the generator
                 expected_matches = generator.get_query_results(
-                    query["query"], query["slop"]
+                    query["query"], query["slop"], use_oracle=True
                 )
                 # Get actual matches from Milvus
                 actual_matches = [r["id"] for r in results]
@@ -220,10 +220,10 @@ class TestQueryPhraseMatch(TestcaseBase):
                 output_fields=["id", "text"],
             )
 
-            # Get expected matches using Tantivy
-            expected_matches = generator.get_query_results(
-                query["query"], query["slop"]
-            )
+            # Get expected matches from the positional index of the generator
+            expected_matches = set(generator.get_query_results(
+                query["query"], query["slop"], use_oracle=True
+            ))
             # assert results satisfy the filter
             for hits in results:
                 for hit in hits:
@@ -237,7 +237,7 @@ class TestQueryPhraseMatch(TestcaseBase):
                2. Generate and insert data with controlled word gaps between terms
                3. Test phrase matching with specific slop values (0, 1, 2, etc.)
                4. Verify matches at different word distances
-               5. Compare results with Tantivy reference implementation
+               5. Compare results with the positional index of the generator
         expected: Results should only match phrases where words are within the specified
                  slop distance, validating the slop parameter's distance control
         """
@@ -288,8 +288,8 @@ class TestQueryPhraseMatch(TestcaseBase):
             # Execute query
             results, _ = collection_w.query(expr=expr, output_fields=["id", "text"])
 
-            # Get expected matches using Tantivy
-            expected_matches = generator.get_query_results(query["query"], slop_value)
+            # Get expected matches from the positional index of the generator
+            expected_matches = generator.get_query_results(query["query"], slop_value, use_oracle=True)
             # Get actual matches from Milvus
             actual_matches = [r["id"] for r in results]
             if set(actual_matches) != set(expected_matches):
@@ -378,6 +378,26 @@ class TestQueryPhraseMatch(TestcaseBase):
             assert len(results) >= num_docs_per_pattern
 
 
+class TestPhraseMatchOracle:
+    """ the positional index of PhraseMatchTestGenerator against Tantivy, without milvus"""
+
+    @pytest.mark.tags(CaseLabel.L1)
+    @pytest.mark.parametrize("language", ["en", "zh"])
+    def test_oracle_matches_tantivy(self, language):
+        """
+        target: the positional index used as the expected phrase matches of the tests agrees with Tantivy
+        method: generate 2000 documents and 1000 random queries, answer every query at several slops
+                with the positional index and with a Tantivy phrase query
+        expected: the same documents match for every query and slop
+        """
+        generator = PhraseMatchTestGenerator(language=language)
+        generator.generate_test_data(2000, 8)
+        for query in generator.generate_test_queries(1000):
+            for slop in {query["slop"], 0, 2, 10}:
+                expected = set(generator.get_query_results(query["query"], slop))
+                assert set(generator.get_query_results(query["query"], slop, use_oracle=True)) == expected
+
+
 @pytest.mark.tags(CaseLabel.L1)
 class TestQueryPhraseMatchNegative(TestcaseBase):
     def test_query_phrase_match_with_invalid_slop(self):
@@ -4,6 +4,7 @@ from common.common_type import CaseLabel, CheckTasks
 from common import common_type as ct
 from common import common_func as cf
 from common.text_generator import KoreanTextGenerator, ICUTextGenerator
+from common.text_match_oracle import TextMatchOracle
 from common.code_mapping import ConnectionErrorMessage as cem
 from base.client_base import TestcaseBase
 from pymilvus.orm.types import CONSISTENCY_STRONG, CONSISTENCY_BOUNDED, CONSISTENCY_EVENTUALLY
@@ -6253,9 +6254,8 @@ class TestQueryTextMatch(TestcaseBase):
         for field in text_fields:
             wf_map[field] = cf.analyze_documents(df[field].tolist(), language=language)
 
-        df_new = cf.split_dataframes(df, fields=text_fields)
+        oracle = TextMatchOracle.from_dataframe(df, text_fields, language=language)
         log.info(f"df \n{df}")
-        log.info(f"new df \n{df_new}")
         for field in text_fields:
             expr_list = []
             wf_counter = Counter(wf_map[field])
@@ -6264,7 +6264,7 @@ class TestQueryTextMatch(TestcaseBase):
                 tmp = f"text_match({field}, '{word}')"
                 log.info(f"tmp expr {tmp}")
                 expr_list.append(tmp)
-                tmp_res = cf.manual_check_text_match(df_new, word, field)
+                tmp_res = oracle.term_match(field, word)
                 log.info(f"manual check result for  {tmp} {len(tmp_res)}")
                 pd_tmp_res_list.append(tmp_res)
             log.info(f"manual res {len(pd_tmp_res_list)}, {pd_tmp_res_list}")
@@ -6367,8 +6367,7 @@ class TestQueryTextMatch(TestcaseBase):
         for field in text_fields:
             wf_map[field] = cf.analyze_documents(df[field].tolist(), language=language)
 
-        df_new = cf.split_dataframes(df, fields=text_fields)
-        log.info(f"new df \n{df_new}")
+        oracle = TextMatchOracle.from_dataframe(df, text_fields, language=language)
         for i in range(2):
             query, text_match_expr, pandas_expr = (
                 cf.generate_random_query_from_freq_dict(
@@ -6398,23 +6397,17 @@ class TestQueryTextMatch(TestcaseBase):
                     log.info(f"tmp expr {tmp_expr} {len(res)}")
                     tmp_idx = [r["id"] for r in res]
                     step_by_step_results.append(tmp_idx)
-                    pandas_filter_res = cf.generate_pandas_text_match_result(
-                        expr, df_new
-                    )
-                    tmp_pd_idx = pandas_filter_res["id"].tolist()
-                    diff_id = set(tmp_pd_idx).union(set(tmp_idx)) - set(
-                        tmp_pd_idx
-                    ).intersection(set(tmp_idx))
-                    log.info(f"diff between text match and manual check {diff_id}")
-                    assert len(diff_id) == 0
+                    oracle_res = oracle.evaluate_term(expr)
+                    diff_id = oracle_res.symmetric_difference(set(tmp_idx))
                     for idx in diff_id:
                         log.info(df[df["id"] == idx][key].values)
-                    log.info(
-                        f"pandas_filter_res {len(pandas_filter_res)} \n {pandas_filter_res}"
-                    )
+                    log.info(f"diff between text match and manual check {diff_id}")
+                    assert len(diff_id) == 0
+                    log.info(f"oracle res {len(oracle_res)}")
                 if isinstance(expr, str):
                     step_by_step_results.append(expr)
             final_res = cf.evaluate_expression(step_by_step_results)
+            assert final_res == oracle.evaluate(query)
             log.info(f"one time res {len(onetime_res)}, final res {len(final_res)}")
             if len(onetime_res) != len(final_res):
                 log.info("res is not same")
@@ -1,6 +1,10 @@
+import os
+import json
 import random
 import time
+import hashlib
 import logging
+import threading
 from typing import List, Dict, Optional, Tuple
 import pandas as pd
 from faker import Faker
@@ -17,6 +21,124 @@ from pymilvus import MilvusClient
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_ANALYZER_CACHE_DIR = os.environ.get("ANALYZER_CACHE_DIR", "/tmp/analyzer_token_cache")
+
+
+class AnalyzerTokenCache:
+    """
+    Cache of server side tokenization results keyed by (server version and analyzer params hash, text hash).
+
+    Cache misses are sent to run_analyzer in batches of many texts per request, and new entries
+    are appended to one json lines file per analyzer and server version under cache_dir, so following
+    test runs against the same server reuse the tokens computed before, and an upgraded server does not
+    get the tokens of the previous analyzers. None texts are not sent and have no tokens.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_ANALYZER_CACHE_DIR, batch_size: int = 512):
+        """
+        Args:
+            cache_dir: Directory used to persist the cache, None keeps the cache in memory only
+            batch_size: Max number of texts sent in one run_analyzer request
+        """
+        self.cache_dir = cache_dir
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._tokens: Dict[str, Dict[str, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def analyzer_key(analyzer_params, server_version: str = "") -> str:
+        key = json.dumps({"server_version": server_version, "analyzer_params": analyzer_params}, sort_keys=True)
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def text_key(text: Optional[str]) -> Optional[str]:
+        if text is None:
+            return None
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _cache_file(self, analyzer_key: str) -> str:
+        return os.path.join(self.cache_dir, f"{analyzer_key}.jsonl")
+
+    def _load(self, analyzer_key: str, analyzer_params, server_version: str) -> Dict[str, List[str]]:
+        tokens = self._tokens.get(analyzer_key)
+        if tokens is not None:
+            return tokens
+        tokens = {}
+        if self.cache_dir and os.path.exists(self._cache_file(analyzer_key)):
+            with open(self._cache_file(analyzer_key), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # the last line may be truncated if a previous run was killed while writing
+                        continue
+                    if "text" in entry:
+                        tokens[entry["text"]] = entry["tokens"]
+            logger.info(f"loaded {len(tokens)} cached tokenization results for analyzer {analyzer_params} "
+                        f"of server {server_version}")
+        self._tokens[analyzer_key] = tokens
+        return tokens
+
+    def _persist(self, analyzer_key: str, analyzer_params, server_version: str, entries: Dict[str, List[str]]):
+        if not self.cache_dir or not entries:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_file = self._cache_file(analyzer_key)
+        is_new = not os.path.exists(cache_file)
+        with open(cache_file, "a", encoding="utf-8") as f:
+            if is_new:
+                f.write(json.dumps({"server_version": server_version, "analyzer_params": analyzer_params},
+                                   ensure_ascii=False) + "\n")
+            for text_key, tokens in entries.items():
+                f.write(json.dumps({"text": text_key, "tokens": tokens}, ensure_ascii=False) + "\n")
+
+    def tokenize(self, client: MilvusClient, texts: List[str], analyzer_params) -> List[List[str]]:
+        """
+        Tokenize texts with the analyzer, only the texts not seen before by the same server version
+        are sent to the server, a None text has no tokens.
+        Args:
+            client (MilvusClient): Client used to call run_analyzer
+            texts (List[str]): Texts to be tokenized
+            analyzer_params: Analyzer parameters
+        Returns:
+            List[List[str]]: Tokens of each text
+        """
+        server_version = client.get_server_version()
+        analyzer_key = self.analyzer_key(analyzer_params, server_version)
+        text_keys = [self.text_key(text) for text in texts]
+        with self._lock:
+            cached = self._load(analyzer_key, analyzer_params, server_version)
+            missing = {}
+            for text, text_key in zip(texts, text_keys):
+                if text_key is not None and text_key not in cached:
+                    missing[text_key] = text
+            self.misses += len(missing)
+            self.hits += sum(k is not None for k in text_keys) - len(missing)
+        missing_keys = list(missing.keys())
+        new_entries = {}
+        for i in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[i: i + self.batch_size]
+            res = client.run_analyzer([missing[k] for k in batch_keys], analyzer_params)
+            if not isinstance(res, list):
+                res = [res]
+            for text_key, r in zip(batch_keys, res):
+                new_entries[text_key] = list(r.tokens)
+        with self._lock:
+            cached.update(new_entries)
+            self._persist(analyzer_key, analyzer_params, server_version, new_entries)
+            return [cached[k] if k is not None else [] for k in text_keys]
+
+    def clear(self):
+        with self._lock:
+            self._tokens = {}
+            self.hits = 0
+            self.misses = 0
+
+
+analyzer_token_cache = AnalyzerTokenCache()
+
 
 class FTSMultiAnalyzerChecker:
     """
@@ -42,6 +164,7 @@ class FTSMultiAnalyzerChecker:
         text_field_name: str,
         multi_analyzer_params: Optional[Dict] = None,
         client: Optional[MilvusClient] = None,
+        token_cache: Optional[AnalyzerTokenCache] = None,
     ):
         self.collection_name = collection_name
         self.mock_collection_name = collection_name + "_mock"
@@ -69,6 +192,7 @@ class FTSMultiAnalyzerChecker:
             "analyzers": {"default": {"tokenizer": "whitespace"}},
         }
         self.client = client
+        self.token_cache = token_cache if token_cache is not None else analyzer_token_cache
         self.collection = None
         self.mock_collection = None
 
@@ -152,13 +276,24 @@ class FTSMultiAnalyzerChecker:
         Returns:
             List[str]: List of tokenized text
         """
+        return self.get_tokens_by_analyzer_batch([text], analyzer_params)[0]
+
+    def get_tokens_by_analyzer_batch(self, texts: List[str], analyzer_params: dict) -> List[List[str]]:
+        """
+        Tokenize texts according to analyzer parameters through the shared tokenization cache.
+        Args:
+            texts (List[str]): Texts to be tokenized
+            analyzer_params (dict): Analyzer parameters
+        Returns:
+            List[List[str]]: List of tokenized text for each text
+        """
         try:
-            res = self.client.run_analyzer(text, analyzer_params)
+            res = self.token_cache.tokenize(self.client, texts, analyzer_params)
             # Filter out tokens that are just whitespace
-            return [token for token in res.tokens if token.strip()]
+            return [[token for token in tokens if token.strip()] for tokens in res]
         except Exception as e:
             logger.error(f"Tokenization failed: {e}")
-            return []
+            return [[] for _ in texts]
 
     def generate_test_data(
         self, num_rows: int = 3000, lang_list: Optional[List[str]] = None
@@ -207,19 +342,25 @@ class FTSMultiAnalyzerChecker:
         Returns:
             List[Dict]: Tokenized data list
         """
-        data_list_tokenized = []
-        for row in data_list:
-            lang = row.get(self.language_field_name, None)
-            content = row.get(self.text_field_name, "")
-            doc_analyzer = self.resolve_analyzer(lang)
+        # group the rows by analyzer, so each analyzer tokenizes its texts in batched requests
+        rows_by_analyzer = {}
+        for idx, row in enumerate(data_list):
+            doc_analyzer = self.resolve_analyzer(row.get(self.language_field_name, None))
+            rows_by_analyzer.setdefault(doc_analyzer, []).append(idx)
+        content_tokens = [[] for _ in data_list]
+        for doc_analyzer, indices in rows_by_analyzer.items():
             doc_analyzer_params = self.multi_analyzer_params["analyzers"][doc_analyzer]
-            content_tokens = self.get_tokens_by_analyzer(content, doc_analyzer_params)
-            tokenized_content = " ".join(content_tokens)
+            texts = [data_list[i].get(self.text_field_name, "") for i in indices]
+            for i, tokens in zip(indices, self.get_tokens_by_analyzer_batch(texts, doc_analyzer_params)):
+                content_tokens[i] = tokens
+        logger.info(f"tokenization cache hits: {self.token_cache.hits}, misses: {self.token_cache.misses}")
+        data_list_tokenized = []
+        for row, tokens in zip(data_list, content_tokens):
             data_list_tokenized.append(
                 {
                     "doc_id": row.get("doc_id"),
-                    self.language_field_name: lang,
-                    self.text_field_name: tokenized_content,
+                    self.language_field_name: row.get(self.language_field_name, None),
+                    self.text_field_name: " ".join(tokens),
                 }
             )
         if verbose:
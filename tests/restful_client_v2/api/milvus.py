@@ -1,7 +1,11 @@
+import hashlib
 import json
+import os
 import requests
 import time
 import uuid
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
 from utils.util_log import test_log as logger
 from minio import Minio
 from minio.error import S3Error
@@ -1046,17 +1050,26 @@ class ImportJobClient(Requests):
         res = response.json()
         return res
 
-    def wait_import_job_completed(self, job_id):
+    def wait_import_job_completed(self, job_id, timeout=120, min_interval=0.5, max_interval=5):
+        # poll again right after progress is made, back off up to max_interval while the job is idle
         finished = False
         t0 = time.time()
-        rsp = self.get_import_job_progress(job_id)
-        while not finished:
+        interval = min_interval
+        last_progress = None
+        while True:
             rsp = self.get_import_job_progress(job_id)
-            if rsp['data']['state'] == "Completed":
+            data = rsp.get('data', {})
+            if data.get('state') == "Completed":
                 finished = True
-            time.sleep(5)
-            if time.time() - t0 > 120:
                 break
+            if data.get('state') == "Failed" or time.time() - t0 > timeout:
+                break
+            progress = (data.get('state'), data.get('progress'), data.get('importedRows'))
+            interval = min_interval if progress != last_progress else min(interval * 2, max_interval)
+            last_progress = progress
+            time.sleep(interval)
+        logger.info(f"import job {job_id} finished: {finished}, state: {rsp.get('data', {}).get('state')}, "
+                    f"cost {time.time() - t0:.2f}s")
         return rsp, finished
 
 
@@ -1128,26 +1141,89 @@ class DatabaseClient(Requests):
         return response.json()
 
 
+def local_etag(file_path, part_size):
+    """ETag s3 computes for the file uploaded with parts of part_size"""
+    part_md5s = []
+    with open(file_path, "rb") as f:
+        while True:
+            data = f.read(part_size)
+            if not data:
+                break
+            part_md5s.append(hashlib.md5(data).digest())
+    if len(part_md5s) <= 1:
+        return part_md5s[0].hex() if part_md5s else hashlib.md5(b"").hexdigest()
+    return f"{hashlib.md5(b''.join(part_md5s)).hexdigest()}-{len(part_md5s)}"
+
+
 class StorageClient():
 
-    def __init__(self, endpoint, access_key, secret_key, bucket_name, root_path="file"):
+    def __init__(self, endpoint, access_key, secret_key, bucket_name, root_path="file",
+                 max_workers=8, part_size=64 * 1024 * 1024, num_parallel_uploads=3):
         self.endpoint = endpoint
         self.access_key = access_key
         self.secret_key = secret_key
         self.bucket_name = bucket_name
         self.root_path = root_path
+        self.max_workers = max_workers
+        self.part_size = part_size
+        self.num_parallel_uploads = num_parallel_uploads
+        # the default pool of the minio client keeps only 10 connections, too few for concurrent uploads
+        http_client = urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=300, read=300),
+            maxsize=max_workers * num_parallel_uploads,
+            retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+        )
         self.client = Minio(
             self.endpoint,
             access_key=access_key,
             secret_key=secret_key,
             secure=False,
+            http_client=http_client,
         )
 
-    def upload_file(self, file_path, object_name):
+    def is_identical(self, file_path, object_name):
+        """the object exists with the same size and ETag as the local file"""
+        try:
+            stat = self.client.stat_object(self.bucket_name, object_name)
+        except S3Error:
+            return False
+        if stat.size != os.path.getsize(file_path):
+            return False
+        return (stat.etag or "").strip('"') == local_etag(file_path, self.part_size)
+
+    def upload_file(self, file_path, object_name, force=True):
+        """
+        upload a file with multipart uploads of part_size,
+        when force is False the upload is skipped if an identical object exists
+
+        return: uploaded bytes, 0 if skipped or failed
+        """
         try:
-            self.client.fput_object(self.bucket_name, object_name, file_path)
+            if not force and self.is_identical(file_path, object_name):
+                logger.info(f"skip upload {object_name}, identical object exists")
+                return 0
+            self.client.fput_object(self.bucket_name, object_name, file_path, part_size=self.part_size,
+                                    num_parallel_uploads=self.num_parallel_uploads)
+            return os.path.getsize(file_path)
         except S3Error as exc:
-            logger.error("fail to copy files to minio", exc)
+            logger.error(f"fail to copy files to minio: {exc}")
+            return 0
+
+    def upload_files(self, files, force=True):
+        """
+        upload (file_path, object_name) pairs concurrently and log the throughput,
+        the test cases collect the pairs while generating the files and upload them all in one call after
+
+        return: uploaded bytes of each file, in the input order
+        """
+        t0 = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(files)))) as executor:
+            sizes = list(executor.map(lambda f: self.upload_file(f[0], f[1], force=force), files))
+        tt = time.time() - t0
+        total = sum(sizes) / 1024 / 1024
+        logger.info(f"uploaded {len(files)} files, {total:.2f} MB in {tt:.2f} s, "
+                    f"throughput {total / max(tt, 1e-9):.2f} MB/s")
+        return sizes
 
     def copy_file(self, src_bucket, src_object, dst_bucket, dst_object):
         try:
@@ -513,6 +513,7 @@ class TestCreateImportJob(TestBase):
         # upload file to storage
         file_nums = 2
         file_names = []
+        upload_list = []
         for file_num in range(file_nums):
             data = [{
                 "book_id": i,
@@ -528,10 +529,10 @@ class TestCreateImportJob(TestBase):
             Path(file_path).parent.mkdir(parents=True, exist_ok=True)
             with open(file_path, "w") as f:
                 json.dump(data, f, cls=NumpyEncoder)
-            # upload file to minio storage
-            self.storage_client.upload_file(file_path, file_name)
+            upload_list.append((file_path, file_name))
             file_names.append([file_name])
 
+        self.storage_client.upload_files(upload_list)
         # create import job
         payload = {
             "collectionName": name,
@@ -595,6 +596,7 @@ class TestCreateImportJob(TestBase):
         # upload file to storage
         file_nums = 2
         file_names = []
+        upload_list = []
         for file_num in range(file_nums):
             data = [{
                 "book_id": i,
@@ -610,10 +612,10 @@ class TestCreateImportJob(TestBase):
             Path(file_path).parent.mkdir(parents=True, exist_ok=True)
             df = pd.DataFrame(data)
             df.to_parquet(file_path, index=False)
-            # upload file to minio storage
-            self.storage_client.upload_file(file_path, file_name)
+            upload_list.append((file_path, file_name))
             file_names.append([file_name])
 
+        self.storage_client.upload_files(upload_list)
         # create import job
         payload = {
             "collectionName": name,
@@ -677,6 +679,7 @@ class TestCreateImportJob(TestBase):
         # upload file to storage
         file_nums = 2
         file_names = []
+        upload_list = []
         for file_num in range(file_nums):
             data = [{
                 "book_id": i,
@@ -697,10 +700,10 @@ class TestCreateImportJob(TestBase):
                 Path(file_path).parent.mkdir(parents=True, exist_ok=True)
                 file_name = f"{file_dir}/{column}.npy"
                 np.save(file_path, np.array(df[column].values.tolist()))
-                # upload file to minio storage
-                self.storage_client.upload_file(file_path, file_name)
+                upload_list.append((file_path, file_name))
                 file_list.append(file_name)
             file_names.append(file_list)
+        self.storage_client.upload_files(upload_list)
         # create import job
         payload = {
             "collectionName": name,
@@ -764,6 +767,7 @@ class TestCreateImportJob(TestBase):
         # upload file to storage
         file_nums = 2
         file_names = []
+        upload_list = []
 
         # numpy file
         for file_num in range(file_nums):
@@ -786,8 +790,7 @@ class TestCreateImportJob(TestBase):
                 Path(file_path).parent.mkdir(parents=True, exist_ok=True)
                 file_name = f"{file_dir}/{column}.npy"
                 np.save(file_path, np.array(df[column].values.tolist()))
-                # upload file to minio storage
-                self.storage_client.upload_file(file_path, file_name)
+                upload_list.append((file_path, file_name))
                 file_list.append(file_name)
             file_names.append(file_list)
         # parquet file
@@ -806,8 +809,7 @@ class TestCreateImportJob(TestBase):
             Path(file_path).parent.mkdir(parents=True, exist_ok=True)
             df = pd.DataFrame(data)
             df.to_parquet(file_path, index=False)
-            # upload file to minio storage
-            self.storage_client.upload_file(file_path, file_name)
+            upload_list.append((file_path, file_name))
             file_names.append([file_name])
         # json file
         for file_num in range(4, file_nums+4):
@@ -823,10 +825,10 @@ class TestCreateImportJob(TestBase):
             file_path = f"/tmp/{file_name}"
             with open(file_path, "w") as f:
                 json.dump(data, f, cls=NumpyEncoder)
-            # upload file to minio storage
-            self.storage_client.upload_file(file_path, file_name)
+            upload_list.append((file_path, file_name))
             file_names.append([file_name])
 
+        self.storage_client.upload_files(upload_list)
         # create import job
         payload = {
             "collectionName": name,
@@ -1045,6 +1047,7 @@ class TestImportJobAdvance(TestBase):
         file_nums = 10
         batch_size = 1000
         file_names = []
+        upload_list = []
         for file_num in range(file_nums):
             data = [{
                 "book_id": i,
@@ -1060,10 +1063,10 @@ class TestImportJobAdvance(TestBase):
             Path(file_path).parent.mkdir(parents=True, exist_ok=True)
             with open(file_path, "w") as f:
                 json.dump(data, f, cls=NumpyEncoder)
-            # upload file to minio storage
-            self.storage_client.upload_file(file_path, file_name)
+            upload_list.append((file_path, file_name))
             file_names.append([file_name])
 
+        self.storage_client.upload_files(upload_list)
         # create import job
         payload = {
             "collectionName": name,
@@ -1147,6 +1150,7 @@ class TestCreateImportJobAdvance(TestBase):
         file_nums = 1
         batch_size = 100000
         file_names = []
+        upload_list = []
         for file_num in range(file_nums):
             data = [{
                 "book_id": i,
@@ -1162,9 +1166,9 @@ class TestCreateImportJobAdvance(TestBase):
             Path(file_path).parent.mkdir(parents=True, exist_ok=True)
             with open(file_path, "w") as f:
                 json.dump(data, f, cls=NumpyEncoder)
-            # upload file to minio storage
-            self.storage_client.upload_file(file_path, file_name)
+            upload_list.append((file_path, file_name))
             file_names.append([file_name])
+        self.storage_client.upload_files(upload_list)
         for i in range(task_num):
             # create import job
             payload = {
@@ -1238,6 +1242,7 @@ class TestCreateImportJobAdvance(TestBase):
         file_nums = 2
         batch_size = 10
         file_names = []
+        upload_list = []
         for file_num in range(file_nums):
             data = [{
                 "book_id": i,
@@ -1253,9 +1258,9 @@ class TestCreateImportJobAdvance(TestBase):
             Path(file_path).parent.mkdir(parents=True, exist_ok=True)
             with open(file_path, "w") as f:
                 json.dump(data, f, cls=NumpyEncoder)
-            # upload file to minio storage
-            self.storage_client.upload_file(file_path, file_name)
+            upload_list.append((file_path, file_name))
             file_names.append([file_name])
+        self.storage_client.upload_files(upload_list)
         for i in range(task_num):
             # create import job
             payload = {